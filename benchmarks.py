@@ -0,0 +1,860 @@
+'''The module containing benchmarks for measuring how quickly the ciphers in
+ciphers.py encrypt and decrypt text. Run it as a script to print the
+throughput of each benchmark.
+
+Each benchmark is timed against the letter by letter implementation the
+ciphers used before, so the speed up of a change can be seen directly.
+
+The micro suite instead measures every cipher and number theory helper on its
+own and reports the results as JSON, which can be saved as a baseline and
+compared against later runs to catch regressions.
+'''
+
+import argparse
+import functools
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from cipher_conversion import convert_file, convert_mapped_file
+from ciphers import *
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000]
+KEY_SIZES = [512, 1024, 2048, 4096]
+RABIN_PRIME_SIZES = [12, 16, 20, 64, 256, 512, 1024]
+FILE_WORKERS = [2, 4, 8, 16, 32]
+SUITES = ['ciphers', 'streaming', 'files', 'rsa', 'rsa-blocks', 'rabin', 'inverse', 'keygen']
+MICRO_BIT_SIZES = [64, 128, 256, 512, 1024, 2048, 4096]
+MICRO_KEY_SIZE = 1024
+PUBLIC_KEY_LIMIT = 100_000
+MIN_TIME = 0.1
+REGRESSION_THRESHOLD = 0.1
+SMALL_PRIMES_PRODUCT = math.prod([2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41,
+                                  43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97])
+
+def sample_text(size, seed=0):
+    '''Makes English-like text of a given length made from lowercase words,
+    capital letters, spaces and punctuation.
+
+    Args:
+        size (int): The number of characters in the text
+        seed (int): The seed used for choosing the words (default is 0)
+
+    Returns:
+        text (str): The sample text
+    '''
+
+    words = ['the', 'Quick', 'brown', 'fox', 'jumps', 'over', 'lazy', 'dog,',
+             'pack', 'my', 'box', 'with', 'five', 'dozen', 'liquor', 'jugs.']
+    generator = random.Random(seed)
+    block = ' '.join(generator.choice(words) for _ in range(2000)) + '\n'
+    text = (block * (size // len(block) + 1))[:size]
+    return text
+
+def random_prime(bits, generator, mod_4=None):
+    '''Finds a random prime number with a given number of bits.
+
+    Args:
+        bits (int): The number of bits in the prime number
+        generator (random.Random): The random number generator used
+        mod_4 (int): The value the prime is congruent to mod 4, which can be 1
+        or 3 (default is None, which allows both)
+
+    Returns:
+        prime (int): The prime number
+    '''
+
+    while True:
+        candidate = generator.getrandbits(bits) | (1 << bits-1) | 1
+        if mod_4 is not None:
+            candidate = candidate - candidate % 4 + mod_4
+        if math.gcd(candidate, SMALL_PRIMES_PRODUCT) == 1 and is_prime(candidate):
+            return candidate
+
+@functools.lru_cache(maxsize=None)
+def make_rsa(bits, seed=0, lookup_table=True):
+    '''Makes an RSA Cryptosystem with a modulus of a given number of bits and
+    e = 65537. The primes come from a seeded generator, so the same key is made
+    every time.
+
+    Args:
+        bits (int): The number of bits in the modulus n
+        seed (int): The seed used for finding the primes (default is 0)
+        lookup_table (bool): Whether the RSA Cryptosystem uses the letter lookup
+        table (default is True)
+
+    Returns:
+        cipher (RSA): The RSA Cryptosystem
+    '''
+
+    generator = random.Random(seed)
+    while True:
+        p = random_prime(bits // 2, generator)
+        q = random_prime(bits - bits//2, generator)
+        if p != q and is_invertible(65537, (p-1) * (q-1))[0]:
+            break
+    cipher = RSA(p, q, 65537, lookup_table)
+    return cipher
+
+def time_call(function, *args, repeat=3):
+    '''Times a function call, taking the best time of a number of runs.
+
+    Args:
+        function (function): The function being timed
+        *args: The arguments passed to the function
+        repeat (int): The number of times the function is run (default is 3)
+
+    Returns:
+        best (float): The shortest time taken in seconds
+    '''
+
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+# Letter by letter reference implementations ===================================
+
+def legacy_caesar_encrypt(cipher, message):
+    '''Caesar.encrypt as it was before translation tables.'''
+    message = message.lower()
+    encrypted_message = ''
+    for letter in message:
+        if letter.isalpha():
+            encrypted_letter_value = (LETTER_VALUES[letter] + cipher.key) % NUM_LETTERS
+            encrypted_message += VALUE_LETTERS[encrypted_letter_value]
+        else:
+            encrypted_message += letter
+    return encrypted_message
+
+def legacy_caesar_decrypt(cipher, message):
+    '''Caesar.decrypt as it was before translation tables.'''
+    message = message.lower()
+    decrypted_message = ''
+    for letter in message:
+        if letter.isalpha():
+            decrypted_letter_value = (LETTER_VALUES[letter] - cipher.key) % NUM_LETTERS
+            decrypted_message += VALUE_LETTERS[decrypted_letter_value]
+        else:
+            decrypted_message += letter
+    return decrypted_message
+
+def legacy_affine_encrypt(cipher, message):
+    '''Affine.encrypt as it was before translation tables.'''
+    message = message.lower()
+    encrypted_message = ''
+    for letter in message:
+        if letter.isalpha():
+            encrypted_letter_value = ((cipher.a * LETTER_VALUES[letter]) +
+                                      cipher.b) % NUM_LETTERS
+            encrypted_message += VALUE_LETTERS[encrypted_letter_value]
+        else:
+            encrypted_message += letter
+    return encrypted_message
+
+def legacy_affine_decrypt(cipher, message):
+    '''Affine.decrypt as it was before translation tables.'''
+    message = message.lower()
+    decrypted_message = ''
+    for letter in message:
+        if letter.isalpha():
+            decrypted_letter_value = (VALUE_INVERSES[cipher.a] *
+                                      (LETTER_VALUES[letter] - cipher.b)) % NUM_LETTERS
+            decrypted_message += VALUE_LETTERS[decrypted_letter_value]
+        else:
+            decrypted_message += letter
+    return decrypted_message
+
+def legacy_vigenere_encrypt(cipher, message):
+    '''Vigenere.encrypt as it was before the NumPy keystream.'''
+    message = message.lower()
+    encrypted_message = ''
+    cipher_index = 0
+    for letter in message:
+        if letter.isalpha():
+            letter_cipher = cipher.caesar_ciphers[cipher_index]
+            encrypted_message += legacy_caesar_encrypt(letter_cipher, letter)
+            cipher_index = (cipher_index + 1) % len(cipher.caesar_ciphers)
+        else:
+            encrypted_message += letter
+    return encrypted_message
+
+def legacy_vigenere_decrypt(cipher, message):
+    '''Vigenere.decrypt as it was before the NumPy keystream.'''
+    message = message.lower()
+    decrypted_message = ''
+    cipher_index = 0
+    for letter in message:
+        if letter.isalpha():
+            letter_cipher = cipher.caesar_ciphers[cipher_index]
+            decrypted_message += legacy_caesar_decrypt(letter_cipher, letter)
+            cipher_index = (cipher_index + 1) % len(cipher.caesar_ciphers)
+        else:
+            decrypted_message += letter
+    return decrypted_message
+
+def legacy_rsa_encrypt(cipher, message):
+    '''RSA.encrypt as it was before using the built-in pow.'''
+    message = message.lower()
+    encrypted_message = []
+    for letter in message:
+        if letter.isalpha():
+            encrypted_letter_value = fast_exponentiation(LETTER_VALUES[letter], cipher.e, cipher.n)
+            encrypted_message.append(str(encrypted_letter_value))
+        elif letter == ' ':
+            encrypted_message.append('_')
+        else:
+            encrypted_message.append(letter)
+    return ' '.join(encrypted_message)
+
+def legacy_rsa_decrypt(cipher, message, exponentiation=fast_exponentiation):
+    '''RSA.decrypt as it was before the Chinese Remainder Theorem, using
+    fast_exponentiation unless another exponentiation function is given.'''
+    message = message.split(' ')
+    decrypted_message = ''
+    for number in message:
+        if number.isnumeric():
+            decrypted_letter_value = exponentiation(int(number), cipher.d, cipher.n)
+            decrypted_message += VALUE_LETTERS[decrypted_letter_value]
+        elif number == '_':
+            decrypted_message += ' '
+        else:
+            decrypted_message += number
+    return decrypted_message
+
+def legacy_rabin_letter_values(cipher, number):
+    '''Rabin.letter_values as it was before modular_sqrt, searching for the
+    square roots one number at a time.'''
+    a_squared = number % cipher.p
+    b_squared = number % cipher.q
+    a = 1
+    while fast_exponentiation(a, 2, cipher.p) != a_squared:
+        a += 1
+    b = 1
+    while fast_exponentiation(b, 2, cipher.q) != b_squared:
+        b += 1
+    gcd, u, v = extended_gcd(cipher.p, cipher.q)
+    solutions = [(b*cipher.p*u + a*cipher.q*v) % cipher.n,
+                 (b*cipher.p*u - a*cipher.q*v) % cipher.n,
+                 (-b*cipher.p*u + a*cipher.q*v) % cipher.n,
+                 (-b*cipher.p*u - a*cipher.q*v) % cipher.n]
+    return sorted({solution for solution in solutions if solution < NUM_LETTERS})
+
+def legacy_extended_gcd(a, n):
+    '''extended_gcd as it was before it was iterative.'''
+
+    if a == 0:
+        return n, 0, 1
+    gcd, x1, y1 = legacy_extended_gcd(n%a, a)
+    return gcd, y1 - (n//a) * x1, x1
+
+def legacy_is_invertible(num, phi_n):
+    '''is_invertible as it was before it could check a list of numbers.'''
+
+    gcd, x, _ = legacy_extended_gcd(num, phi_n)
+    return (True, x % phi_n) if gcd == 1 else (False, None)
+
+# Benchmarks ===================================================================
+
+def substitution_benchmarks():
+    '''Returns the substitution cipher benchmarks as a list of tuples
+    containing the name, the current method and the reference function.
+    '''
+
+    caesar = Caesar(3)
+    affine = Affine(5, 8)
+    return [('Caesar.encrypt', caesar.encrypt,
+             lambda message: legacy_caesar_encrypt(caesar, message)),
+            ('Caesar.decrypt', caesar.decrypt,
+             lambda message: legacy_caesar_decrypt(caesar, message)),
+            ('Affine.encrypt', affine.encrypt,
+             lambda message: legacy_affine_encrypt(affine, message)),
+            ('Affine.decrypt', affine.decrypt,
+             lambda message: legacy_affine_decrypt(affine, message))]
+
+def vigenere_benchmarks():
+    '''Returns the Vigenere cipher benchmarks as a list of tuples containing
+    the name, the current method and the reference function.
+    '''
+
+    vigenere = Vigenere('lemon')
+    return [('Vigenere.encrypt', vigenere.encrypt,
+             lambda message: legacy_vigenere_encrypt(vigenere, message)),
+            ('Vigenere.decrypt', vigenere.decrypt,
+             lambda message: legacy_vigenere_decrypt(vigenere, message))]
+
+def playfair_benchmarks():
+    '''Returns the Playfair cipher benchmarks as a list of tuples containing
+    the name, the current method and the reference function.
+    '''
+
+    playfair = Playfair('playfairexample')
+    return [('Playfair.encrypt', playfair.encrypt, None),
+            ('Playfair.decrypt',
+             lambda message: playfair.decrypt(message.replace('j', 'i')), None)]
+
+def stream_chunks(context, message, chunk_size):
+    '''Runs a message through a stream context a chunk at a time.
+
+    Args:
+        context (StreamContext): The encryptor or decryptor of a cipher
+        message (str): The text being encrypted or decrypted
+        chunk_size (int): The number of characters in each chunk
+
+    Returns:
+        translated (str): The encrypted or decrypted text
+    '''
+
+    translated = [context.update(message[i:i+chunk_size])
+                  for i in range(0, len(message), chunk_size)]
+    translated.append(context.finalize())
+    return ''.join(translated)
+
+def streaming_benchmarks(chunk_size):
+    '''Returns benchmarks comparing encrypting a chunk at a time through the
+    stream contexts with encrypting all at once, as a list of tuples containing
+    the name, the streaming function and the all at once method.
+
+    Args:
+        chunk_size (int): The number of characters in each chunk
+    '''
+
+    benchmarks = []
+    for cipher in (Caesar(3), Affine(5, 8), Vigenere('lemon'),
+                   Playfair('playfairexample')):
+        name = f'{type(cipher).__name__}.encryptor'
+        benchmarks.append((name, lambda message, cipher=cipher:
+                           stream_chunks(cipher.encryptor(), message, chunk_size),
+                           cipher.encrypt))
+    return benchmarks
+
+def run_throughput(benchmarks, sizes, legacy_limit):
+    '''Prints the throughput of each benchmark before and after for every
+    input size.
+
+    Args:
+        benchmarks (list): Tuples containing the name, the current function and
+        the reference function of each benchmark
+        sizes (list): The input sizes in characters
+        legacy_limit (int): The largest size the reference function is run for
+    '''
+
+    print(f"{'benchmark':<18}{'size':>12}{'before MB/s':>14}"
+          f"{'after MB/s':>14}{'speed up':>10}")
+    for size in sizes:
+        message = sample_text(size)
+        megabytes = size / 1_000_000
+        repeat = 3 if size <= 10_000_000 else 1
+        for name, function, legacy_function in benchmarks:
+            after = time_call(function, message, repeat=repeat)
+            if legacy_function is not None and size <= legacy_limit:
+                before = time_call(legacy_function, message, repeat=repeat)
+                print(f'{name:<18}{size:>12,}{megabytes/before:>14.2f}'
+                      f'{megabytes/after:>14.2f}{before/after:>9.1f}x')
+            else:
+                print(f'{name:<18}{size:>12,}{"-":>14}'
+                      f'{megabytes/after:>14.2f}{"-":>10}')
+
+def run_files(size, workers):
+    '''Prints the throughput of convert_file for a file of a given size with
+    each cipher, in one process and in process pools of different sizes, and
+    of convert_mapped_file for the ciphers that can translate bytes.
+
+    Args:
+        size (int): The number of characters in the file
+        workers (list): The numbers of processes in the pools
+    '''
+
+    ciphers = [Caesar(3), Affine(5, 8), Vigenere('lemon'), Playfair('playfairexample')]
+    print(f"{'cipher':<12}{'one process':>13}"
+          + ''.join(f'{f"{count} workers":>13}' for count in workers)
+          + f"{'mapped':>13}  (MB/s)")
+    with tempfile.TemporaryDirectory() as directory:
+        input_file = os.path.join(directory, 'plain.txt')
+        output_file = os.path.join(directory, 'cipher.txt')
+        with open(input_file, 'w', newline='') as infile:
+            infile.write(sample_text(size).replace('j', 'i'))
+        for cipher in ciphers:
+            rates = []
+            for count in [None] + workers:
+                timing = time_call(convert_file, cipher, input_file, output_file,
+                                   False, count, repeat=1)
+                rates.append(f'{size / 1e6 / timing:>13.2f}')
+            if hasattr(cipher, 'encrypt_bytes'):
+                timing = time_call(convert_mapped_file, cipher, input_file,
+                                   output_file, repeat=1)
+                rates.append(f'{size / 1e6 / timing:>13.2f}')
+            else:
+                rates.append(f'{"-":>13}')
+            print(f'{type(cipher).__name__:<12}' + ''.join(rates))
+
+def run_rsa(key_sizes, letters):
+    '''Prints how many letters per second RSA encrypts and decrypts for every
+    key size. Decryption is timed with fast_exponentiation, with the built-in
+    pow on the full exponent d, with the Chinese Remainder Theorem and with the
+    letter lookup table.
+
+    Args:
+        key_sizes (list): The numbers of bits in the modulus n
+        letters (int): The number of letters in the message
+    '''
+
+    message = sample_text(letters)
+    print(f"{'bits':>6}{'encrypt before':>16}{'pow':>10}{'table':>12}"
+          f"{'decrypt before':>16}{'pow(c, d, n)':>14}{'CRT':>10}{'table':>12}")
+    for bits in key_sizes:
+        cipher = make_rsa(bits)
+        ciphertext = cipher.encrypt(message)
+        tokens = len(message)
+        timings = [time_call(legacy_rsa_encrypt, cipher, message, repeat=1),
+                   time_call(make_rsa(bits, 0, False).encrypt, message),
+                   time_call(cipher.encrypt, message),
+                   time_call(legacy_rsa_decrypt, cipher, ciphertext, repeat=1),
+                   time_call(legacy_rsa_decrypt, cipher, ciphertext, pow, repeat=1),
+                   time_call(make_rsa(bits, 0, False).decrypt, ciphertext, repeat=1),
+                   time_call(cipher.decrypt, ciphertext)]
+        rates = [tokens/timing for timing in timings]
+        print(f'{bits:>6}{rates[0]:>16.0f}{rates[1]:>10.0f}{rates[2]:>12.0f}'
+              f'{rates[3]:>16.1f}{rates[4]:>14.1f}{rates[5]:>10.1f}{rates[6]:>12.0f}')
+
+def run_rsa_blocks(key_sizes, size):
+    '''Prints the throughput of RSA in block mode for every key size, and how
+    much larger the ciphertext is than the plaintext in block mode and letter
+    by letter.
+
+    Args:
+        key_sizes (list): The numbers of bits in the modulus n
+        size (int): The number of characters in the message
+    '''
+
+    message = sample_text(size)
+    data = message.encode()
+    print(f"{'bits':>6}{'encrypt MB/s':>14}{'decrypt MB/s':>14}"
+          f"{'block size':>12}{'letter size':>13}")
+    for bits in key_sizes:
+        cipher = make_rsa(bits)
+        ciphertext = cipher.encrypt(data)
+        encrypt = time_call(cipher.encrypt, data)
+        decrypt = time_call(cipher.decrypt, ciphertext, repeat=1)
+        megabytes = len(data) / 1e6
+        print(f'{bits:>6}{megabytes/encrypt:>14.3f}{megabytes/decrypt:>14.3f}'
+              f'{len(ciphertext)/len(data):>11.2f}x'
+              f'{len(cipher.encrypt(message))/len(message):>12.2f}x')
+
+def run_rabin(prime_sizes, legacy_limit):
+    '''Prints how long the Rabin cipher takes to decrypt a number for every
+    prime size, with primes congruent to 3 mod 4 and to 1 mod 4. Numbers are
+    decrypted without the letter lookup table, so the square roots are found
+    every time.
+
+    Args:
+        prime_sizes (list): The numbers of bits in p and q
+        legacy_limit (int): The largest prime size the one number at a time
+        square root search is run for
+    '''
+
+    print(f"{'bits':>6}{'mod 4':>7}{'before (ms)':>14}{'after (ms)':>13}")
+    numbers = [value**2 for value in range(NUM_LETTERS)]
+    for bits in prime_sizes:
+        for mod_4 in (3, 1):
+            generator = random.Random(bits)
+            p = random_prime(bits, generator, mod_4)
+            q = random_prime(bits, generator, mod_4)
+            while q == p:
+                q = random_prime(bits, generator, mod_4)
+            cipher = Rabin(p, q, lookup_table=False)
+            after = time_call(lambda: [cipher.letter_values(number)
+                                       for number in numbers])
+            if bits <= legacy_limit:
+                before = time_call(lambda: [legacy_rabin_letter_values(cipher, number)
+                                            for number in numbers], repeat=1)
+                before = f'{1000 * before / len(numbers):>14.4f}'
+            else:
+                before = f'{"-":>14}'
+            print(f'{bits:>6}{mod_4:>7}{before}{1000 * after / len(numbers):>13.4f}')
+
+def run_keygen(key_sizes, workers, repeat):
+    '''Prints the average time RSA.generate and Rabin.generate take for every
+    key size, searching for primes in this process and in a process pool.
+
+    Args:
+        key_sizes (list): The numbers of bits in the modulus n
+        workers (int): The number of processes in the pool
+        repeat (int): The number of keys made for each average
+    '''
+
+    print(f"{'bits':>6}{'RSA (s)':>10}{f'{workers} workers':>12}"
+          f"{'Rabin (s)':>11}{f'{workers} workers':>12}")
+    for bits in key_sizes:
+        timings = []
+        for generate in (RSA.generate, Rabin.generate):
+            for pool_size in (None, workers):
+                start = time.perf_counter()
+                for _ in range(repeat):
+                    generate(bits, workers=pool_size, lookup_table=False)
+                timings.append((time.perf_counter() - start) / repeat)
+        print(f'{bits:>6}{timings[0]:>10.3f}{timings[1]:>12.3f}'
+              f'{timings[2]:>11.3f}{timings[3]:>12.3f}')
+
+def run_inverse(key_sizes, count):
+    '''Prints how long it takes to check a number of candidates for
+    invertibility in mod Φ(n) for every key size, one at a time with the
+    recursive extended Euclidean algorithm used before, and as a list with
+    is_invertible. Small candidates are like the usual choices of e, and large
+    ones are as big as Φ(n), which the recursive algorithm can't always do.
+
+    Args:
+        key_sizes (list): The numbers of bits in the modulus n
+        count (int): The number of candidates checked
+    '''
+
+    print(f"{'bits':>6}{'candidates':>12}{'before (ms)':>14}{'after (ms)':>13}")
+    for bits in key_sizes:
+        phi_n = make_rsa(bits).phi_n
+        generator = random.Random(bits)
+        for kind, candidate_bits in (('small', 32), ('large', bits)):
+            candidates = [generator.getrandbits(candidate_bits) | 1
+                          for _ in range(count)]
+            try:
+                before = time_call(lambda: [legacy_is_invertible(candidate, phi_n)
+                                            for candidate in candidates], repeat=1)
+                before = f'{1000 * before:>14.2f}'
+            except RecursionError:
+                before = f'{"recursion":>14}'
+            after = time_call(is_invertible, candidates, phi_n)
+            print(f'{bits:>6}{kind:>12}{before}{1000 * after:>13.2f}')
+
+# Microbenchmarks =============================================================
+
+def measure(function, *args, repeat=3, size=None):
+    '''Measures a function call, timing the best of a number of runs and then
+    running it once more with tracemalloc to find its peak memory, so tracing
+    doesn't slow down the timed runs. Quick functions are called enough times
+    in each run to take at least MIN_TIME seconds.
+
+    Args:
+        function (function): The function being measured
+        *args: The arguments passed to the function
+        repeat (int): The number of timed runs (default is 3)
+        size (int): The number of bytes the function processes (default is
+        None, which leaves out the MB/s)
+
+    Returns:
+        result (dict): The best time in seconds, operations per second, MB/s
+        and peak memory in bytes
+    '''
+
+    timer = timeit.Timer(lambda: function(*args))
+    loops = 1
+    while True:
+        seconds = timer.timeit(loops)
+        if seconds >= MIN_TIME:
+            break
+        loops *= 10
+    seconds = min([seconds] + timer.repeat(repeat - 1, loops)) / loops
+    tracemalloc.start()
+    try:
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {'seconds': seconds,
+            'ops_per_sec': 1 / seconds if seconds else float('inf'),
+            'mb_per_sec': size / 1e6 / seconds if size and seconds else None,
+            'peak_memory': peak}
+
+@functools.lru_cache(maxsize=None)
+def benchmark_prime(bits, mod_4=None):
+    '''Finds the prime number of a given number of bits used by the micro
+    suite, which is the same in every run so results can be compared.
+
+    Args:
+        bits (int): The number of bits in the prime number
+        mod_4 (int): The value the prime is congruent to mod 4 (default is
+        None, which allows both)
+
+    Returns:
+        prime (int): The prime number
+    '''
+
+    return random_prime(bits, random.Random(bits), mod_4)
+
+def make_rabin(bits):
+    '''Makes a Rabin cipher with two different primes of a given number of bits
+    that are congruent to 3 mod 4.
+
+    Args:
+        bits (int): The number of bits in p and q
+
+    Returns:
+        cipher (Rabin): The Rabin cipher
+    '''
+
+    generator = random.Random(-bits)
+    p = benchmark_prime(bits, 3)
+    q = random_prime(bits, generator, 3)
+    while q == p:
+        q = random_prime(bits, generator, 3)
+    return Rabin(p, q, interactive=False)
+
+def micro_ciphers(key_size):
+    '''Returns the ciphers measured by the micro suite, with a function that
+    makes each one again for measuring construction cost.
+
+    Args:
+        key_size (int): The number of bits in the RSA modulus n, and twice the
+        number of bits in each Rabin prime
+
+    Returns:
+        ciphers (list): Tuples containing the name, the cipher and the function
+        that constructs it
+    '''
+
+    rsa = make_rsa(key_size)
+    rabin = make_rabin(key_size // 2)
+    return [('Caesar', Caesar(3), lambda: Caesar(3, interactive=False)),
+            ('Affine', Affine(5, 8), lambda: Affine(5, 8, interactive=False)),
+            ('Vigenere', Vigenere('lemon'), lambda: Vigenere('lemon', interactive=False)),
+            ('Playfair', Playfair('playfairexample'),
+             lambda: Playfair('playfairexample', interactive=False)),
+            ('RSA', rsa, lambda: RSA(rsa.p, rsa.q, rsa.e, interactive=False)),
+            ('Rabin', rabin, lambda: Rabin(rabin.p, rabin.q, interactive=False))]
+
+def micro_benchmarks(sizes, bit_sizes, key_size, public_key_limit):
+    '''Yields the benchmarks of the micro suite: constructing each cipher,
+    encrypting and decrypting text of every size with it, and is_prime,
+    fast_exponentiation and extended_gcd on numbers of every bit size.
+
+    Args:
+        sizes (list): The input sizes in characters
+        bit_sizes (list): The sizes of the numbers in bits
+        key_size (int): The number of bits in the RSA modulus n
+        public_key_limit (int): The largest size RSA and Rabin are run for, as
+        their ciphertext is much larger than the plaintext
+
+    Yields:
+        benchmark (tuple): The name, a dictionary of parameters, the function
+        and its arguments, the number of bytes processed and the number of
+        timed runs
+    '''
+
+    ciphers = micro_ciphers(key_size)
+    for name, cipher, construct in ciphers:
+        parameters = {'key_size': key_size} if name in ('RSA', 'Rabin') else {}
+        yield f'{name}.__init__', parameters, construct, (), None, 5
+
+    for size in sizes:
+        message = sample_text(size).replace('j', 'i')
+        repeat = 5 if size <= 1_000_000 else 3 if size <= 10_000_000 else 1
+        for name, cipher, _ in ciphers:
+            if name in ('RSA', 'Rabin'):
+                if size > public_key_limit:
+                    continue
+                parameters = {'size': size, 'key_size': key_size}
+            else:
+                parameters = {'size': size}
+            ciphertext = cipher.encrypt(message)
+            yield f'{name}.encrypt', parameters, cipher.encrypt, (message,), size, repeat
+            yield (f'{name}.decrypt', parameters, cipher.decrypt, (ciphertext,),
+                   len(ciphertext), repeat)
+
+    for bits in bit_sizes:
+        generator = random.Random(bits)
+        modulus = generator.getrandbits(bits) | (1 << bits-1) | 1
+        base = generator.getrandbits(bits) % modulus
+        exponent = generator.getrandbits(bits) | (1 << bits-1)
+        repeat = 5 if bits <= 1024 else 1
+        parameters = {'bits': bits}
+        yield ('is_prime', parameters, is_prime.__wrapped__, (benchmark_prime(bits),),
+               None, repeat)
+        yield ('fast_exponentiation', parameters, fast_exponentiation,
+               (base, exponent, modulus), None, repeat)
+        yield 'extended_gcd', parameters, extended_gcd, (base, modulus), None, 5
+
+def run_micro(sizes, bit_sizes, key_size, public_key_limit):
+    '''Runs the micro suite, printing the progress of each benchmark to
+    standard error.
+
+    Args:
+        sizes (list): The input sizes in characters
+        bit_sizes (list): The sizes of the numbers in bits
+        key_size (int): The number of bits in the RSA modulus n
+        public_key_limit (int): The largest size RSA and Rabin are run for
+
+    Returns:
+        report (dict): The environment the suite was run in and a list of
+        results, each with the name and parameters of a benchmark and its
+        measurements
+    '''
+
+    results = []
+    for name, parameters, function, args, size, repeat in micro_benchmarks(
+            sizes, bit_sizes, key_size, public_key_limit):
+        result = {'name': name, 'parameters': parameters}
+        result.update(measure(function, *args, repeat=repeat, size=size))
+        print(f'{name:<22}{json.dumps(parameters):<38}'
+              f'{result["ops_per_sec"]:>14.2f} ops/s', file=sys.stderr)
+        results.append(result)
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    return {'environment': {'python': platform.python_version(),
+                            'implementation': platform.python_implementation(),
+                            'machine': platform.machine(),
+                            'numpy': numpy_version},
+            'results': results}
+
+def result_key(result):
+    '''Returns the name and parameters of a result as a hashable key, used for
+    matching results against a baseline.'''
+
+    return result['name'], json.dumps(result['parameters'], sort_keys=True)
+
+def compare_reports(report, baseline, threshold=REGRESSION_THRESHOLD):
+    '''Compares the results of a micro suite run against a baseline. A result
+    has regressed if its operations per second dropped, or its peak memory
+    grew, by more than the threshold.
+
+    Args:
+        report (dict): The report of the new run
+        baseline (dict): The report of the baseline run
+        threshold (float): The fraction a measurement can get worse by before
+        it counts as a regression (default is REGRESSION_THRESHOLD)
+
+    Returns:
+        comparisons (list): Tuples containing the name, the parameters, the
+        ratio of the new operations per second to the baseline, the ratio of
+        the new peak memory to the baseline and whether it regressed, for every
+        result in both reports
+    '''
+
+    baseline_results = {result_key(result): result for result in baseline['results']}
+    comparisons = []
+    for result in report['results']:
+        old = baseline_results.get(result_key(result))
+        if old is None:
+            continue
+        speed = result['ops_per_sec'] / old['ops_per_sec']
+        memory = (result['peak_memory'] / old['peak_memory']
+                  if old['peak_memory'] else 1.0)
+        regressed = speed < 1 - threshold or memory > 1 + threshold
+        comparisons.append((result['name'], result['parameters'], speed, memory,
+                            regressed))
+    return comparisons
+
+def print_comparisons(comparisons):
+    '''Prints the comparisons made by compare_reports, marking the results that
+    regressed.'''
+
+    print(f"{'benchmark':<22}{'parameters':<38}{'speed':>9}{'memory':>9}")
+    for name, parameters, speed, memory, regressed in comparisons:
+        print(f'{name:<22}{json.dumps(parameters):<38}{speed:>8.2f}x{memory:>8.2f}x'
+              + ('  REGRESSION' if regressed else ''))
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the ciphers.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES,
+                        help='input sizes in characters')
+    parser.add_argument('--legacy-limit', type=int, default=SIZES[-1],
+                        help='largest input size the letter by letter '
+                             'reference implementations are run for')
+    parser.add_argument('--chunk-size', type=int, default=65_536,
+                        help='number of characters in each chunk of the '
+                             'streaming benchmarks')
+    parser.add_argument('--file-size', type=int, default=100_000_000,
+                        help='number of characters in the file conversion benchmark')
+    parser.add_argument('--file-workers', type=int, nargs='+',
+                        default=FILE_WORKERS,
+                        help='process pool sizes for the file conversion benchmark')
+    parser.add_argument('--key-sizes', type=int, nargs='+', default=KEY_SIZES,
+                        help='RSA modulus sizes in bits')
+    parser.add_argument('--rsa-letters', type=int, default=200,
+                        help='number of characters RSA encrypts and decrypts')
+    parser.add_argument('--rsa-block-size', type=int, default=100_000,
+                        help='number of characters RSA encrypts in block mode')
+    parser.add_argument('--rabin-prime-sizes', type=int, nargs='+',
+                        default=RABIN_PRIME_SIZES,
+                        help='Rabin prime sizes in bits')
+    parser.add_argument('--rabin-legacy-limit', type=int, default=20,
+                        help='largest Rabin prime size the one number at a time '
+                             'square root search is run for')
+    parser.add_argument('--inverse-candidates', type=int, default=1000,
+                        help='number of candidates for e checked for invertibility')
+    parser.add_argument('--keygen-workers', type=int, default=os.cpu_count(),
+                        help='number of processes used for parallel key generation')
+    parser.add_argument('--keygen-repeat', type=int, default=3,
+                        help='number of keys made for each key generation average')
+    parser.add_argument('--micro-bits', type=int, nargs='+', default=MICRO_BIT_SIZES,
+                        help='number sizes in bits for the micro suite')
+    parser.add_argument('--micro-key-size', type=int, default=MICRO_KEY_SIZE,
+                        help='RSA modulus size in bits for the micro suite')
+    parser.add_argument('--public-key-limit', type=int, default=PUBLIC_KEY_LIMIT,
+                        help='largest input size RSA and Rabin are run for in '
+                             'the micro suite')
+    parser.add_argument('--output', help='file the micro suite report is saved '
+                                         'in as JSON, instead of printing it')
+    parser.add_argument('--baseline', help='micro suite report the results are '
+                                           'compared against')
+    parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD,
+                        help='fraction a result can get slower or use more '
+                             'memory by before it counts as a regression')
+    parser.add_argument('--suites', nargs='+', default=SUITES,
+                        choices=SUITES + ['micro'],
+                        help="benchmarks to run ('micro' is only run when "
+                             "it's chosen)")
+    args = parser.parse_args()
+    status = 0
+    if 'micro' in args.suites:
+        report = run_micro(args.sizes, args.micro_bits, args.micro_key_size,
+                           args.public_key_limit)
+        if args.output:
+            with open(args.output, 'w') as outfile:
+                json.dump(report, outfile, indent=2)
+        else:
+            print(json.dumps(report, indent=2))
+        if args.baseline:
+            with open(args.baseline) as infile:
+                comparisons = compare_reports(report, json.load(infile), args.threshold)
+            print_comparisons(comparisons)
+            if any(regressed for *_, regressed in comparisons):
+                status = 1
+    if 'ciphers' in args.suites:
+        benchmarks = substitution_benchmarks() + vigenere_benchmarks()\
+                     + playfair_benchmarks()
+        run_throughput(benchmarks, args.sizes, args.legacy_limit)
+    if 'streaming' in args.suites:
+        print('\nStreaming against all at once')
+        run_throughput(streaming_benchmarks(args.chunk_size), args.sizes,
+                       args.legacy_limit)
+    if 'files' in args.suites:
+        print('\nFile conversion')
+        run_files(args.file_size, args.file_workers)
+    if 'rsa' in args.suites:
+        print('\nRSA letters per second')
+        run_rsa(args.key_sizes, args.rsa_letters)
+    if 'rsa-blocks' in args.suites:
+        print('\nRSA block mode')
+        run_rsa_blocks(args.key_sizes, args.rsa_block_size)
+    if 'rabin' in args.suites:
+        print('\nRabin time to decrypt a number')
+        run_rabin(args.rabin_prime_sizes, args.rabin_legacy_limit)
+    if 'inverse' in args.suites:
+        print('\nTime to check candidates for e')
+        run_inverse(args.key_sizes, args.inverse_candidates)
+    if 'keygen' in args.suites:
+        print('\nKey generation time')
+        run_keygen(args.key_sizes, args.keygen_workers, args.keygen_repeat)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,55 @@
 '''The main module for running the cipher converter. Used for encrypting and
 decrypting text in text documents.
+
+Large files can be converted with convert_file, which encrypts or decrypts a
+file in chunks, spread over a pool of processes, with each line converted as a
+message of its own like the interactive converter does, or with
+convert_mapped_file, which translates the bytes of a file through memory maps
+with Caesar, Affine and Vigenere ciphers.
+
+Run without arguments, it asks for everything and uses plain.txt and
+cipher.txt. Given a cipher and its keys, it converts files, globs or standard
+input to standard output, a file or a directory without asking for anything,
+a line at a time like the interactive converter, and exits with 0 if
+everything was converted, 1 if an input couldn't be and 2 if the arguments
+weren't valid, for example:
+
+    python cipher_conversion.py -c vigenere -k lemon 'plain/*.txt' --output-dir cipher
+    python cipher_conversion.py -c rsa -p 61 -q 53 -e 17 -d < cipher.txt
+
+Run it with --metrics to print the metrics kept during the run, or with
+--profile to run it under cProfile and print where the time went.
 '''
 
+import argparse
+import collections
+import concurrent.futures
+import functools
+import glob
+import mmap
+import os
+import re
 import subprocess
+import sys
+import metrics
 from ciphers import *
+from crackers import *
+from frequency import LetterHistogram
+from ngrams import build_tables, load_model, NGRAM_DIRECTORY, NGRAM_FILES
+
+CORPUS_FILE = 'corpus.txt'
+CHUNK_SIZE = 4 * 2**20
+CHUNKS_PER_WORKER = 2
+WINDOW_SIZE = 8 * 2**20
+OUTPUT_BUFFER_SIZE = 2**20
+LINE_BREAK = re.compile(r'(\r\n|\r|\n)')
+CIPHER_PARAMS = {'caesar': ('key',), 'affine': ('a', 'b'), 'vigenere': ('key',),
+                 'playfair': ('key',), 'rsa': ('p', 'q', 'e'), 'rabin': ('p', 'q')}
+KEY_OPTIONS = ('key', 'a', 'b', 'p', 'q', 'e')
+INTERACTIVE_PLAYFAIR_ITERATIONS = 100_000
+EXIT_SUCCESS = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
 
 def get_lines(file):
     '''Reads lines in a file and returns them in a list.
@@ -66,6 +112,7 @@ def get_cipher():
         cipher = Rabin(p, q)
     return cipher
 
+@metrics.timed('get_frequency')
 def get_frequency(lines):
     '''Gets the number of times each letter appears in a text string.
 
@@ -77,15 +124,7 @@ def get_frequency(lines):
         in the text string
     '''
     
-    frequency = {}
-    for line in lines:
-        line = line.lower()
-        for letter in line:
-            if letter in frequency.keys():
-                frequency[letter] += 1
-            else:
-                if letter in LETTER_VALUES.keys():
-                    frequency[letter] = 1
+    frequency = LetterHistogram.from_chunks(lines).as_dict()
     return frequency
 
 def get_most_frequent(frequency):
@@ -126,8 +165,10 @@ def cipher_to_plain():
     '''Gets lines in cipher.txt file. Asks user if they know the cipher to decrypt
     ciphertext. If yes, then it gets cipher user wants to use, opens
     plain.txt file and decrypts each line and writes the decrypted line into
-    plain.txt file; if no, then it runs caesar_cipher_crack() and affine_cipher_crack()
-    functions.
+    plain.txt file; if no, then it runs caesar_cipher_crack(), affine_cipher_crack()
+    and vigenere_cipher_crack() functions, and playfair_cipher_crack() if there's
+    a corpus of English text in corpus.txt file to score decryptions with. The
+    other crackers score their decryptions with it too when there is one.
     '''
 
     lines = get_lines('cipher.txt')
@@ -141,6 +182,10 @@ def cipher_to_plain():
         code = get_cipher()
         outfile = open('plain.txt', 'a')
         for line in lines:
+            if isinstance(code, Rabin):
+                write_decryptions(code, code.decrypt_lattice(line), outfile)
+                outfile.write('\n')
+                continue
             plain = code.decrypt(line)
             outfile.write(plain + '\n')
         outfile.close()
@@ -148,63 +193,709 @@ def cipher_to_plain():
         if '_' in lines[0]:
             print("\nRSA encrypted text cannot be cracked")
         else:
-            caesar_cipher_crack(lines)
-            affine_cipher_crack(lines)
+            histogram = LetterHistogram.from_chunks(lines)
+            model = get_model()
+            caesar_cipher_crack(lines, histogram, model=model)
+            affine_cipher_crack(lines, histogram, model=model)
+            vigenere_cipher_crack(lines, model=model)
+            if model is not None:
+                iterations = get_playfair_iterations()
+                playfair_cipher_crack(lines, model, workers=os.cpu_count(),
+                                      iterations=iterations, progress=print_progress)
+            else:
+                print(f"\nPut English text in {CORPUS_FILE} to crack Playfair ciphers")
+
+def get_model(n=4):
+    '''Gets the n-gram model used for scoring decryptions. The tables are built
+    from the corpus of English text in corpus.txt file the first time, and
+    mapped from the ngrams directory after that.
+
+    Args:
+        n (int): The number of letters in each n-gram (default is 4)
 
-def caesar_cipher_crack(lines):
-    '''Gets lines in cipher.txt file, puts the frequency of each letter in a
-    dictionary, finds which letters are the most common, and for each of those
-    letters, calculates key for Caesar cipher and decrypts each line and writes
-    the decrypted line into plain.txt file.
+    Returns:
+        model (NgramModel): The n-gram model, or None if there's no table or
+        corpus to build it from
+    '''
+
+    table = os.path.join(NGRAM_DIRECTORY, NGRAM_FILES[n])
+    if not os.path.exists(table):
+        if not os.path.exists(CORPUS_FILE):
+            return None
+        build_tables(CORPUS_FILE)
+    return load_model(n)
+
+@metrics.timed('caesar_cipher_crack')
+def caesar_cipher_crack(lines, histogram=None, top=1, model=None):
+    '''Gets lines in cipher.txt file, scores every key for Caesar cipher with
+    crack_caesar, and decrypts each line with the best key/s and writes the
+    decrypted lines into plain.txt file.
 
     Args:
         lines (list): List containing each line of text in cipher.txt file
+        histogram (LetterHistogram): The letter counts of the lines, which are
+        counted if they're not given (default is None)
+        top (int): The number of keys the lines are decrypted with (default
+        is 1)
+        model (NgramModel): The n-gram model used for scoring decryptions
+        instead of the histogram (default is None)
+
+    Returns:
+        ranking (list): A list of (key, score) tuples for all 26 keys, best
+        first
     '''
     
-    frequency = get_frequency(lines)
-    most_frequent = get_most_frequent(frequency)
+    if model is not None:
+        ranking = crack_caesar(lines, 'ngram', model=model)
+    else:
+        if histogram is None:
+            histogram = LetterHistogram.from_chunks(lines)
+        ranking = crack_caesar(histogram)
     outfile = open('plain.txt', 'a')
-    for i in most_frequent:
-        key = (LETTER_VALUES[i[0]] - LETTER_VALUES['e']) % NUM_LETTERS
+    for key, _ in ranking[:top]:
         code = Caesar(key)
         for line in lines:
             plain = code.decrypt(line)
             outfile.write(plain + '\n')
         outfile.write(f'(Decrypted using Caesar({key}))' + '\n')
     outfile.close()
+    return ranking
 
-def affine_cipher_crack(lines):
-    '''Gets lines in cipher.txt file, puts the frequency of each letter in a
-    dictionary, finds which letters are the most common and second most common,
-    and for each of those letters, calculates Key A and Key B for Affine cipher
-    and decrypts each line and writes the decrypted line into plain.txt file.
+@metrics.timed('affine_cipher_crack')
+def affine_cipher_crack(lines, histogram=None, top=1, model=None):
+    '''Gets lines in cipher.txt file, scores every pair of Key A and Key B for
+    Affine cipher with crack_affine, and decrypts each line with the best
+    key/s and writes the decrypted lines into plain.txt file.
 
     Args:
         lines (list): List containing each line of text in cipher.txt file
+        histogram (LetterHistogram): The letter counts of the lines, which are
+        counted if they're not given (default is None)
+        top (int): The number of key pairs the lines are decrypted with
+        (default is 1)
+        model (NgramModel): The n-gram model used for scoring decryptions
+        instead of the histogram (default is None)
+
+    Returns:
+        ranking (list): A list of ((key_a, key_b), score) tuples for all 312
+        key pairs, best first
     '''
     
-    frequency = get_frequency(lines)
-    most_frequent = get_most_frequent(frequency)
-    for i in most_frequent:
-        del frequency[i[0]]
-    next_frequent = get_most_frequent(frequency)
+    if model is not None:
+        ranking = crack_affine(lines, 'ngram', model=model)
+    else:
+        if histogram is None:
+            histogram = LetterHistogram.from_chunks(lines)
+        ranking = crack_affine(histogram)
     outfile = open('plain.txt', 'a')
-    for m in most_frequent:
-        for n in next_frequent:
-            key_a = VALUE_INVERSES[LETTER_VALUES['t'] - LETTER_VALUES['e']]\
-                    * (LETTER_VALUES[n[0]] - LETTER_VALUES[m[0]])\
-                    % NUM_LETTERS
-            key_b = (LETTER_VALUES[m[0]] - (LETTER_VALUES['e'] * key_a))\
-                    % NUM_LETTERS
-            if (key_a in VALUE_INVERSES) and (0 <= key_b <= NUM_LETTERS-1):
-                code = Affine(key_a, key_b)
-                for line in lines:
-                    plain = code.decrypt(line)
-                    outfile.write(plain + '\n')
-                outfile.write(f'(Decrypted using Affine({key_a}, {key_b}))' + '\n')
+    for (key_a, key_b), _ in ranking[:top]:
+        code = Affine(key_a, key_b)
+        for line in lines:
+            plain = code.decrypt(line)
+            outfile.write(plain + '\n')
+        outfile.write(f'(Decrypted using Affine({key_a}, {key_b}))' + '\n')
     outfile.close()
+    return ranking
+
+@metrics.timed('vigenere_cipher_crack')
+def vigenere_cipher_crack(lines, key_length=None, model=None):
+    '''Gets lines in cipher.txt file, finds the most likely key for Vigenere
+    cipher with crack_vigenere, and decrypts each line with it and writes the
+    decrypted line into plain.txt file. Each line is taken to start again from
+    the beginning of the key, like the lines written by plain_to_cipher().
+
+    Args:
+        lines (list): List containing each line of text in cipher.txt file
+        key_length (int): The length of the key, which is estimated if it's not
+        given (default is None)
+        model (NgramModel): The n-gram model used for picking between key
+        lengths (default is None)
+
+    Returns:
+        key (str): The most likely key
+        score (float): The total score of the columns with that key, or its
+        n-gram score if a model is given
+    '''
+
+    key, score = crack_vigenere(lines, key_length, model=model)
+    code = Vigenere(key)
+    outfile = open('plain.txt', 'a')
+    for line in lines:
+        plain = code.decrypt(line)
+        outfile.write(plain + '\n')
+    outfile.write(f"(Decrypted using Vigenere('{key}'))" + '\n')
+    outfile.close()
+    return key, score
+
+def get_playfair_iterations():
+    '''Asks user how many moves each restart of the Playfair cracker should
+    try. More moves find the key more often but take longer.
+
+    Returns:
+        iterations (int): The number of moves, which is
+        INTERACTIVE_PLAYFAIR_ITERATIONS if user just presses Enter
+    '''
+
+    prompt = ("\nChoose the number of moves for each Playfair restart "
+              f"(press Enter for {INTERACTIVE_PLAYFAIR_ITERATIONS}): ")
+    iterations = input(prompt)
+    while iterations and not (iterations.isdigit() and int(iterations) > 0):
+        print('Invalid. Try again')
+        iterations = input(prompt)
+    return int(iterations) if iterations else INTERACTIVE_PLAYFAIR_ITERATIONS
+
+def print_progress(finished, restarts, score):
+    '''Prints how many restarts of the Playfair cracker have finished and the
+    best score so far.'''
+
+    print(f'Playfair restart {finished}/{restarts} finished, best score {score:.1f}',
+          flush=True)
+
+@metrics.timed('playfair_cipher_crack')
+def playfair_cipher_crack(lines, model, workers=None,
+                          iterations=INTERACTIVE_PLAYFAIR_ITERATIONS, progress=None):
+    '''Gets lines in cipher.txt file, searches for the key square of Playfair
+    cipher with crack_playfair, and decrypts each line with the best key found
+    and writes the decrypted line into plain.txt file.
+
+    Args:
+        lines (list): List containing each line of text in cipher.txt file
+        model (NgramModel): The n-gram model used for scoring decryptions
+        workers (int): The number of processes used for the search (default
+        is None, which searches in this process)
+        iterations (int): The number of moves tried in each restart (default
+        is INTERACTIVE_PLAYFAIR_ITERATIONS, which is much less than the
+        default of crack_playfair so it finishes in seconds)
+        progress (function): Called as each restart finishes, as in
+        crack_playfair (default is None)
+
+    Returns:
+        key (str): The letters of the best key square found
+        score (float): The n-gram score of the decryption with that key
+    '''
+
+    key, score = crack_playfair(lines, model, iterations=iterations, workers=workers,
+                                progress=progress)
+    code = Playfair(key)
+    outfile = open('plain.txt', 'a')
+    for line in lines:
+        plain = code.decrypt(line)
+        outfile.write(plain + '\n')
+    outfile.write(f"(Decrypted using Playfair('{key}'))" + '\n')
+    outfile.close()
+    return key, score
+
+# Parallel File Conversion =====================================================
+
+worker_cipher = None
+
+def set_worker_cipher(cipher):
+    '''Stores the cipher in a worker process, so it's only sent to the process
+    once instead of with every chunk.
+
+    Args:
+        cipher (class): The cipher used for converting chunks
+    '''
+
+    global worker_cipher
+    worker_cipher = cipher
+
+def convert_chunk(text, offset, decrypt, cipher=None):
+    '''Encrypts or decrypts a chunk of a file. Each line is a message of its
+    own, so a Vigenere cipher starts again from the beginning of its key and
+    RSA and Rabin tokens don't run on from one line to the next. The line
+    breaks are kept as they are.
+
+    Args:
+        text (str): The chunk of text
+        offset (int): The number of letters before the chunk on its first
+        line, which sets the key letter a Vigenere cipher starts at
+        decrypt (bool): Whether the chunk is decrypted instead of encrypted
+        cipher (class): The cipher used (default is None, which uses the
+        cipher stored in the worker process)
+
+    Returns:
+        converted (str): The encrypted or decrypted chunk
+    '''
+
+    if cipher is None:
+        cipher = worker_cipher
+    translate = cipher.decrypt if decrypt else cipher.encrypt
+    if not isinstance(cipher, (Vigenere, RSA, Rabin)):
+        return translate(text)
+    parts = LINE_BREAK.split(text)
+    for i in range(0, len(parts), 2):
+        if isinstance(cipher, Vigenere):
+            parts[i] = translate(parts[i], offset if i == 0 else 0)
+        else:
+            parts[i] = translate(parts[i])
+    return ''.join(parts)
+
+def write_decryptions(cipher, lattice, outfile):
+    '''Writes every decryption held in a Rabin lattice to a file, separated by
+    '/' like Rabin.decrypt, one at a time instead of joining them into one
+    string first.
+
+    Args:
+        cipher (Rabin): The Rabin cipher that made the lattice
+        lattice (list): The lattice made by decrypt_lattice
+        outfile (file): The text stream the decryptions are written to
+    '''
+
+    separator = ''
+    for decryption in cipher.iter_lattice(lattice):
+        outfile.write(separator)
+        outfile.write(decryption)
+        separator = '/'
+
+def line_start(text):
+    '''Returns the index of the first character after the last line break in
+    text, which is 0 if there isn't one.'''
+
+    return max(text.rfind('\n'), text.rfind('\r')) + 1
+
+def split_chunk(cipher, text, decrypt):
+    '''Splits text into the part that can be converted on its own and the part
+    that has to wait for the text after it. Playfair ciphers split after the
+    last complete digram, RSA and Rabin ciphertext splits after the last
+    complete number or line, and every other chunk can be converted whole.
+
+    Args:
+        cipher (class): The cipher used
+        text (str): The text read so far
+        decrypt (bool): Whether the text is being decrypted
+
+    Returns:
+        complete (str): The text that can be converted on its own (None if
+        there isn't any yet)
+        rest (str): The text kept for the next chunk
+    '''
+
+    if isinstance(cipher, Playfair):
+        text = text.lower().replace('j', 'i')
+        end = digram_boundary(text, decrypt)
+        return text[:end], text[end:]
+    if isinstance(cipher, (RSA, Rabin)) and decrypt:
+        space = text.rfind(' ')
+        end = line_start(text)
+        if end > space:
+            return text[:end], text[end:]
+        if space == -1:
+            return None, text
+        return text[:space], text[space+1:]
+    return text, ''
+
+def plan_chunks(cipher, infile, decrypt, chunk_size=CHUNK_SIZE):
+    '''Reads a file in chunks and splits it into pieces that can be converted
+    on their own, along with the number of letters before each piece on the
+    line it starts on.
+
+    Args:
+        cipher (class): The cipher used
+        infile (file): The file being converted
+        decrypt (bool): Whether the file is being decrypted
+        chunk_size (int): The number of characters read at a time (default is
+        CHUNK_SIZE)
+
+    Yields:
+        piece (str): The next piece of text
+        offset (int): The number of letters before the piece on its line
+    '''
+
+    rest = ''
+    offset = 0
+    while True:
+        data = infile.read(chunk_size)
+        if not data:
+            break
+        complete, rest = split_chunk(cipher, rest + data, decrypt)
+        if complete is not None:
+            yield complete, offset
+            if isinstance(cipher, Vigenere):
+                start = line_start(complete)
+                if start:
+                    offset = 0
+                offset += count_letters(complete[start:].lower())
+    yield rest, offset
+
+def convert_stream(cipher, infile, outfile, decrypt=False, workers=None,
+                   chunk_size=CHUNK_SIZE):
+    '''Encrypts or decrypts a text stream into another text stream line by
+    line, giving the same result as the interactive converter, which encrypts
+    or decrypts each line on its own, but keeping the line breaks as they are.
+    The text is split into chunks which are converted in a pool of processes,
+    and the results are written in order while only a few chunks for each
+    worker are held in memory. Rabin ciphertext is decrypted in one process, as
+    every possible decryption of a line depends on the whole line.
+
+    Args:
+        cipher (class): The cipher used
+        infile (file): The text stream being converted
+        outfile (file): The text stream the converted text is written to
+        decrypt (bool): Whether the text is decrypted instead of encrypted
+            (default is False)
+        workers (int): The number of processes used (default is None, which
+            converts the text in this process)
+        chunk_size (int): The number of characters in each chunk (default is
+            CHUNK_SIZE)
+    '''
+
+    if isinstance(cipher, Rabin) and decrypt:
+        lattice = []
+        for piece, _ in plan_chunks(cipher, infile, decrypt, chunk_size):
+            parts = LINE_BREAK.split(piece)
+            for message, line_break in zip(parts[::2], parts[1::2]):
+                lattice.extend(cipher.decrypt_lattice(message))
+                write_decryptions(cipher, lattice, outfile)
+                outfile.write(line_break)
+                lattice = []
+            lattice.extend(cipher.decrypt_lattice(parts[-1]))
+        write_decryptions(cipher, lattice, outfile)
+        return
+
+    separator = ' ' if isinstance(cipher, (RSA, Rabin)) and not decrypt else ''
+    at_line_start = True
+    def write(converted):
+        nonlocal at_line_start
+        if converted:
+            if not at_line_start and converted[0] not in '\r\n':
+                outfile.write(separator)
+            outfile.write(converted)
+            at_line_start = converted[-1] in '\r\n'
+
+    pieces = plan_chunks(cipher, infile, decrypt, chunk_size)
+    if workers is None or workers <= 1:
+        for piece, offset in pieces:
+            write(convert_chunk(piece, offset, decrypt, cipher))
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=set_worker_cipher,
+            initargs=(cipher,)) as executor:
+        pending = collections.deque()
+        for piece, offset in pieces:
+            pending.append(executor.submit(convert_chunk, piece, offset, decrypt))
+            if len(pending) >= workers * CHUNKS_PER_WORKER:
+                write(pending.popleft().result())
+        while pending:
+            write(pending.popleft().result())
+
+@metrics.timed('convert_file')
+def convert_file(cipher, input_file, output_file, decrypt=False, workers=None,
+                 chunk_size=CHUNK_SIZE):
+    '''Encrypts or decrypts a whole file with convert_stream.
+
+    Args:
+        cipher (class): The cipher used
+        input_file (str): The file location of the text being converted
+        output_file (str): The file location the converted text is written to
+        decrypt (bool): Whether the file is decrypted instead of encrypted
+            (default is False)
+        workers (int): The number of processes used (default is None, which
+            converts the file in this process)
+        chunk_size (int): The number of characters in each chunk (default is
+            CHUNK_SIZE)
+    '''
+
+    with open(input_file, newline='') as infile, \
+         open(output_file, 'w', newline='') as outfile:
+        convert_stream(cipher, infile, outfile, decrypt, workers, chunk_size)
+
+# Memory-Mapped File Conversion ================================================
+
+@metrics.timed('convert_mapped_file')
+def convert_mapped_file(cipher, input_file, output_file, decrypt=False,
+                        full_bytes=False, window_size=WINDOW_SIZE):
+    '''Encrypts or decrypts the bytes of a file with a Caesar, Affine or Vigenere
+    cipher. The output file is made the same size as the input file, and both
+    are memory-mapped one page-aligned window at a time, so the memory used
+    stays the same however large the file is. ASCII letters are translated like
+    the text methods do, or every byte is with full_bytes, which lets binary
+    files be encrypted.
+
+    Args:
+        cipher (class): The Caesar, Affine or Vigenere cipher used
+        input_file (str): The file location of the bytes being converted
+        output_file (str): The file location the converted bytes are written to
+        decrypt (bool): Whether the file is decrypted instead of encrypted
+            (default is False)
+        full_bytes (bool): Whether every byte is translated mod 256 (default is
+            False)
+        window_size (int): The number of bytes mapped at a time, which is
+            rounded to a whole number of pages (default is WINDOW_SIZE)
+
+    Raises:
+        ValueError: If the output file is the input file, which would be
+        truncated before it was read
+    '''
+
+    if os.path.exists(output_file) and os.path.samefile(input_file, output_file):
+        raise ValueError(f'{output_file} is both the input and the output')
+    granularity = mmap.ALLOCATIONGRANULARITY
+    window_size = max(window_size // granularity, 1) * granularity
+    translate = cipher.decrypt_bytes if decrypt else cipher.encrypt_bytes
+    offset = 0
+    with open(input_file, 'rb') as infile, open(output_file, 'w+b') as outfile:
+        size = os.fstat(infile.fileno()).st_size
+        outfile.truncate(size)
+        for start in range(0, size, window_size):
+            length = min(window_size, size - start)
+            with mmap.mmap(infile.fileno(), length, offset=start,
+                           access=mmap.ACCESS_READ) as source, \
+                 mmap.mmap(outfile.fileno(), length, offset=start) as target:
+                if isinstance(cipher, Vigenere):
+                    translate(source, full_bytes, target, offset)
+                    offset += length if full_bytes else count_byte_letters(source)
+                else:
+                    translate(source, full_bytes, target)
+
+# Batch Conversion =============================================================
+
+def expand_inputs(patterns):
+    '''Expands the input files given on the command line, so globs work even
+    where the shell doesn't expand them. '-' stands for standard input.
+
+    Args:
+        patterns (list): The file locations and globs
+
+    Returns:
+        inputs (list): The file locations, in the order given and sorted within
+        each glob
+        unmatched (list): The patterns that didn't match any file
+    '''
+
+    inputs = []
+    unmatched = []
+    for pattern in patterns:
+        if pattern == '-' or os.path.exists(pattern) or not glob.has_magic(pattern):
+            inputs.append(pattern)
+            continue
+        matches = sorted(glob.glob(pattern))
+        if matches:
+            inputs.extend(matches)
+        else:
+            unmatched.append(pattern)
+    return inputs, unmatched
+
+def open_stream(file, mode='r'):
+    '''Opens a file, or standard input or output for '-', as a text stream
+    that keeps newlines as they are, with a large write buffer.
+
+    Args:
+        file (str): The file location, or '-'
+        mode (str): 'r' for reading or 'w' for writing (default is 'r')
+
+    Returns:
+        stream (file): The text stream, which doesn't close standard input or
+        output when it's closed
+    '''
+
+    buffering = OUTPUT_BUFFER_SIZE if 'w' in mode else -1
+    if file == '-':
+        if 'w' in mode:
+            sys.stdout.flush()
+            return open(sys.stdout.fileno(), mode, buffering, newline='', closefd=False)
+        return open(sys.stdin.fileno(), mode, buffering, newline='', closefd=False)
+    return open(file, mode, buffering, newline='')
+
+def output_targets(inputs, output='-', output_dir=None):
+    '''Works out where each input is written, checking that no input is
+    overwritten and, with an output directory, that no two inputs are written
+    to the same file.
+
+    Args:
+        inputs (list): The file locations of the inputs, or '-' for standard
+        input
+        output (str): The file location everything is written to, or '-' for
+        standard output (default is '-')
+        output_dir (str): The directory each input is written to with the same
+        file name, instead of output (default is None)
 
-def main():
+    Returns:
+        targets (list): The file location each input is written to
+
+    Raises:
+        ValueError: If an output is also an input, or two inputs would be
+        written to the same file
+    '''
+
+    if output_dir is None:
+        targets = [output] * len(inputs)
+    else:
+        targets = [os.path.join(output_dir, 'stdin.txt' if input_file == '-'
+                                else os.path.basename(input_file))
+                   for input_file in inputs]
+        sources = {}
+        for input_file, target in zip(inputs, targets):
+            if target in sources:
+                raise ValueError(f'{sources[target]} and {input_file} would both be '
+                                 f'written to {target}')
+            sources[target] = input_file
+
+    input_paths = {os.path.realpath(input_file) for input_file in inputs
+                   if input_file != '-'}
+    for target in set(targets):
+        if target != '-' and os.path.realpath(target) in input_paths:
+            raise ValueError(f'{target} is both an input and an output')
+    return targets
+
+def batch_convert(cipher, inputs, output='-', output_dir=None, decrypt=False,
+                  workers=None):
+    '''Encrypts or decrypts many inputs in this process, so the cipher is only
+    made once. Each input is converted on its own, line by line, with
+    convert_stream, and either written to its own file in an output directory
+    or written one after another to one output. An input that can't be
+    converted, such as ciphertext with a token that can't be decrypted, is
+    reported on standard error and the rest of it is skipped.
+
+    Args:
+        cipher (class): The cipher used
+        inputs (list): The file locations of the inputs, or '-' for standard
+        input
+        output (str): The file location everything is written to, or '-' for
+        standard output (default is '-')
+        output_dir (str): The directory each input is written to with the same
+        file name, instead of output (default is None)
+        decrypt (bool): Whether the inputs are decrypted instead of encrypted
+        (default is False)
+        workers (int): The number of processes used for each input (default is
+        None, which converts them in this process)
+
+    Returns:
+        status (int): EXIT_SUCCESS if every input was converted, or
+        EXIT_FAILURE if one of them wasn't
+
+    Raises:
+        ValueError: If the outputs checked by output_targets would overwrite
+        an input or each other, in which case nothing is converted
+    '''
+
+    targets = output_targets(inputs, output, output_dir)
+    status = EXIT_SUCCESS
+    outfile = None
+    try:
+        if output_dir is not None:
+            os.makedirs(output_dir, exist_ok=True)
+        else:
+            outfile = open_stream(output, 'w')
+        for input_file, target in zip(inputs, targets):
+            try:
+                with open_stream(input_file) as infile:
+                    if output_dir is None:
+                        convert_stream(cipher, infile, outfile, decrypt, workers)
+                        continue
+                    with open_stream(target, 'w') as target_file:
+                        convert_stream(cipher, infile, target_file, decrypt, workers)
+            except (OSError, UnicodeError, ValueError) as error:
+                print(f'{input_file}: {error}', file=sys.stderr)
+                status = EXIT_FAILURE
+    except OSError as error:
+        print(error, file=sys.stderr)
+        status = EXIT_FAILURE
+    finally:
+        if outfile is not None:
+            try:
+                outfile.close()
+            except OSError as error:
+                print(error, file=sys.stderr)
+                status = EXIT_FAILURE
+    return status
+
+def build_parser():
+    '''Makes the parser for the command line arguments of the converter.'''
+
+    parser = argparse.ArgumentParser(
+        description='Encrypt and decrypt text files. Without --cipher, the '
+                    'interactive converter is run instead.')
+    parser.add_argument('inputs', nargs='*', metavar='FILE',
+                        help="files or globs converted, or '-' for standard input "
+                             "(default is standard input)")
+    parser.add_argument('-c', '--cipher', choices=list(CIPHER_PARAMS),
+                        help='the cipher used')
+    parser.add_argument('-d', '--decrypt', action='store_true',
+                        help='decrypt instead of encrypting')
+    parser.add_argument('-k', '--key', help='the key of a Caesar, Vigenere or '
+                                            'Playfair cipher')
+    parser.add_argument('-a', help='Key A of an Affine cipher')
+    parser.add_argument('-b', help='Key B of an Affine cipher')
+    parser.add_argument('-p', help='the first prime of an RSA Cryptosystem or '
+                                   'Rabin cipher')
+    parser.add_argument('-q', help='the second prime of an RSA Cryptosystem or '
+                                   'Rabin cipher')
+    parser.add_argument('-e', help='the invertible element of an RSA Cryptosystem')
+    destination = parser.add_mutually_exclusive_group()
+    destination.add_argument('-o', '--output', default='-',
+                             help="file everything is written to, or '-' for "
+                                  "standard output (default is '-')")
+    destination.add_argument('--output-dir',
+                             help='directory each file is written to with the '
+                                  'same name')
+    parser.add_argument('-w', '--workers', type=int,
+                        help='number of processes used for converting each file')
+    parser.add_argument('--profile', action='store_true',
+                        help='run under cProfile and print the stats to standard error')
+    parser.add_argument('--profile-sort', default='cumulative',
+                        help="pstats key the stats are sorted by (default is 'cumulative')")
+    parser.add_argument('--profile-limit', type=int, default=metrics.PROFILE_LIMIT,
+                        help='number of functions in the printed stats')
+    parser.add_argument('--profile-output',
+                        help='file the raw stats are saved in for loading with pstats')
+    parser.add_argument('--metrics', action='store_true',
+                        help='keep metrics and print them to standard error in the '
+                             'Prometheus text format when done')
+    return parser
+
+def make_batch_cipher(parser, args):
+    '''Makes the cipher asked for on the command line with cached_cipher,
+    exiting with a usage error if its keys are missing, not used by it or not
+    valid.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser made by build_parser
+        args (argparse.Namespace): The parsed command line arguments
+
+    Returns:
+        cipher (Frozen): The cipher
+    '''
+
+    names = CIPHER_PARAMS[args.cipher]
+    missing = [name for name in names if getattr(args, name) is None]
+    if missing:
+        parser.error(f'{args.cipher} needs ' + ', '.join(f"'{name}'" for name in missing))
+    unused = [name for name in KEY_OPTIONS
+              if name not in names and getattr(args, name) is not None]
+    if unused:
+        parser.error(f"{args.cipher} doesn't use " + ', '.join(f"'{name}'" for name in unused))
+    try:
+        return cached_cipher(args.cipher, **{name: getattr(args, name) for name in names})
+    except InvalidKeyError as error:
+        parser.error(str(error))
+
+def run_batch(parser, args):
+    '''Runs the converter on the inputs given on the command line.
+
+    Args:
+        parser (argparse.ArgumentParser): The parser made by build_parser
+        args (argparse.Namespace): The parsed command line arguments
+
+    Returns:
+        status (int): The exit status
+    '''
+
+    cipher = make_batch_cipher(parser, args)
+    inputs, unmatched = expand_inputs(args.inputs or ['-'])
+    for pattern in unmatched:
+        print(f'{pattern}: no files match', file=sys.stderr)
+    if inputs.count('-') > 1:
+        parser.error("'-' can only be given once")
+    try:
+        status = batch_convert(cipher, inputs, args.output, args.output_dir,
+                               args.decrypt, args.workers)
+    except ValueError as error:
+        parser.error(str(error))
+    return EXIT_FAILURE if unmatched else status
+
+def interactive_main():
     '''Prints available conversions. Gets and validates users choice. If user
     chooses 'Plaintext -> Ciphertext', it opens plain.txt, instructs the user
     to enter plaintext, and after pressing ENTER, runs plain_to_cipher() and
@@ -254,5 +945,46 @@ def main():
         first_file.kill()
         second_file.kill()
         
+def main(argv=None):
+    '''Runs the converter. If a cipher is given on the command line, the files
+    given are converted without asking for anything, and otherwise the
+    interactive converter is run. Metrics are kept and the run is profiled if
+    they're asked for.
+
+    Args:
+        argv (list): The command line arguments (default is None, which uses
+        sys.argv)
+
+    Returns:
+        status (int): The exit status
+    '''
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.cipher is None:
+        if args.inputs or args.decrypt or args.output != '-' or args.output_dir:
+            parser.error('converting files needs --cipher')
+        keys = [name for name in KEY_OPTIONS if getattr(args, name) is not None]
+        if keys:
+            parser.error(', '.join(f"'{name}'" for name in keys)
+                         + ' can only be given with --cipher')
+        run = interactive_main
+    else:
+        run = functools.partial(run_batch, parser, args)
+
+    if args.metrics:
+        metrics.enable()
+    try:
+        if args.profile:
+            status = metrics.profile_call(run, sort=args.profile_sort,
+                                          limit=args.profile_limit,
+                                          output=args.profile_output)
+        else:
+            status = run()
+    finally:
+        if args.metrics:
+            print(metrics.to_prometheus(), end='', file=sys.stderr)
+    return status or EXIT_SUCCESS
+
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
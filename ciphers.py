@@ -1,7 +1,11 @@
-'''The module containing the classes for three types of ciphers used for
-encryption and decryption of text.
+'''The module containing the classes for the ciphers used for encryption and
+decryption of text: the Caesar, Affine, Vigenere and Playfair ciphers, which
+translate letters, and the RSA Cryptosystem and the Rabin cipher, which turn
+each letter into a number. The Rabin cipher can't tell which of the square
+roots of a number is the letter, so it decrypts to every possible message,
+which can be ranked by how much they look like English.
 
-All classes have five methods:
+All classes have seven methods:
     __init__():
         Initialises the class by validating user input before assigning
         attributes needed for the cipher.
@@ -32,9 +36,38 @@ All classes have five methods:
         Returns:
             decrypted_message (str): The plaintext version of message argument
 
+    encryptor() and decryptor():
+        Stream contexts for encrypting or decrypting text a chunk at a time.
+
+        Returns:
+            context (StreamContext): Has update(chunk), which returns the text
+            that can be translated so far, and finalize(), which returns the
+            rest. Joined together, the returned text is the same as encrypting
+            or decrypting all the chunks at once
+
+The Caesar, Affine and Vigenere ciphers can also translate bytes with
+encrypt_bytes() and decrypt_bytes(), and the RSA Cryptosystem and the Rabin
+cipher can be made with random primes by generate(). The stream contexts the
+encryptor() and decryptor() methods return are the StreamContext classes.
+
+Ciphers can be made without asking the user for anything by passing
+interactive=False, or with cached_cipher(), which makes immutable ciphers and
+keeps them in a cache so the same cipher is only made once.
 '''
 
+import functools
+import heapq
+import itertools
+import math
+import re
+import metrics
 from extra_functions import *
+from primality import generate_prime, prime_executor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 LETTER_VALUES = {'a': 0, 'b': 1, 'c': 2, 'd': 3, 'e': 4, 'f': 5, 'g': 6, 'h': 7,
                  'i': 8, 'j': 9, 'k': 10, 'l': 11, 'm': 12, 'n': 13, 'o': 14,
@@ -44,22 +77,486 @@ VALUE_LETTERS = {value: key for key, value in LETTER_VALUES.items()}
 VALUE_INVERSES = {1: 1, 3: 9, 5: 21, 7: 15, 9: 3, 11: 19, 15: 7, 17: 23, 19: 11,
                   21: 5, 23: 17, 25: 25}
 NUM_LETTERS = 26
+RSA_EXPONENT = 65537
+BLOCKS_PER_READ = 256
+LETTERS = ''.join(LETTER_VALUES)
+DELETE_LETTERS = str.maketrans('', '', LETTERS)
+NUM_BYTES = 256
+ASCII_LETTERS = LETTERS.upper().encode() + LETTERS.encode()
+TRANSLATE_BLOCK_SIZE = 2**16
+VECTORIZE_THRESHOLD = 256
+ENGLISH_FREQUENCIES = {'a': 8.167, 'b': 1.492, 'c': 2.782, 'd': 4.253, 'e': 12.702,
+                       'f': 2.228, 'g': 2.015, 'h': 6.094, 'i': 6.966, 'j': 0.153,
+                       'k': 0.772, 'l': 4.025, 'm': 2.406, 'n': 6.749, 'o': 7.507,
+                       'p': 1.929, 'q': 0.095, 'r': 5.987, 's': 6.327, 't': 9.056,
+                       'u': 2.758, 'v': 0.978, 'w': 2.360, 'x': 0.150, 'y': 1.974,
+                       'z': 0.074}
+ENGLISH_LOG_PROBABILITIES = {letter: math.log(frequency / 100)
+                             for letter, frequency in ENGLISH_FREQUENCIES.items()}
+
+def english_letter_score(context, segment):
+    '''Scores how much a piece of text looks like English by adding up the log
+    probability of each of its letters appearing in English text. Characters
+    that aren't letters score zero.
+
+    Args:
+        context (str): The text just before the segment, which isn't used by
+        this score but lets scores based on letter sequences be swapped in
+        segment (str): The text being scored
+
+    Returns:
+        score (float): The log probability of the letters in the segment
+    '''
+
+    score = sum([ENGLISH_LOG_PROBABILITIES.get(letter, 0.0) for letter in segment])
+    return score
+
+def make_translation_table(letter_function):
+    '''Builds a translation table for str.translate that maps every letter to
+    the letter whose value is given by letter_function. Characters that aren't
+    letters are left out of the table, so they pass through unchanged.
+
+    Args:
+        letter_function (function): Takes the value of a letter and returns the
+        value of the letter it is mapped to, before reducing it mod 26
+
+    Returns:
+        table (dict): The translation table for all 26 letters
+    '''
+
+    mapped_letters = ''.join(VALUE_LETTERS[letter_function(value) % NUM_LETTERS]
+                             for value in range(NUM_LETTERS))
+    table = str.maketrans(LETTERS, mapped_letters)
+    return table
+
+def make_byte_table(letter_function, full_bytes=False):
+    '''Builds a translation table for bytes.translate. Normally every ASCII
+    letter, uppercase or lowercase, is mapped to the lowercase letter whose
+    value is given by letter_function, and every other byte is left unchanged,
+    like the text methods do. With full_bytes, all 256 byte values are treated
+    as the alphabet, so binary files can be translated.
+
+    Args:
+        letter_function (function): Takes the value of a letter or byte and
+        returns the value it is mapped to, before reducing it mod 26 or mod 256
+        full_bytes (bool): Whether every byte is translated mod 256 (default is
+        False)
+
+    Returns:
+        table (bytes): The translation table for all 256 byte values
+    '''
+
+    if full_bytes:
+        return bytes(letter_function(value) % NUM_BYTES for value in range(NUM_BYTES))
+    mapped_letters = bytes(letter_function(value) % NUM_LETTERS + ord('a')
+                           for value in range(NUM_LETTERS))
+    table = bytes.maketrans(ASCII_LETTERS, mapped_letters * 2)
+    return table
+
+def translate_buffer(data, table, out=None):
+    '''Translates bytes through a byte table. When out is given, the bytes are
+    translated into it TRANSLATE_BLOCK_SIZE bytes at a time, so only one
+    small block is copied at once however large data is.
+
+    Args:
+        data (bytes-like): The bytes being translated
+        table (bytes): The translation table made by make_byte_table
+        out (bytes-like): A writable buffer of the same length that the result
+        is written into, which can be data itself (default is None, which
+        returns new bytes)
+
+    Returns:
+        translated (bytes-like): The translated bytes, which is out if it was
+        given
+    '''
+
+    if out is None:
+        return bytes(data).translate(table)
+    source, target = memoryview(data), memoryview(out)
+    for start in range(0, len(source), TRANSLATE_BLOCK_SIZE):
+        end = start + TRANSLATE_BLOCK_SIZE
+        target[start:end] = bytes(source[start:end]).translate(table)
+    return out
+
+def count_byte_letters(data):
+    '''Counts the ASCII letters in some bytes.
+
+    Args:
+        data (bytes-like): The bytes whose letters are counted
+
+    Returns:
+        count (int): The number of ASCII letters
+    '''
+
+    count = len(data) - len(bytes(data).translate(None, ASCII_LETTERS))
+    return count
+
+def shift_buffer(data, shifts, full_bytes=False, out=None):
+    '''Shifts the letters of some bytes by each shift in turn, like
+    shift_letters, folding uppercase ASCII letters to lowercase. With
+    full_bytes, every byte is shifted mod 256 instead.
+
+    Args:
+        data (bytes-like): The bytes being shifted
+        shifts (list): The values the letters or bytes are shifted by
+        full_bytes (bool): Whether every byte is shifted mod 256 (default is
+        False)
+        out (bytes-like): A writable buffer of the same length that the result
+        is written into, which can be data itself (default is None, which
+        returns new bytes)
+
+    Returns:
+        shifted (bytes-like): The shifted bytes, which is out if it was given
+    '''
+
+    if out is None:
+        out = bytearray(data)
+        return bytes(shift_buffer(out, shifts, full_bytes, out))
+
+    if np is not None:
+        codes = np.frombuffer(data, dtype=np.uint8)
+        target = np.frombuffer(out, dtype=np.uint8)
+        if full_bytes:
+            keystream = np.tile(np.array(shifts, dtype=np.uint8),
+                                -(-codes.size // len(shifts)))[:codes.size]
+            np.add(codes, keystream, out=target)
+            return out
+        folded = codes | 0x20
+        is_letter = (folded >= ord('a')) & (folded <= ord('z'))
+        letter_values = folded[is_letter] - ord('a')
+        keystream = np.tile(np.array(shifts, dtype=np.uint8),
+                            -(-letter_values.size // len(shifts)))[:letter_values.size]
+        if out is not data:
+            target[:] = codes
+        target[is_letter] = (letter_values + keystream) % NUM_LETTERS + ord('a')
+        return out
+
+    tables = [make_byte_table(lambda value, shift=shift: value + shift, full_bytes)
+              for shift in shifts]
+    shifted = bytearray(data)
+    if full_bytes:
+        for i, table in enumerate(tables):
+            shifted[i::len(tables)] = shifted[i::len(tables)].translate(table)
+    else:
+        index = 0
+        for i, byte in enumerate(shifted):
+            if byte in ASCII_LETTERS:
+                shifted[i] = tables[index][byte]
+                index = (index + 1) % len(tables)
+    out[:] = shifted
+    return out
+
+def text_codes(message):
+    '''Turns text into a writable NumPy array of character codes, using one
+    byte per character when the text is ASCII.
+
+    Args:
+        message (str): The text being turned into codes
+
+    Returns:
+        codes (numpy.ndarray): The code of each character
+        encoding (str): The encoding needed to turn the codes back into text
+    '''
+
+    if message.isascii():
+        encoding, dtype = 'ascii', np.uint8
+    else:
+        encoding, dtype = 'utf-32-le', np.uint32
+    codes = np.frombuffer(message.encode(encoding), dtype=dtype).copy()
+    return codes, encoding
+
+def letter_mask(codes):
+    '''Returns a NumPy array showing which character codes are lowercase letters.'''
+    return (codes >= ord('a')) & (codes <= ord('z'))
+
+def shift_letters(message, shifts):
+    '''Shifts the letters of a lowercase message by each shift in turn, repeating
+    the shifts as many times as needed, in one NumPy operation. Only letters use
+    up a shift; every other character is copied across unchanged.
+
+    Args:
+        message (str): The lowercase text whose letters are shifted
+        shifts (list): The values the letters are shifted by, each between 0
+        and 25
+
+    Returns:
+        shifted_message (str): The text with its letters shifted
+    '''
+
+    codes, encoding = text_codes(message)
+    is_letter = letter_mask(codes)
+    letter_values = (codes[is_letter] - ord('a')).astype(np.uint8)
+    repeats = -(-letter_values.size // len(shifts))
+    keystream = np.tile(np.array(shifts, dtype=np.uint8), repeats)[:letter_values.size]
+    codes[is_letter] = (letter_values + keystream) % NUM_LETTERS + ord('a')
+    shifted_message = codes.tobytes().decode(encoding)
+    return shifted_message
+
+def digram_array(table):
+    '''Turns a digram table into a NumPy array of ASCII codes so that digrams
+    can be translated by indexing with their digram codes.
+
+    Args:
+        table (dict): Every digram mapped to its translated digram, in the
+        order of the digram codes
+
+    Returns:
+        array (numpy.ndarray): The translated digrams, one row of two ASCII
+        codes for each digram code
+    '''
+
+    array = np.frombuffer(''.join(table.values()).encode('ascii'),
+                          dtype=np.uint8).reshape(-1, 2)
+    return array
+
+def count_letters(message):
+    '''Counts the letters in a lowercase message.
+
+    Args:
+        message (str): The lowercase text whose letters are counted
+
+    Returns:
+        count (int): The number of letters in the text
+    '''
+
+    if np is not None and len(message) >= VECTORIZE_THRESHOLD:
+        return int(np.count_nonzero(letter_mask(text_codes(message)[0])))
+    count = len(message) - len(message.translate(DELETE_LETTERS))
+    return count
+
+# Stream Contexts ==============================================================
+
+class StreamContext():
+    '''Encrypts or decrypts text a chunk at a time for a cipher that translates
+    each character on its own, so every chunk can be translated straight away.
+
+    Attributes:
+        translate (function): The encrypt or decrypt method of the cipher
+    '''
+
+    __slots__ = ('translate',)
+
+    def __init__(self, translate):
+        self.translate = translate
+
+    def update(self, chunk):
+        '''Args:
+            chunk (str): The next piece of text
+
+        Returns:
+            translated (str): The text that can be translated so far
+        '''
+
+        translated = self.translate(chunk)
+        return translated
+
+    def finalize(self):
+        '''Returns:
+            translated (str): The rest of the translated text
+        '''
+
+        return ''
+
+class VigenereContext(StreamContext):
+    '''Stream context for a Vigenere cipher, which carries on from the key
+    letter the last chunk stopped at.
+
+    Attributes:
+        offset (int): The number of letters translated so far
+    '''
+
+    __slots__ = ('offset',)
+
+    def __init__(self, translate):
+        super().__init__(translate)
+        self.offset = 0
+
+    def update(self, chunk):
+        translated = self.translate(chunk, self.offset)
+        self.offset += count_letters(translated)
+        return translated
+
+class PlayfairContext(StreamContext):
+    '''Stream context for a Playfair cipher. The run of letters at the end of a
+    chunk may carry on into the next chunk, so it's translated up to the last
+    complete digram, and the one letter left over, if there is one, is kept
+    until the next chunk.
+
+    Attributes:
+        decrypting (bool): Whether the context decrypts instead of encrypting
+        pending (str): The letters kept from the last chunk
+    '''
+
+    __slots__ = ('decrypting', 'pending')
+
+    def __init__(self, translate, decrypting):
+        super().__init__(translate)
+        self.decrypting = decrypting
+        self.pending = ''
+
+    def update(self, chunk):
+        text = self.pending + chunk.lower().replace('j', 'i')
+        end = digram_boundary(text, self.decrypting)
+        self.pending = text[end:]
+        translated = self.translate(text[:end])
+        return translated
+
+    def finalize(self):
+        translated = self.translate(self.pending)
+        self.pending = ''
+        return translated
+
+class TokenEncryptContext(StreamContext):
+    '''Stream context for encrypting with the RSA Cryptosystem or the Rabin
+    cipher, which puts a space between the tokens of one chunk and the next.
+
+    Attributes:
+        started (bool): Whether any tokens have been returned yet
+    '''
+
+    __slots__ = ('started',)
+
+    def __init__(self, translate):
+        super().__init__(translate)
+        self.started = False
+
+    def update(self, chunk):
+        translated = self.translate(chunk)
+        if translated and self.started:
+            translated = ' ' + translated
+        self.started = self.started or bool(translated)
+        return translated
+
+class TokenDecryptContext(StreamContext):
+    '''Stream context for decrypting with the RSA Cryptosystem. The token at the
+    end of a chunk may carry on into the next chunk, so it's kept until the
+    space after it is read.
+
+    Attributes:
+        pending (str): The token kept from the last chunk
+    '''
+
+    __slots__ = ('pending',)
+
+    def __init__(self, translate):
+        super().__init__(translate)
+        self.pending = ''
+
+    def split_tokens(self, chunk):
+        '''Joins a chunk onto the pending token and splits off the complete
+        tokens.
+
+        Args:
+            chunk (str): The next piece of ciphertext
+
+        Returns:
+            complete (str): The complete tokens separated by spaces, or None
+            if there aren't any yet
+        '''
+
+        text = self.pending + chunk
+        space = text.rfind(' ')
+        if space == -1:
+            self.pending = text
+            return None
+        self.pending = text[space+1:]
+        return text[:space]
+
+    def update(self, chunk):
+        complete = self.split_tokens(chunk)
+        if complete is None:
+            return ''
+        return self.translate(complete)
+
+    def finalize(self):
+        translated = self.translate(self.pending)
+        self.pending = ''
+        return translated
+
+class RabinDecryptContext(TokenDecryptContext):
+    '''Stream context for decrypting with the Rabin cipher. Every possible
+    decryption depends on the whole ciphertext, so the lattice of alternatives
+    is built up chunk by chunk and the decryptions are only returned by
+    finalize, or yielded one at a time by iter_finalize.
+
+    Attributes:
+        cipher (Rabin): The Rabin cipher decrypting the text
+        lattice (list): The lattice of the complete tokens read so far
+    '''
+
+    __slots__ = ('cipher', 'lattice')
+
+    def __init__(self, cipher):
+        super().__init__(cipher.decrypt_lattice)
+        self.cipher = cipher
+        self.lattice = []
+
+    def extend_lattice(self, text):
+        '''Adds the lattice of some text to the lattice read so far, joining
+        positions with only one alternative.
+
+        Args:
+            text (str): Complete tokens separated by spaces
+        '''
+
+        for alternatives in self.translate(text):
+            if len(alternatives) == 1 and self.lattice and len(self.lattice[-1]) == 1:
+                self.lattice[-1] = (self.lattice[-1][0] + alternatives[0],)
+            else:
+                self.lattice.append(alternatives)
+
+    def update(self, chunk):
+        complete = self.split_tokens(chunk)
+        if complete is not None:
+            self.extend_lattice(complete)
+        return ''
+
+    def iter_finalize(self):
+        '''Yields every possible decryption of the text one at a time, without
+        joining them into one string like finalize does.
+
+        Yields:
+            decrypted_message (str): The next possible plaintext
+        '''
+
+        self.extend_lattice(self.pending)
+        lattice = self.lattice
+        self.pending = ''
+        self.lattice = []
+        yield from self.cipher.iter_lattice(lattice)
+
+    def finalize(self):
+        decrypted_messages = '/'.join(self.iter_finalize())
+        return decrypted_messages
 
 # Caesar Cipher ================================================================
 
 class Caesar():
     '''Attributes:
         key (int): The key used for shifting letters in a Caesar cipher 
+        encrypt_table (dict): Translation table mapping each letter to its
+        encrypted letter
+        decrypt_table (dict): Translation table mapping each letter to its
+        decrypted letter
+        byte_tables (dict): The byte tables made so far by byte_table
     '''
+
+    __slots__ = ('key', 'encrypt_table', 'decrypt_table', 'byte_tables')
     
-    def __init__(self, key):
+    def __init__(self, key, interactive=True):
         '''Args:
             key (int): The key chosen by the user for shifting letters in a
             Caesar cipher
+            interactive (bool): Whether the user is asked for a new key when
+            a key isn't valid, instead of InvalidKeyError being raised
+            (default is True)
         '''
         
         condition = lambda key: key >= 0
-        self.key = valid_int_key(key, condition)
+        self.key = valid_int_key(key, condition, interactive=interactive)
+        self.encrypt_table = make_translation_table(lambda value: value + self.key)
+        self.decrypt_table = make_translation_table(lambda value: value - self.key)
+        self.byte_tables = {}
 
     def __str__(self):
         return f'Key = {self.key}'
@@ -67,30 +564,48 @@ class Caesar():
     def __repr__(self):
         return f'Key = {self.key}'
         
+    @metrics.cipher_operation
     def encrypt(self, message):
-        message = message.lower()
-        encrypted_message = ''
-        for letter in message:
-            if letter.isalpha():
-                encrypted_letter_value = (LETTER_VALUES[letter] + self.key) % NUM_LETTERS
-                encrypted_message += VALUE_LETTERS[encrypted_letter_value]
-            else:
-                encrypted_message += letter               
-            
+        encrypted_message = message.lower().translate(self.encrypt_table)
         return encrypted_message
 
+    @metrics.cipher_operation
     def decrypt(self, message):
-        message = message.lower()
-        decrypted_message = ''
-        for letter in message:
-            if letter.isalpha():
-                decrypted_letter_value = (LETTER_VALUES[letter] - self.key) % NUM_LETTERS
-                decrypted_message += VALUE_LETTERS[decrypted_letter_value]
-            else:
-                decrypted_message += letter
-            
+        decrypted_message = message.lower().translate(self.decrypt_table)
         return decrypted_message
 
+    def encryptor(self):
+        return StreamContext(self.encrypt)
+
+    def decryptor(self):
+        return StreamContext(self.decrypt)
+
+    def byte_table(self, decrypt=False, full_bytes=False):
+        '''Returns the bytes.translate table for encrypting or decrypting bytes,
+        made by make_byte_table. Each table is only made once.
+        '''
+
+        table = self.byte_tables.get((decrypt, full_bytes))
+        if table is None:
+            key = -self.key if decrypt else self.key
+            table = make_byte_table(lambda value: value + key, full_bytes)
+            self.byte_tables[(decrypt, full_bytes)] = table
+        return table
+
+    @metrics.cipher_operation
+    def encrypt_bytes(self, data, full_bytes=False, out=None):
+        '''Encrypts bytes, folding uppercase ASCII letters to lowercase like
+        encrypt does, or treating every byte as part of the alphabet with
+        full_bytes. The result is written into out if it's given, which can be
+        data itself.
+        '''
+
+        return translate_buffer(data, self.byte_table(False, full_bytes), out)
+
+    @metrics.cipher_operation
+    def decrypt_bytes(self, data, full_bytes=False, out=None):
+        return translate_buffer(data, self.byte_table(True, full_bytes), out)
+
 # Affine Cipher ================================================================
 
 class Affine():
@@ -99,26 +614,43 @@ class Affine():
         cipher
         b (int): The value that's added to the product of a and value of letter
         in an Affine cipher
+        encrypt_table (dict): Translation table mapping each letter to its
+        encrypted letter
+        decrypt_table (dict): Translation table mapping each letter to its
+        decrypted letter
+        byte_tables (dict): The byte tables made so far by byte_table
     '''
+
+    __slots__ = ('a', 'b', 'encrypt_table', 'decrypt_table', 'byte_tables')
     
-    def __init__(self, a, b):
+    def __init__(self, a, b, interactive=True):
         '''Args:
             a (int): The value chosen by the user that's multiplied to value of
             letter in an Affine cipher
             b (int): The value chosen by the user that's added to the product of
             a and value of letter in an Affine cipher
+            interactive (bool): Whether the user is asked for a new key when
+            a key isn't valid, instead of InvalidKeyError being raised
+            (default is True)
         '''
         
         condition = lambda a: a in VALUE_INVERSES
         error_prompt = 'Key A needs to be a whole number greater than zero '\
                         'with an inverse in mod 26.'
         input_prompt = 'Choose another value for Key A: '
-        self.a = valid_int_key(a, condition, error_prompt, input_prompt)
+        self.a = valid_int_key(a, condition, error_prompt, input_prompt,
+                               interactive)
 
         condition = lambda b: 0 <= b <= NUM_LETTERS-1
         error_prompt = 'Key B needs to be a whole number between 0 and 25.'
         input_prompt = 'Choose another value for Key B: '
-        self.b = valid_int_key(b, condition, error_prompt, input_prompt)
+        self.b = valid_int_key(b, condition, error_prompt, input_prompt,
+                               interactive)
+        self.encrypt_table = make_translation_table(
+            lambda value: self.a*value + self.b)
+        self.decrypt_table = make_translation_table(
+            lambda value: VALUE_INVERSES[self.a] * (value - self.b))
+        self.byte_tables = {}
 
     def __str__(self):
         return f'a = {self.a}\nb = {self.b}'
@@ -126,34 +658,55 @@ class Affine():
     def __repr__(self):
         return f'a = {self.a}\nb = {self.b}'
         
+    @metrics.cipher_operation
     def encrypt(self, message):
         '''e(x) = ax + b'''
-        message = message.lower()
-        encrypted_message = ''
-        for letter in message:
-            if letter.isalpha():
-                encrypted_letter_value = ((self.a * LETTER_VALUES[letter]) +
-                                          self.b) % NUM_LETTERS
-                encrypted_message += VALUE_LETTERS[encrypted_letter_value]
-            else:
-                encrypted_message += letter
-
+        encrypted_message = message.lower().translate(self.encrypt_table)
         return encrypted_message
 
+    @metrics.cipher_operation
     def decrypt(self, message):
         '''d(e(x)) = a^(-1)(e(x) - b)'''
-        message = message.lower()
-        decrypted_message = ''
-        for letter in message:
-            if letter.isalpha():
-                decrypted_letter_value = (VALUE_INVERSES[self.a] *
-                                          (LETTER_VALUES[letter] - self.b)) % NUM_LETTERS
-                decrypted_message += VALUE_LETTERS[decrypted_letter_value]
-            else:
-                decrypted_message += letter
-
+        decrypted_message = message.lower().translate(self.decrypt_table)
         return decrypted_message
 
+    def encryptor(self):
+        return StreamContext(self.encrypt)
+
+    def decryptor(self):
+        return StreamContext(self.decrypt)
+
+    def byte_table(self, decrypt=False, full_bytes=False):
+        '''Returns the bytes.translate table for encrypting or decrypting bytes,
+        made by make_byte_table. With full_bytes, a is inverted mod 256. Each
+        table is only made once.
+        '''
+
+        table = self.byte_tables.get((decrypt, full_bytes))
+        if table is not None:
+            return table
+        if not decrypt:
+            table = make_byte_table(lambda value: self.a*value + self.b, full_bytes)
+        else:
+            inverse = pow(self.a, -1, NUM_BYTES) if full_bytes else VALUE_INVERSES[self.a]
+            table = make_byte_table(lambda value: inverse * (value - self.b), full_bytes)
+        self.byte_tables[(decrypt, full_bytes)] = table
+        return table
+
+    @metrics.cipher_operation
+    def encrypt_bytes(self, data, full_bytes=False, out=None):
+        '''Encrypts bytes, folding uppercase ASCII letters to lowercase like
+        encrypt does, or treating every byte as part of the alphabet with
+        full_bytes. The result is written into out if it's given, which can be
+        data itself.
+        '''
+
+        return translate_buffer(data, self.byte_table(False, full_bytes), out)
+
+    @metrics.cipher_operation
+    def decrypt_bytes(self, data, full_bytes=False, out=None):
+        return translate_buffer(data, self.byte_table(True, full_bytes), out)
+
 # Vigenere Cipher ==============================================================
     
 class Vigenere():
@@ -161,19 +714,27 @@ class Vigenere():
         key (str): The key used for shifting letters in a Vigenere cipher
         caesar_ciphers (list): List of Caesar ciphers used in a Vigenere cipher based
         on the letters in the key
+        shifts (list): The value of each letter in the key, which is how far
+        the letters of a message are shifted in turn
     '''
+
+    __slots__ = ('key', 'caesar_ciphers', 'shifts')
     
-    def __init__(self, key):
+    def __init__(self, key, interactive=True):
         '''Args:
             key (str): The key chosen by the user for shifting letters in a Vigenere cipher
+            interactive (bool): Whether the user is asked for a new key when
+            a key isn't valid, instead of InvalidKeyError being raised
+            (default is True)
         '''
         
-        self.key = valid_str_key(key).lower()
+        self.key = valid_str_key(key, interactive=interactive).lower()
         self.caesar_ciphers = []
         key_length = len(self.key)
         for i in range(key_length):
             cipher = Caesar(LETTER_VALUES[self.key[i]])
             self.caesar_ciphers.append(cipher)
+        self.shifts = [LETTER_VALUES[letter] for letter in self.key]
 
     def __str__(self):
         return f"Key = '{self.key}'"
@@ -181,14 +742,23 @@ class Vigenere():
     def __repr__(self):
         return f"Key = '{self.key}'"
     
-    def encrypt(self, message):
+    @metrics.cipher_operation
+    def encrypt(self, message, offset=0):
+        '''Letters are shifted by the letters of the key in turn, starting from
+        the letter offset places into the key (default is 0).
+        '''
+
         message = message.lower()
+        offset %= len(self.shifts)
+        if np is not None and len(message) >= VECTORIZE_THRESHOLD:
+            return shift_letters(message, self.shifts[offset:] + self.shifts[:offset])
+
         encrypted_message = ''
-        cipher_index = 0
+        cipher_index = offset
         for letter in message:
-            if letter.isalpha():
+            if letter in LETTER_VALUES:
                 letter_cipher = self.caesar_ciphers[cipher_index]
-                encrypted_letter = letter_cipher.encrypt(letter)
+                encrypted_letter = letter.translate(letter_cipher.encrypt_table)
                 encrypted_message += encrypted_letter
                 cipher_index = (cipher_index + 1) % len(self.caesar_ciphers)
             else:
@@ -196,14 +766,25 @@ class Vigenere():
 
         return encrypted_message
 
-    def decrypt(self, message):
+    @metrics.cipher_operation
+    def decrypt(self, message, offset=0):
+        '''Letters are shifted back by the letters of the key in turn, starting
+        from the letter offset places into the key (default is 0).
+        '''
+
         message = message.lower()
+        offset %= len(self.shifts)
+        if np is not None and len(message) >= VECTORIZE_THRESHOLD:
+            inverse_shifts = [-shift % NUM_LETTERS
+                              for shift in self.shifts[offset:] + self.shifts[:offset]]
+            return shift_letters(message, inverse_shifts)
+
         decrypted_message = ''
-        cipher_index = 0
+        cipher_index = offset
         for letter in message:
-            if letter.isalpha():
+            if letter in LETTER_VALUES:
                 letter_cipher = self.caesar_ciphers[cipher_index]
-                decrypted_letter = letter_cipher.decrypt(letter)
+                decrypted_letter = letter.translate(letter_cipher.decrypt_table)
                 decrypted_message += decrypted_letter
                 cipher_index = (cipher_index + 1) % len(self.caesar_ciphers)
             else:
@@ -211,14 +792,187 @@ class Vigenere():
 
         return decrypted_message
 
+    def encryptor(self):
+        return VigenereContext(self.encrypt)
+
+    def decryptor(self):
+        return VigenereContext(self.decrypt)
+
+    @metrics.cipher_operation
+    def encrypt_bytes(self, data, full_bytes=False, out=None, offset=0):
+        '''Encrypts bytes, folding uppercase ASCII letters to lowercase like
+        encrypt does, or treating every byte as part of the alphabet with
+        full_bytes. Shifting starts from the letter offset places into the
+        key. The result is written into out if it's given, which can be data
+        itself.
+        '''
+
+        offset %= len(self.shifts)
+        shifts = self.shifts[offset:] + self.shifts[:offset]
+        return shift_buffer(data, shifts, full_bytes, out)
+
+    @metrics.cipher_operation
+    def decrypt_bytes(self, data, full_bytes=False, out=None, offset=0):
+        modulus = NUM_BYTES if full_bytes else NUM_LETTERS
+        offset %= len(self.shifts)
+        shifts = [-shift % modulus for shift in self.shifts[offset:] + self.shifts[:offset]]
+        return shift_buffer(data, shifts, full_bytes, out)
+
 # Playfair Cipher ==============================================================
 
+LETTER_RUN = re.compile(r'([a-z]+)|[^a-z]+')
+DOUBLED_LETTER = re.compile(r'([a-z])\1')
+
+def split_words(message):
+    '''Splits lowercase text into runs of letters and runs of other characters
+    in a single pass, yielding each run as soon as it's found.
+
+    Args:
+        message (str): The lowercase text being split
+
+    Yields:
+        word (str): The next run of letters or of other characters
+        is_letters (bool): Whether the run is made of letters
+    '''
+
+    for match in LETTER_RUN.finditer(message):
+        yield match.group(), match.lastindex is not None
+
+def pad_digrams(word):
+    '''Splits a run of letters into digrams for a Playfair cipher, pairing
+    letters as they come and adding an 'x' after a letter that would be paired
+    with itself or that is left over at the end.
+
+    Args:
+        word (str): The run of letters being split
+
+    Yields:
+        digram (str): The next digram of the run
+    '''
+
+    pending = None
+    for letter in word:
+        if pending is None:
+            pending = letter
+        elif letter == pending:
+            yield pending + 'x'
+        else:
+            yield pending + letter
+            pending = None
+    if pending is not None:
+        yield pending + 'x'
+
+def pad_word(word):
+    '''Adds the 'x' padding a run of letters needs to be split into digrams.
+    Runs without doubled letters only need an 'x' at the end if their length is
+    odd, so the digrams are only built one by one for runs with doubled letters.
+
+    Args:
+        word (str): The run of letters being padded
+
+    Returns:
+        padded_word (str): The run with its padding added
+    '''
+
+    if DOUBLED_LETTER.search(word) is None:
+        padded_word = word + 'x' if len(word) % 2 else word
+    else:
+        padded_word = ''.join(pad_digrams(word))
+    return padded_word
+
+def digram_boundary(text, decrypting=False):
+    '''Finds where lowercase text can be split so that the part before the split
+    is translated the same way on its own as it is with the text after it. The
+    run of letters at the end of the text is split after its last complete
+    digram, which leaves at most one letter after the split.
+
+    Args:
+        text (str): The lowercase text being split, with every 'j' already
+        replaced by 'i' so doubled letters are found the way encrypt finds them
+        decrypting (bool): Whether the text is ciphertext, which is split into
+        digrams without padding (default is False)
+
+    Returns:
+        end (int): The index the text is split at
+    '''
+
+    end = len(text.rstrip(LETTERS))
+    if decrypting:
+        end += (len(text) - end) // 2 * 2
+    else:
+        while end + 1 < len(text):
+            end += 1 if text[end] == text[end+1] else 2
+    return end
+
+def letter_runs(is_letter):
+    '''Finds where each run of letters starts and ends.
+
+    Args:
+        is_letter (numpy.ndarray): Whether each character is a letter
+
+    Returns:
+        starts (numpy.ndarray): The index of the first letter of each run
+        ends (numpy.ndarray): The index after the last letter of each run
+    '''
+
+    edges = np.diff(is_letter.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends
+
+def padding_positions(codes, is_letter):
+    '''Finds where pad_digrams would put an 'x' in every run of letters of a
+    text at once. Runs without doubled letters only need an 'x' at the end if
+    their length is odd, so only the runs with doubled letters are stepped
+    through digram by digram.
+
+    Args:
+        codes (numpy.ndarray): The code of each character of the text
+        is_letter (numpy.ndarray): Whether each character is a letter
+
+    Returns:
+        positions (numpy.ndarray): The indices an 'x' is inserted before
+    '''
+
+    starts, ends = letter_runs(is_letter)
+    doubled = np.flatnonzero(is_letter[1:] & (codes[1:] == codes[:-1]))
+    doubled_runs = np.searchsorted(starts, doubled, side='right') - 1
+    is_odd = (ends - starts) % 2 == 1
+    is_odd[doubled_runs] = False
+    positions = []
+
+    run_ends = ends.tolist()
+    current_run = None
+    for run, position in zip(doubled_runs.tolist(), doubled.tolist()):
+        if run != current_run:
+            if current_run is not None and (run_ends[current_run] - align) % 2:
+                positions.append(run_ends[current_run])
+            current_run = run
+            align = int(starts[run])
+        if (position - align) % 2 == 0:
+            positions.append(position + 1)
+            align = position + 1
+    if current_run is not None and (run_ends[current_run] - align) % 2:
+        positions.append(run_ends[current_run])
+
+    positions = np.sort(np.concatenate((ends[is_odd],
+                                        np.array(positions, dtype=np.intp))))
+    return positions
+
 class Playfair():
     '''Attributes:
         ALPHABET (list): All letters in the English alphabet (except 'j')
         key (str): The key used for creating a matrix of letters in a Playfair
         cipher
         matrix (list): 5x5 matrix used in a Playfair cipher
+        positions (dict): The (row, column) position of each letter in the
+        matrix
+        encrypt_digrams (dict): Every digram mapped to its encrypted digram
+        decrypt_digrams (dict): Every digram mapped to its decrypted digram
+        encrypt_array (numpy.ndarray): The encrypted digrams as ASCII codes,
+        indexed by digram code (None if NumPy isn't installed)
+        decrypt_array (numpy.ndarray): The decrypted digrams as ASCII codes,
+        indexed by digram code (None if NumPy isn't installed)
     '''
     
     ALPHABET = ['a', 'b', 'c', 'd', 'e',
@@ -226,18 +980,35 @@ class Playfair():
                 'l', 'm', 'n', 'o', 'p',
                 'q', 'r', 's', 't', 'u',
                 'v', 'w', 'x', 'y', 'z']
+
+    __slots__ = ('key', 'matrix', 'positions', 'encrypt_digrams', 'decrypt_digrams',
+                 'encrypt_array', 'decrypt_array')
     
-    def __init__(self, key):
+    def __init__(self, key, interactive=True):
         '''Args:
             key (str): The key chosen by the user for creating a matrix of letters
             in a Playfair cipher
+            interactive (bool): Whether the user is asked for a new key when
+            a key isn't valid, instead of InvalidKeyError being raised
+            (default is True)
         '''
         
-        self.key = valid_str_key(key).lower().replace('j', 'i')
+        self.key = valid_str_key(key, interactive=interactive).lower().replace('j', 'i')
         new_alphabet = list(dict.fromkeys(list(self.key) + Playfair.ALPHABET))
         self.matrix = []
         for i in range(5, len(new_alphabet)+1, 5):
             self.matrix.append(new_alphabet[i-5:i])
+        self.positions = {letter: (row, col)
+                          for row in range(len(self.matrix))
+                          for col, letter in enumerate(self.matrix[row])}
+        self.encrypt_digrams = self.digram_table(1)
+        self.decrypt_digrams = self.digram_table(-1)
+        if np is not None:
+            self.encrypt_array = digram_array(self.encrypt_digrams)
+            self.decrypt_array = digram_array(self.decrypt_digrams)
+        else:
+            self.encrypt_array = None
+            self.decrypt_array = None
 
     def __str__(self):
         string = f"Key = '{self.key}'"
@@ -251,107 +1022,231 @@ class Playfair():
             string += f'\n{row}'
         return string
 
+    def digram_table(self, shift):
+        '''Applies the Playfair rules to every possible digram. Letters in the
+        same row move along the row by shift, letters in the same column move
+        along the column by shift, and otherwise each letter takes the column
+        of the other letter.
+
+        Args:
+            shift (int): 1 for encryption or -1 for decryption
+
+        Returns:
+            table (dict): Every digram mapped to its translated digram, in the
+            order of the digram codes
+        '''
+
+        size = len(self.matrix)
+        table = {}
+        for letter1 in Playfair.ALPHABET:
+            row1, col1 = self.positions[letter1]
+            for letter2 in Playfair.ALPHABET:
+                row2, col2 = self.positions[letter2]
+                if row1 == row2:
+                    new_letter1 = self.matrix[row1][(col1+shift)%size]
+                    new_letter2 = self.matrix[row2][(col2+shift)%size]
+                elif col1 == col2:
+                    new_letter1 = self.matrix[(row1+shift)%size][col1]
+                    new_letter2 = self.matrix[(row2+shift)%size][col2]
+                else:
+                    new_letter1 = self.matrix[row1][col2]
+                    new_letter2 = self.matrix[row2][col1]
+                table[letter1 + letter2] = new_letter1 + new_letter2
+        return table
+
+    def translate_codes(self, letter_codes, decrypt=False):
+        '''Translates the ASCII codes of a stream of letters two at a time by
+        turning them into digram codes and indexing the digram arrays.
+
+        Args:
+            letter_codes (numpy.ndarray): ASCII codes of letters of even
+            length, with no 'j'
+            decrypt (bool): Whether the letters are decrypted rather than
+            encrypted (default is False)
+
+        Returns:
+            translated_codes (numpy.ndarray): The ASCII codes of the translated
+            letters
+        '''
+
+        array = self.decrypt_array if decrypt else self.encrypt_array
+        indices = PLAYFAIR_CODES[letter_codes]
+        digram_codes = indices[0::2] * len(Playfair.ALPHABET) + indices[1::2]
+        translated_codes = array[digram_codes].reshape(-1)
+        return translated_codes
+
+    def translate_text_codes(self, codes, encoding, decrypt=False):
+        '''Translates the letters of a whole text given as character codes,
+        leaving every other character where it is.
+
+        Args:
+            codes (numpy.ndarray): The code of each character, where every run
+            of letters has even length
+            encoding (str): The encoding needed to turn the codes into text
+            decrypt (bool): Whether the letters are decrypted rather than
+            encrypted (default is False)
+
+        Returns:
+            translated_message (str): The translated text
+        '''
+
+        is_letter = letter_mask(codes)
+        codes[is_letter] = self.translate_codes(codes[is_letter], decrypt)
+        translated_message = codes.tobytes().decode(encoding)
+        return translated_message
+
+    def translate_digrams(self, letters, decrypt=False):
+        '''Translates a stream of letters two at a time using the digram
+        tables. Long streams are turned into digram codes and translated with
+        one NumPy array lookup.
+
+        Args:
+            letters (str): Letters of even length, with no 'j'
+            decrypt (bool): Whether the letters are decrypted rather than
+            encrypted (default is False)
+
+        Returns:
+            translated_letters (str): The translated letters
+        '''
+
+        if np is not None and len(letters) >= VECTORIZE_THRESHOLD:
+            letter_codes = np.frombuffer(letters.encode('ascii'), dtype=np.uint8)
+            return self.translate_codes(letter_codes, decrypt).tobytes().decode('ascii')
+
+        table = self.decrypt_digrams if decrypt else self.encrypt_digrams
+        translated_letters = ''.join([table[letters[i:i+2]]
+                                      for i in range(0, len(letters), 2)])
+        return translated_letters
+
+    def translate_words(self, words, decrypt=False):
+        '''Translates the letters of all words in one batch and puts the
+        translated letters back between the other characters.
+
+        Args:
+            words (iterable): Tuples containing each run of letters, ready to be
+            split into digrams, or of other characters and whether it's made of
+            letters, in the order they appear
+            decrypt (bool): Whether the letters are decrypted rather than
+            encrypted (default is False)
+
+        Returns:
+            translated_message (str): The translated words joined together
+        '''
+
+        words = list(words)
+        letters = ''.join([word for word, is_letters in words if is_letters])
+        translated_letters = self.translate_digrams(letters, decrypt)
+        translated_words = []
+        position = 0
+        for word, is_letters in words:
+            if is_letters:
+                end = position + len(word)
+                translated_words.append(translated_letters[position:end])
+                position = end
+            else:
+                translated_words.append(word)
+        translated_message = ''.join(translated_words)
+        return translated_message
+
+    @metrics.cipher_operation
     def encrypt(self, message):
         message = message.lower().replace('j', 'i')
-        split_message = []
-        i, j = 0, 1
-        while i < len(message) and j < len(message)+1:
-            if not message[i:j].isalpha():
-                split_message.append(message[i:j-1])
-                i = j-1
-            j += 1
-        split_message.append(message[i:j-1])
-        
-        encrypted_message = ''
-        for word in split_message:
-            if word.isalpha():
-                digrams = []
-                i = 0
-                while i < len(word):
-                    digram = word[i:i+2]
-                    if len(digram) == 1:
-                        digram += 'x'
-                    if digram[0] == digram[1]:
-                        word = word[:i+1] + 'x' + word[i+1:]
-                        digram = word[i:i+2]
-                    digrams.append(digram)
-                    i += 2
-        
-                for digram in digrams:
-                    letter_indices = []
-                    for letter in digram:
-                        for row in range(len(self.matrix)):
-                            if letter in self.matrix[row]:
-                                col = self.matrix[row].index(letter)
-                                letter_indices.append((row, col))
-                                break
-                        
-                    letter1, letter2 = letter_indices[0], letter_indices[1]
-                    if letter1[0] == letter2[0]:
-                        col_size = len(self.matrix)
-                        new_letter1 = self.matrix[letter1[0]][(letter1[1]+1)%col_size]
-                        new_letter2 = self.matrix[letter2[0]][(letter2[1]+1)%col_size]
-                    elif letter1[1] == letter2[1]:
-                        row_size = len(self.matrix)
-                        new_letter1 = self.matrix[(letter1[0]+1)%row_size][letter1[1]]
-                        new_letter2 = self.matrix[(letter2[0]+1)%row_size][letter2[1]]
-                    else:
-                        new_letter1 = self.matrix[letter1[0]][letter2[1]]
-                        new_letter2 = self.matrix[letter2[0]][letter1[1]]
-                    encrypted_digram = new_letter1 + new_letter2
-                    encrypted_message += encrypted_digram
-            else:
-                encrypted_message += word
+        if np is not None and len(message) >= VECTORIZE_THRESHOLD:
+            codes, encoding = text_codes(message)
+            positions = padding_positions(codes, letter_mask(codes))
+            codes = np.insert(codes, positions, ord('x'))
+            return self.translate_text_codes(codes, encoding)
+
+        words = ((pad_word(word), True) if is_letters else (word, False)
+                 for word, is_letters in split_words(message))
+        encrypted_message = self.translate_words(words)
         return encrypted_message
 
+    @metrics.cipher_operation
     def decrypt(self, message):
         message = message.lower()
-        split_message = []
-        i, j = 0, 1
-        while i < len(message) and j < len(message)+1:
-            if not message[i:j].isalpha():
-                split_message.append(message[i:j-1])
-                i = j-1
-            j += 1
-        split_message.append(message[i:j-1])
-        
-        decrypted_message = ''
-        for word in split_message:
-            if word.isalpha():
-                digrams = []
-                for i in range(0, len(word)-1, 2):
-                    digram = word[i:i+2]
-                    digrams.append(digram)
-
-                for digram in digrams:
-                    letter_indices = []
-                    for letter in digram:
-                        for row in range(len(self.matrix)):
-                            if letter in self.matrix[row]:
-                                col = self.matrix[row].index(letter)
-                                letter_indices.append((row, col))
-                                break
-
-                    letter1, letter2 = letter_indices[0], letter_indices[1]
-                    if letter1[0] == letter2[0]:
-                        col_size = len(self.matrix)
-                        new_letter1 = self.matrix[letter1[0]][(letter1[1]-1)%col_size]
-                        new_letter2 = self.matrix[letter2[0]][(letter2[1]-1)%col_size]
-                    elif letter1[1] == letter2[1]:
-                        row_size = len(self.matrix)
-                        new_letter1 = self.matrix[(letter1[0]-1)%row_size][letter1[1]]
-                        new_letter2 = self.matrix[(letter2[0]-1)%row_size][letter2[1]]
-                    else:
-                        new_letter1 = self.matrix[letter1[0]][letter2[1]]
-                        new_letter2 = self.matrix[letter2[0]][letter1[1]]
-                    decrypted_digram = new_letter1 + new_letter2
-                    decrypted_message += decrypted_digram
-            else:
-                decrypted_message += word
+        if np is not None and len(message) >= VECTORIZE_THRESHOLD:
+            codes, encoding = text_codes(message)
+            starts, ends = letter_runs(letter_mask(codes))
+            codes = np.delete(codes, ends[(ends - starts) % 2 == 1] - 1)
+            return self.translate_text_codes(codes, encoding, decrypt=True)
+
+        words = ((word[:len(word) - len(word)%2], True) if is_letters
+                 else (word, False)
+                 for word, is_letters in split_words(message))
+        decrypted_message = self.translate_words(words, decrypt=True)
         return decrypted_message
+
+    def encryptor(self):
+        return PlayfairContext(self.encrypt, decrypting=False)
+
+    def decryptor(self):
+        return PlayfairContext(self.decrypt, decrypting=True)
+
+if np is not None:
+    PLAYFAIR_CODES = np.full(256, len(Playfair.ALPHABET)**2, dtype=np.uint16)
+    for code, letter in enumerate(Playfair.ALPHABET):
+        PLAYFAIR_CODES[ord(letter)] = code
         
 # RSA Cryptosystem =============================================================
 
+def encrypt_tokens(message, table):
+    '''Encrypts text letter by letter using a table of the ciphertext of every
+    letter, in the format used by the RSA Cryptosystem and the Rabin cipher:
+    each character becomes a token, spaces become '_', and the tokens are
+    separated by spaces.
+
+    Args:
+        message (str): The plaintext that will be encrypted
+        table (dict): Translation table mapping each letter to its ciphertext
+
+    Returns:
+        encrypted_message (str): The ciphertext version of message argument
+    '''
+
+    message = message.lower().replace(' ', '_')
+    encrypted_message = ' '.join(message).translate(table)
+    return encrypted_message
+
+def check_kept_token(token):
+    '''Checks that a token of ciphertext that isn't a number or '_' could have
+    been made by encrypt, which keeps each character that isn't a letter,
+    digit or space as a token of its own.
+
+    Args:
+        token (str): The token being decrypted
+
+    Raises:
+        ValueError: If token couldn't be part of the ciphertext
+    '''
+
+    if len(token) > 1 or token.isalnum():
+        raise ValueError(f"{token!r} isn't a token of ciphertext.")
+
+def read_chunks(infile, size):
+    '''Reads a binary stream in chunks of a given size. Reads are repeated until
+    each chunk is full, so only the last chunk can be shorter.
+
+    Args:
+        infile (file): The binary stream being read
+        size (int): The number of bytes in each chunk
+
+    Yields:
+        chunk (bytes): The next chunk of the stream
+    '''
+
+    chunk = b''
+    while True:
+        data = infile.read(size - len(chunk))
+        if not data:
+            break
+        chunk += data
+        if len(chunk) == size:
+            yield chunk
+            chunk = b''
+    if chunk:
+        yield chunk
+
 class RSA():
     '''Attributes:
         p (int): The first prime number used in an RSA Cryptosystem
@@ -366,37 +1261,112 @@ class RSA():
         Cryptosystem
         public_key (tuple): The numbers used in an RSA Cryptosystem that can be
         shown to anyone. Contains n and e
+        dp (int): d reduced mod p-1, used for decrypting mod p
+        dq (int): d reduced mod q-1, used for decrypting mod q
+        q_inverse (int): The multiplicative inverse of q in modulo p, used for
+        combining the results mod p and mod q
+        encrypt_table (dict): Translation table mapping each letter to its
+        ciphertext (None if the lookup table isn't used)
+        decrypt_table (dict): The ciphertext of each letter, and '_', mapped to
+        its decrypted text (None if the lookup table isn't used)
+        block_size (int): The number of bytes of plaintext encrypted together
+        in block mode, which is 0 if n is too small for block mode
+        block_width (int): The number of bytes each block of ciphertext is
+        written as in block mode
     '''
 
-    def __init__(self, p, q):
+    __slots__ = ('p', 'q', 'n', 'phi_n', 'e', 'd', 'public_key', 'dp', 'dq',
+                 'q_inverse', 'encrypt_table', 'decrypt_table', 'block_size',
+                 'block_width')
+
+    def __init__(self, p, q, e=None, lookup_table=True, interactive=True):
         '''Args:
             p (int): The first prime number chosen by the user to be used in an
             RSA Cryptosystem
             q (int): The second prime number, different from p, chosen by the
             user to be used in an RSA Cryptosystem
+            e (int): The invertible element in mod Φ(n) chosen by the user to be
+            used in an RSA Cryptosystem. The user is asked for it, and shown the
+            public key, if it's not given (default is None)
+            lookup_table (bool): Whether the ciphertexts of the 26 letters are
+            worked out once so that letters are encrypted and decrypted by
+            looking them up (default is True)
+            interactive (bool): Whether the user is asked for a new key when
+            a key isn't valid, instead of InvalidKeyError being raised
+            (default is True)
         '''
         
         condition = lambda p: is_prime(p)
         error_prompt = 'p needs to be a prime number.'
         input_prompt = 'Choose another value for p: '
-        self.p = valid_int_key(p, condition, error_prompt, input_prompt)
+        self.p = valid_int_key(p, condition, error_prompt, input_prompt,
+                               interactive)
         
         condition = lambda q: is_prime(q) and q != self.p
         error_prompt = "q needs to be a prime number that's different from p."
         input_prompt = 'Choose another value for q: '
-        self.q = valid_int_key(q, condition, error_prompt, input_prompt)
+        self.q = valid_int_key(q, condition, error_prompt, input_prompt,
+                               interactive)
         self.n = self.p * self.q
         self.phi_n = (self.p-1) * (self.q-1)
         
-        e = input(f'Choose an invertible element in mod {self.phi_n}: ')
+        show_public_key = e is None and interactive
+        if show_public_key:
+            e = input(f'Choose an invertible element in mod {self.phi_n}: ')
         condition = lambda e: is_invertible(e, self.phi_n)[0]
         error_prompt = 'e needs to be a whole number that has a '\
                         f'multiplicative inverse in mod {self.phi_n}.'
         input_prompt = 'Choose another value for e: '
-        self.e = valid_int_key(e, condition, error_prompt, input_prompt)
+        self.e = valid_int_key(e, condition, error_prompt, input_prompt,
+                               interactive)
         self.d = is_invertible(self.e, self.phi_n)[1]
         self.public_key = (self.n, self.e)
-        print(f'Public key: (n, e) = {self.public_key}')
+        self.dp = self.d % (self.p-1) or self.p-1
+        self.dq = self.d % (self.q-1) or self.q-1
+        self.q_inverse = pow(self.q, -1, self.p)
+        self.block_size = max((self.n.bit_length()-1) // 8 - 1, 0)
+        self.block_width = (self.n.bit_length()+7) // 8
+        if lookup_table:
+            ciphertexts = {letter: str(pow(value, self.e, self.n))
+                           for letter, value in LETTER_VALUES.items()}
+            metrics.increment('modular_exponentiations_total', NUM_LETTERS,
+                              cipher='RSA')
+            self.encrypt_table = str.maketrans(ciphertexts)
+            self.decrypt_table = {ciphertexts[letter]: VALUE_LETTERS[value % self.n]
+                                  for letter, value in LETTER_VALUES.items()}
+            self.decrypt_table['_'] = ' '
+        else:
+            self.encrypt_table = None
+            self.decrypt_table = None
+        if show_public_key:
+            print(f'Public key: (n, e) = {self.public_key}')
+
+    @classmethod
+    def generate(cls, bits, e=RSA_EXPONENT, workers=None, lookup_table=True):
+        '''Makes an RSA Cryptosystem with random primes, without asking the
+        user for anything. The primes are found until e is invertible in
+        mod Φ(n).
+
+        Args:
+            bits (int): The number of bits in the modulus n
+            e (int): The invertible element in mod Φ(n) (default is
+            RSA_EXPONENT)
+            workers (int): The number of processes used for finding the primes,
+            which share one process pool (default is None, which finds them in
+            this process)
+            lookup_table (bool): Whether the letter lookup table is used
+            (default is True)
+
+        Returns:
+            cipher (RSA): The RSA Cryptosystem
+        '''
+
+        with prime_executor(workers) as executor:
+            while True:
+                p = generate_prime(bits // 2, None, workers, executor)
+                q = generate_prime(bits - bits//2, None, workers, executor)
+                if p != q and is_invertible(e, (p-1) * (q-1))[0]:
+                    return cls(p, q, e, lookup_table, interactive=False)
 
     def __str__(self):
         return f'''p = {self.p}
@@ -416,39 +1386,187 @@ e = {self.e}
 d = {self.d}
 Public key = {self.public_key}'''
     
+    @metrics.cipher_operation
     def encrypt(self, message):
-        '''c = m^e (mod n)'''
+        '''c = m^e (mod n). Bytes are encrypted in block mode.'''
+
+        if isinstance(message, (bytes, bytearray)):
+            return self.encrypt_blocks(message)
+        if self.encrypt_table is not None:
+            return encrypt_tokens(message, self.encrypt_table)
 
         message = message.lower()
         encrypted_message = []
         for letter in message:
             if letter.isalpha():
-                encrypted_letter_value = fast_exponentiation(LETTER_VALUES[letter], self.e, self.n)
+                encrypted_letter_value = pow(LETTER_VALUES[letter], self.e, self.n)
                 encrypted_message.append(str(encrypted_letter_value))
             elif letter == ' ':
                 encrypted_message.append('_')
             else:
                 encrypted_message.append(letter)
+        if metrics.enabled:
+            metrics.increment('modular_exponentiations_total',
+                              sum(map(str.isalpha, message)), cipher='RSA')
                 
         encrypted_message = ' '.join(encrypted_message)                
         return encrypted_message
 
+    @metrics.cipher_operation
     def decrypt(self, message):
-        '''m = c^d (mod n)'''
+        '''m = c^d (mod n). Bytes are decrypted in block mode.'''
 
+        if isinstance(message, (bytes, bytearray)):
+            return self.decrypt_blocks(message)
         message = message.split(' ')
-        decrypted_message = ''
-        for number in message:
-            if number.isnumeric():
-                decrypted_letter_value = fast_exponentiation(int(number), self.d, self.n)
-                decrypted_message += VALUE_LETTERS[decrypted_letter_value]
-            elif number == '_':
-                decrypted_message += ' '
-            else:
-                decrypted_message += number
-
+        if self.decrypt_table is not None:
+            lookup = self.decrypt_table.get
+            decrypted_message = ''.join([lookup(number) or self.decrypt_token(number)
+                                         for number in message])
+        else:
+            decrypted_message = ''.join([self.decrypt_token(number)
+                                         for number in message])
         return decrypted_message
 
+    def decrypt_token(self, number):
+        '''Decrypts one token of ciphertext. Numbers are decrypted with
+        m = c^d (mod n), '_' becomes a space and the characters kept by encrypt
+        are kept as they are.
+
+        Args:
+            number (str): The token that will be decrypted
+
+        Returns:
+            decrypted_token (str): The plaintext version of number argument
+
+        Raises:
+            ValueError: If number isn't the ciphertext of a letter with this key,
+            or a character kept by encrypt
+        '''
+
+        if number.isnumeric():
+            number = int(number)
+            if number >= self.n:
+                raise ValueError(f'{number} is too large to be ciphertext with '
+                                 f'n = {self.n}.')
+            decrypted_letter_value = crt_exponentiation(number, self.dp, self.dq,
+                                                        self.p, self.q, self.q_inverse)
+            metrics.increment('modular_exponentiations_total', cipher='RSA')
+            if decrypted_letter_value >= NUM_LETTERS:
+                raise ValueError(f"{number} isn't the ciphertext of a letter with "
+                                 'this key.')
+            decrypted_token = VALUE_LETTERS[decrypted_letter_value]
+        elif number == '_':
+            decrypted_token = ' '
+        else:
+            check_kept_token(number)
+            decrypted_token = number
+        return decrypted_token
+
+    def encryptor(self):
+        return TokenEncryptContext(self.encrypt)
+
+    def decryptor(self):
+        return TokenDecryptContext(self.decrypt)
+
+    def check_block_size(self):
+        '''Raises ValueError if n is too small to hold a block of at least one
+        byte of plaintext, which needs n to have at least 17 bits.
+        '''
+
+        if self.block_size == 0:
+            raise ValueError(f'n = {self.n} is too small for block mode, which '
+                             'needs n to have at least 17 bits.')
+
+    def encrypt_blocks(self, data):
+        '''Encrypts bytes in block mode. The bytes are split into blocks of
+        block_size bytes, and each block is encrypted as one number with a 1
+        byte in front of it, so zero bytes at the start of a block and a short
+        last block aren't lost. Each encrypted number is written as
+        block_width big-endian bytes.
+
+        Args:
+            data (bytes): The plaintext that will be encrypted
+
+        Returns:
+            encrypted_data (bytes): The ciphertext version of data argument
+        '''
+
+        self.check_block_size()
+        size, width = self.block_size, self.block_width
+        metrics.increment('modular_exponentiations_total', -(-len(data) // size),
+                          cipher='RSA')
+        encrypted_data = b''.join([
+            pow(int.from_bytes(b'\x01' + data[i:i+size], 'big'), self.e, self.n)
+            .to_bytes(width, 'big') for i in range(0, len(data), size)])
+        return encrypted_data
+
+    def decrypt_blocks(self, data):
+        '''Decrypts bytes encrypted in block mode. Each block of block_width bytes
+        is decrypted with the Chinese Remainder Theorem, and the 1 byte in front
+        of the plaintext is removed.
+
+        Args:
+            data (bytes): The ciphertext that will be decrypted
+
+        Returns:
+            decrypted_data (bytes): The plaintext version of data argument
+
+        Raises:
+            ValueError: If data isn't a ciphertext made in block mode with this
+            key
+        '''
+
+        self.check_block_size()
+        width = self.block_width
+        if len(data) % width != 0:
+            raise ValueError(f'Block mode ciphertext needs to be made of blocks '
+                             f'of {width} bytes.')
+        metrics.increment('modular_exponentiations_total', len(data) // width,
+                          cipher='RSA')
+        decrypted_data = []
+        for i in range(0, len(data), width):
+            number = int.from_bytes(data[i:i+width], 'big')
+            if number >= self.n:
+                raise ValueError('Block mode ciphertext has a block larger than n.')
+            number = crt_exponentiation(number, self.dp, self.dq, self.p, self.q,
+                                        self.q_inverse)
+            block = number.to_bytes((number.bit_length()+7) // 8, 'big')
+            if block[:1] != b'\x01' or len(block) > self.block_size + 1:
+                raise ValueError("Block mode ciphertext wasn't made with this key.")
+            decrypted_data.append(block[1:])
+        return b''.join(decrypted_data)
+
+    def encrypt_stream(self, infile, outfile, blocks=BLOCKS_PER_READ):
+        '''Encrypts a binary stream in block mode, writing the ciphertext to
+        another binary stream a number of blocks at a time.
+
+        Args:
+            infile (file): The binary stream of plaintext
+            outfile (file): The binary stream the ciphertext is written to
+            blocks (int): The number of blocks read at a time (default is
+            BLOCKS_PER_READ)
+        '''
+
+        self.check_block_size()
+        for chunk in read_chunks(infile, self.block_size * blocks):
+            outfile.write(self.encrypt_blocks(chunk))
+
+    def decrypt_stream(self, infile, outfile, blocks=BLOCKS_PER_READ):
+        '''Decrypts a binary stream encrypted in block mode, writing the
+        plaintext to another binary stream a number of blocks at a time.
+
+        Args:
+            infile (file): The binary stream of ciphertext
+            outfile (file): The binary stream the plaintext is written to
+            blocks (int): The number of blocks read at a time (default is
+            BLOCKS_PER_READ)
+        '''
+
+        self.check_block_size()
+        for chunk in read_chunks(infile, self.block_width * blocks):
+            outfile.write(self.decrypt_blocks(chunk))
+
 # Rabin Cipher =============================================================
 
 class Rabin():
@@ -456,26 +1574,85 @@ class Rabin():
         p (int): The first prime number used in a Rabin cipher
         q (int): The second prime number, different from p, used in a Rabin Cipher
         n (int): The product of p and q used in a Rabin cipher
+        u, v (int): The numbers in the equation '1 = pu + qv', used for
+        combining square roots mod p and mod q into square roots mod n
+        encrypt_table (dict): Translation table mapping each letter to its
+        ciphertext (None if the lookup table isn't used)
+        decrypt_table (dict): The ciphertext of each letter mapped to the list
+        of letter values it can be decrypted to (None if the lookup table isn't
+        used)
     '''
+
+    __slots__ = ('p', 'q', 'n', 'u', 'v', 'encrypt_table', 'decrypt_table')
     
-    def __init__(self, p, q):
+    def __init__(self, p, q, lookup_table=True, interactive=True):
         '''Args:
             p (int): The first prime number chosen by the user to be used in an
             RSA Cryptosystem
             q (int): The second prime number, different from p, chosen by the
             user to be used in an RSA Cryptosystem
+            lookup_table (bool): Whether the ciphertexts of the 26 letters are
+            worked out once so that letters are encrypted and decrypted by
+            looking them up (default is True)
+            interactive (bool): Whether the user is asked for a new key when
+            a key isn't valid, instead of InvalidKeyError being raised
+            (default is True)
         '''
         
         condition = lambda p: is_prime(p)
         error_prompt = 'p needs to be a prime number.'
         input_prompt = 'Choose another value for p: '
-        self.p = valid_int_key(p, condition, error_prompt, input_prompt)
+        self.p = valid_int_key(p, condition, error_prompt, input_prompt,
+                               interactive)
         
         condition = lambda q: is_prime(q) and q != self.p
         error_prompt = "q needs to be a prime number that's different from p."
         input_prompt = 'Choose another value for q: '
-        self.q = valid_int_key(q, condition, error_prompt, input_prompt)
+        self.q = valid_int_key(q, condition, error_prompt, input_prompt,
+                               interactive)
         self.n = self.p * self.q
+        self.u = pow(self.p, -1, self.q)
+        self.v = (1 - self.p*self.u) // self.q
+        if lookup_table:
+            ciphertexts = {letter: str(value**2 % self.n)
+                           for letter, value in LETTER_VALUES.items()}
+            metrics.increment('modular_exponentiations_total', NUM_LETTERS,
+                              cipher='Rabin')
+            self.encrypt_table = str.maketrans(ciphertexts)
+            self.decrypt_table = {}
+            for value in range(min(NUM_LETTERS, self.n)):
+                self.decrypt_table.setdefault(ciphertexts[VALUE_LETTERS[value]],
+                                              []).append(value)
+        else:
+            self.encrypt_table = None
+            self.decrypt_table = None
+
+    @classmethod
+    def generate(cls, bits, blum=True, workers=None, lookup_table=True):
+        '''Makes a Rabin cipher with random primes, without asking the user for
+        anything.
+
+        Args:
+            bits (int): The number of bits in the modulus n
+            blum (bool): Whether both primes are congruent to 3 mod 4, so square
+            roots are found with one exponentiation (default is True)
+            workers (int): The number of processes used for finding the primes,
+            which share one process pool (default is None, which finds them in
+            this process)
+            lookup_table (bool): Whether the letter lookup table is used
+            (default is True)
+
+        Returns:
+            cipher (Rabin): The Rabin cipher
+        '''
+
+        mod_4 = 3 if blum else None
+        with prime_executor(workers) as executor:
+            p = generate_prime(bits // 2, mod_4, workers, executor)
+            q = generate_prime(bits - bits//2, mod_4, workers, executor)
+            while q == p:
+                q = generate_prime(bits - bits//2, mod_4, workers, executor)
+        return cls(p, q, lookup_table, interactive=False)
 
     def __str__(self):
         return f'p = {self.p}\nq = {self.q}\nn = {self.n}'
@@ -483,81 +1660,285 @@ class Rabin():
     def __repr__(self):
         return f'p = {self.p}\nq = {self.q}\nn = {self.n}'
 
+    @metrics.cipher_operation
     def encrypt(self, message):
+        if self.encrypt_table is not None:
+            return encrypt_tokens(message, self.encrypt_table)
+
         message = message.lower()
         encrypted_message = []
         for letter in message:
             if letter.isalpha():
-                encrypted_letter_value = fast_exponentiation(LETTER_VALUES[letter], 2, self.n)
+                encrypted_letter_value = pow(LETTER_VALUES[letter], 2, self.n)
                 encrypted_message.append(str(encrypted_letter_value))
             elif letter == ' ':
                 encrypted_message.append('_')
             else:
                 encrypted_message.append(letter)
+        if metrics.enabled:
+            metrics.increment('modular_exponentiations_total',
+                              sum(map(str.isalpha, message)), cipher='Rabin')
                 
         encrypted_message = ' '.join(encrypted_message)
         return encrypted_message
 
-    def decrypt(self, message):
-        message = message.split(' ')
-        decrypted_messages = ['']
-        for number in message:
+    def letter_values(self, number):
+        '''Finds the letter values a number of ciphertext can be decrypted to.
+        The square roots of the number mod p and mod q are found and combined
+        into the four square roots mod n, and the ones that are the value of a
+        letter are kept.
+
+        Args:
+            number (int): The number of ciphertext being decrypted
+
+        Returns:
+            valid_solutions (list): The possible letter values in ascending order
+
+        Raises:
+            ValueError: If number isn't a square in mod n
+        '''
+
+        a = modular_sqrt(number, self.p)
+        b = modular_sqrt(number, self.q)
+        metrics.increment('modular_exponentiations_total', 2, cipher='Rabin')
+        x1 = (b*self.p*self.u + a*self.q*self.v) % self.n
+        x2 = (b*self.p*self.u - a*self.q*self.v) % self.n
+        x3 = (-b*self.p*self.u + a*self.q*self.v) % self.n
+        x4 = (-b*self.p*self.u - a*self.q*self.v) % self.n
+        solutions = [x1, x2, x3, x4]
+        valid_solutions = sorted({solution for solution in solutions
+                                  if solution < NUM_LETTERS})
+        return valid_solutions
+
+    def decrypt_lattice(self, message):
+        '''Decrypts text into a lattice holding the alternatives for each
+        ambiguous number, instead of writing out every possible decryption.
+        Runs of text with only one decryption are joined into one position.
+
+        Args:
+            message (str): The ciphertext that will be decrypted
+
+        Returns:
+            lattice (list): Tuples holding the alternative plaintexts of each
+            position in order, which have one item where there's no ambiguity
+
+        Raises:
+            ValueError: If a number isn't the ciphertext of a letter with this
+            key, or a token isn't a number, '_' or a character kept by encrypt
+        '''
+
+        lattice = []
+        fixed_text = []
+        for number in message.split(' '):
             if number.isnumeric():
-                a_squared = int(number) % self.p
-                b_squared = int(number) % self.q
-                a = 1
-                while fast_exponentiation(a, 2, self.p) != a_squared:
-                    a += 1
-                b = 1
-                while fast_exponentiation(b, 2, self.q) != b_squared:
-                    b += 1
-                gcd, u, v = extended_gcd(self.p, self.q)
-                x1 = (b*self.p*u + a*self.q*v) % self.n
-                x2 = (b*self.p*u - a*self.q*v) % self.n
-                x3 = (-b*self.p*u + a*self.q*v) % self.n
-                x4 = (-b*self.p*u - a*self.q*v) % self.n
-                solutions = [x1, x2, x3, x4]
-                valid_solutions = list({solution for solution in solutions\
-                                        if solution < NUM_LETTERS})
-                        
+                if self.decrypt_table is not None and number in self.decrypt_table:
+                    valid_solutions = self.decrypt_table[number]
+                else:
+                    valid_solutions = self.letter_values(int(number))
+                if not valid_solutions or int(number) >= self.n:
+                    raise ValueError(f"{number} isn't the ciphertext of a letter with "
+                                     'this key.')
                 if len(valid_solutions) == 1:
-                    for i in range(len(decrypted_messages)):
-                        decrypted_messages[i] += VALUE_LETTERS[valid_solutions[0]]
-                                
-                elif len(valid_solutions) == 2:
-                    decrypted_messages_copy = decrypted_messages[:]
-                    for i in range(len(decrypted_messages)):
-                        decrypted_messages[i] += VALUE_LETTERS[valid_solutions[0]]
-                        decrypted_messages_copy[i] += VALUE_LETTERS[valid_solutions[1]]
-                    decrypted_messages += decrypted_messages_copy
-                    
-                elif len(valid_solutions) == 3:
-                    decrypted_messages_copy1 = decrypted_messages[:]
-                    decrypted_messages_copy2 = decrypted_messages[:]
-                    for i in range(len(decrypted_messages)):
-                        decrypted_messages[i] += VALUE_LETTERS[valid_solutions[0]]
-                        decrypted_messages_copy1[i] += VALUE_LETTERS[valid_solutions[1]]
-                        decrypted_messages_copy2[i] += VALUE_LETTERS[valid_solutions[2]]
-                    decrypted_messages += decrypted_messages_copy1\
-                                          + decrypted_messages_copy2
-
-                elif len(valid_solutions) == 4:
-                    decrypted_messages_copy1 = decrypted_messages[:]
-                    decrypted_messages_copy2 = decrypted_messages[:]
-                    decrypted_messages_copy3 = decrypted_messages[:]
-                    for i in range(len(decrypted_messages)):
-                        decrypted_messages[i] += VALUE_LETTERS[valid_solutions[0]]
-                        decrypted_messages_copy1[i] += VALUE_LETTERS[valid_solutions[1]]
-                        decrypted_messages_copy2[i] += VALUE_LETTERS[valid_solutions[2]]
-                        decrypted_messages_copy3[i] += VALUE_LETTERS[valid_solutions[3]]           
-                    decrypted_messages += decrypted_messages_copy1\
-                                          + decrypted_messages_copy2\
-                                          + decrypted_messages_copy3
+                    fixed_text.append(VALUE_LETTERS[valid_solutions[0]])
+                elif len(valid_solutions) > 1:
+                    if fixed_text:
+                        lattice.append((''.join(fixed_text),))
+                        fixed_text = []
+                    lattice.append(tuple(VALUE_LETTERS[solution]
+                                         for solution in valid_solutions))
             elif number == '_':
-                for i in range(len(decrypted_messages)):
-                    decrypted_messages[i] += ' '
+                fixed_text.append(' ')
             else:
-                for i in range(len(decrypted_messages)):
-                    decrypted_messages[i] += number
-        decrypted_messages = '/'.join(decrypted_messages)
+                check_kept_token(number)
+                fixed_text.append(number)
+        if fixed_text:
+            lattice.append((''.join(fixed_text),))
+        return lattice
+
+    def iter_decryptions(self, message):
+        '''Yields every possible decryption of text one at a time, in the same
+        order as decrypt, without keeping them all in memory.
+
+        Args:
+            message (str): The ciphertext that will be decrypted
+
+        Yields:
+            decrypted_message (str): The next possible plaintext
+        '''
+
+        yield from self.iter_lattice(self.decrypt_lattice(message))
+
+    def iter_lattice(self, lattice):
+        '''Yields every plaintext held in a lattice one at a time, in the same
+        order as decrypt.
+
+        Args:
+            lattice (list): The lattice made by decrypt_lattice
+
+        Yields:
+            decrypted_message (str): The next possible plaintext
+        '''
+
+        for candidate in itertools.product(*reversed(lattice)):
+            yield ''.join(reversed(candidate))
+
+    def best_decryptions(self, message, top=1, beam_width=100,
+                         score=english_letter_score, context_length=3):
+        '''Finds the possible decryptions of text that look the most like English
+        with a beam search over the lattice. After each ambiguous position only
+        the beam_width best scoring partial decryptions are kept.
+
+        Args:
+            message (str): The ciphertext that will be decrypted
+            top (int): The number of decryptions returned (default is 1)
+            beam_width (int): The number of partial decryptions kept at each
+            position, which is raised to top if it's smaller (default is 100)
+            score (function): Takes the text before a segment and the segment,
+            and returns how much the segment adds to the score of a decryption
+            (default is english_letter_score)
+            context_length (int): The number of characters of the text before
+            a segment given to score (default is 3)
+
+        Returns:
+            best (list): Tuples containing the score and the decryption, best
+            first
+        '''
+
+        beam_width = max(beam_width, top)
+        beams = [(0.0, None, '')]
+        for alternatives in self.decrypt_lattice(message):
+            extended = [(total + score(context, segment), (segment, node),
+                         (context + segment)[-context_length:])
+                        for total, node, context in beams
+                        for segment in alternatives]
+            beams = heapq.nlargest(beam_width, extended, key=lambda beam: beam[0])
+
+        best = []
+        for total, node, context in beams[:top]:
+            segments = []
+            while node is not None:
+                segment, node = node
+                segments.append(segment)
+            best.append((total, ''.join(reversed(segments))))
+        return best
+
+    @metrics.cipher_operation
+    def decrypt(self, message):
+        '''Returns every possible decryption of text separated by '/'. The number
+        of decryptions doubles or more with each ambiguous number, so
+        iter_decryptions or best_decryptions should be used for long texts,
+        which is what the converter does when it writes them to a file.
+        '''
+
+        decrypted_messages = '/'.join(self.iter_decryptions(message))
         return decrypted_messages
+
+    def encryptor(self):
+        return TokenEncryptContext(self.encrypt)
+
+    def decryptor(self):
+        return RabinDecryptContext(self)
+
+# Cipher Cache =================================================================
+
+CIPHER_CACHE_SIZE = 128
+
+class Frozen():
+    '''Mixin that stops the attributes of a cipher from being changed once it's
+    been made, so one instance can be shared by everything that asks for the
+    same cipher. Instances can still be pickled and sent to other processes.
+    '''
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"'{type(self).__name__}' object is immutable")
+
+    def __setstate__(self, state):
+        _, slots = state
+        for name, value in slots.items():
+            object.__setattr__(self, name, value)
+
+class FrozenCaesar(Frozen, Caesar):
+    __slots__ = ()
+
+class FrozenAffine(Frozen, Affine):
+    __slots__ = ()
+
+class FrozenVigenere(Frozen, Vigenere):
+    __slots__ = ()
+
+class FrozenPlayfair(Frozen, Playfair):
+    __slots__ = ()
+
+class FrozenRSA(Frozen, RSA):
+    __slots__ = ()
+
+class FrozenRabin(Frozen, Rabin):
+    __slots__ = ()
+
+FROZEN_CIPHERS = {'caesar': FrozenCaesar, 'affine': FrozenAffine,
+                  'vigenere': FrozenVigenere, 'playfair': FrozenPlayfair,
+                  'rsa': FrozenRSA, 'rabin': FrozenRabin}
+
+@functools.lru_cache(maxsize=CIPHER_CACHE_SIZE)
+def build_cipher(name, params):
+    '''Makes an immutable cipher without asking the user for anything. Results
+    are kept in a cache, so the same cipher is only made once.
+
+    Args:
+        name (str): The lowercase name of the cipher
+        params (tuple): The (name, value) pairs of the keyword arguments of the
+        cipher, in sorted order
+
+    Returns:
+        cipher (Frozen): The immutable cipher
+    '''
+
+    frozen_class = FROZEN_CIPHERS[name]
+    cipher_class = frozen_class.__bases__[1]
+    cipher = cipher_class(**dict(params), interactive=False)
+    cipher.__class__ = frozen_class
+    return cipher
+
+def cached_cipher(name, **params):
+    '''Gets an immutable cipher from the cache of ciphers, making it if it isn't
+    in the cache yet. Unlike the cipher classes, the user is never asked for a
+    new key, so it can be used where there's no one to answer.
+
+    Args:
+        name (str): The name of the cipher, which can be 'caesar', 'affine',
+        'vigenere', 'playfair', 'rsa' or 'rabin'
+        **params: The keyword arguments of the cipher, like key=3 for a Caesar
+        cipher or p=11, q=17, e=7 for an RSA Cryptosystem
+
+    Returns:
+        cipher (Frozen): The immutable cipher, which is also an instance of the
+        cipher class
+
+    Raises:
+        ValueError: If there's no cipher with that name
+        InvalidKeyError: If one of the keys isn't valid
+    '''
+
+    name = name.lower()
+    if name not in FROZEN_CIPHERS:
+        raise ValueError(f"There's no cipher called '{name}'.")
+    return build_cipher(name, tuple(sorted(params.items())))
+
+def cipher_cache_info():
+    '''Gets the hits, misses, maximum size and current size of the cache of
+    ciphers used by cached_cipher.
+    '''
+
+    return build_cipher.cache_info()
+
+def cipher_cache_clear():
+    '''Empties the cache of ciphers used by cached_cipher and resets its hit
+    and miss counters.
+    '''
+
+    build_cipher.cache_clear()
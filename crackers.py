@@ -0,0 +1,949 @@
+'''The module containing the functions for cracking ciphertext without knowing
+the key.
+
+Candidate keys are scored from the letter histogram of the ciphertext instead
+of by decrypting the text with each key. A key that maps plaintext letter p to
+ciphertext letter c means the plaintext would have as many p's as the
+ciphertext has c's, so the plaintext histogram of every key is just the
+ciphertext histogram with its counts rearranged, which takes the same time to
+score however long the text is.
+'''
+
+import concurrent.futures
+import math
+import multiprocessing
+import random
+from ciphers import *
+from frequency import LetterHistogram
+from ngrams import letter_values, load_model, NgramModel
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+ENGLISH_TOTAL = sum(ENGLISH_FREQUENCIES.values())
+ENGLISH_PROBABILITIES = tuple(ENGLISH_FREQUENCIES[letter] / ENGLISH_TOTAL
+                              for letter in LETTERS)
+SCORING_METHODS = {'chi_squared': False, 'log_likelihood': True, 'ngram': True}
+NGRAM_SAMPLE_LETTERS = 4096
+
+# Histogram Scoring ============================================================
+
+def as_histogram(text):
+    '''Gets the letter histogram of ciphertext.
+
+    Args:
+        text (str/bytes/list/LetterHistogram): The ciphertext, a list of its
+        lines, or its histogram if it has already been counted
+
+    Returns:
+        histogram (LetterHistogram): The letter counts of the ciphertext
+    '''
+
+    if isinstance(text, LetterHistogram):
+        return text
+    if isinstance(text, (str, bytes, bytearray, memoryview)):
+        return LetterHistogram.from_text(text)
+    return LetterHistogram.from_chunks(text)
+
+def score_permutations(histogram, permutations, method='chi_squared'):
+    '''Scores how much the plaintext of each key looks like English. Each key is
+    given as a permutation, where permutation[p] is the ciphertext letter that
+    plaintext letter p is encrypted to, so the plaintext would have
+    histogram.counts[permutation[p]] of letter p.
+
+    The chi-squared statistic adds up (observed - expected)**2 / expected for
+    each letter, so lower scores are better. The log-likelihood adds up
+    count * log(probability) for each letter, so higher scores are better.
+
+    Args:
+        histogram (LetterHistogram): The letter counts of the ciphertext
+        permutations (list/numpy.ndarray): The permutation of each key, as
+        lists of 26 letter values or as the rows of an array
+        method (str): 'chi_squared' or 'log_likelihood' (default is
+        'chi_squared')
+
+    Returns:
+        scores (list): The score of each key, in the same order as the
+        permutations
+
+    Raises:
+        ValueError: If there's no scoring method with that name
+    '''
+
+    if method not in SCORING_METHODS or method == 'ngram':
+        raise ValueError(f"There's no histogram scoring method called '{method}'.")
+    total = histogram.total()
+    if total == 0:
+        return [0.0] * len(permutations)
+
+    if np is not None:
+        observed = np.array(histogram.counts, dtype=np.float64)[np.asarray(permutations)]
+        probabilities = np.array(ENGLISH_PROBABILITIES)
+        if method == 'chi_squared':
+            expected = probabilities * total
+            scores = ((observed - expected)**2 / expected).sum(axis=1)
+        else:
+            scores = observed @ np.log(probabilities)
+        return scores.tolist()
+
+    counts = histogram.counts
+    if method == 'chi_squared':
+        expected = [probability * total for probability in ENGLISH_PROBABILITIES]
+        return [sum((counts[c] - e)**2 / e for c, e in zip(permutation, expected))
+                for permutation in permutations]
+    log_probabilities = [math.log(probability) for probability in ENGLISH_PROBABILITIES]
+    return [sum(counts[c] * log_p for c, log_p in zip(permutation, log_probabilities))
+            for permutation in permutations]
+
+def score_decryptions(text, permutations, model=None):
+    '''Scores the plaintext of each key with an n-gram model, decrypting the
+    first NGRAM_SAMPLE_LETTERS letters of the ciphertext with every key at
+    once.
+
+    Args:
+        text (str/bytes/list): The ciphertext, or a list of its lines
+        permutations (list/numpy.ndarray): The permutation of each key, in the
+        form used by score_permutations
+        model (NgramModel): The n-gram model (default is None, which uses the
+        saved quadgram table from load_model)
+
+    Returns:
+        scores (list): The n-gram score of each key, in the same order as the
+        permutations
+
+    Raises:
+        ValueError: If only the histogram of the ciphertext is given
+    '''
+
+    if isinstance(text, LetterHistogram):
+        raise ValueError('N-gram scoring needs the ciphertext, not its histogram.')
+    if model is None:
+        model = load_model()
+    if not isinstance(text, (str, bytes, bytearray, memoryview)):
+        text = '\n'.join(text)
+    values = letter_values(text)[:NGRAM_SAMPLE_LETTERS]
+    if np is not None:
+        inverses = np.argsort(np.asarray(permutations), axis=1)
+        return model.score_values(inverses[:, values]).tolist()
+    scores = []
+    for permutation in permutations:
+        inverse = [0] * NUM_LETTERS
+        for value, encrypted_value in enumerate(permutation):
+            inverse[encrypted_value] = value
+        scores.append(model.score_values([inverse[value] for value in values]))
+    return scores
+
+def rank_keys(keys, scores, method='chi_squared', top=None):
+    '''Sorts keys from best to worst score.
+
+    Args:
+        keys (list): The keys
+        scores (list): The score of each key
+        method (str): The scoring method the scores came from, which decides
+        if lower or higher scores are better (default is 'chi_squared')
+        top (int): The number of keys kept (default is None, which keeps all
+        of them)
+
+    Returns:
+        ranking (list): A list of (key, score) tuples, best first
+    '''
+
+    ranking = sorted(zip(keys, scores), key=lambda pair: pair[1],
+                     reverse=SCORING_METHODS[method])
+    return ranking if top is None else ranking[:top]
+
+# Caesar Cipher ================================================================
+
+CAESAR_KEYS = list(range(NUM_LETTERS))
+CAESAR_PERMUTATIONS = [[(value + key) % NUM_LETTERS for value in range(NUM_LETTERS)]
+                       for key in CAESAR_KEYS]
+if np is not None:
+    CAESAR_PERMUTATIONS = np.array(CAESAR_PERMUTATIONS)
+
+def crack_caesar(text, method='chi_squared', top=None, model=None):
+    '''Scores all 26 keys of a Caesar cipher by rotating the histogram of the
+    ciphertext against the letter frequencies of English, without decrypting
+    the text, or with the 'ngram' method, by scoring a sample of the text
+    decrypted with every key with an n-gram model.
+
+    Args:
+        text (str/bytes/list/LetterHistogram): The ciphertext, a list of its
+        lines, or its histogram
+        method (str): 'chi_squared', 'log_likelihood' or 'ngram' (default is
+        'chi_squared')
+        top (int): The number of keys returned (default is None, which returns
+        all 26)
+        model (NgramModel): The n-gram model used by the 'ngram' method
+        (default is None, which uses load_model)
+
+    Returns:
+        ranking (list): A list of (key, score) tuples, best first
+    '''
+
+    if method == 'ngram':
+        scores = score_decryptions(text, CAESAR_PERMUTATIONS, model)
+    else:
+        scores = score_permutations(as_histogram(text), CAESAR_PERMUTATIONS, method)
+    return rank_keys(CAESAR_KEYS, scores, method, top)
+
+# Affine Cipher ================================================================
+
+AFFINE_KEYS = [(a, b) for a in VALUE_INVERSES for b in range(NUM_LETTERS)]
+AFFINE_PERMUTATIONS = [[(a*value + b) % NUM_LETTERS for value in range(NUM_LETTERS)]
+                       for a, b in AFFINE_KEYS]
+if np is not None:
+    AFFINE_PERMUTATIONS = np.array(AFFINE_PERMUTATIONS)
+
+def crack_affine(text, method='chi_squared', top=None, model=None):
+    '''Scores all 312 keys of an Affine cipher by rearranging the histogram
+    of the ciphertext for each key and comparing it to the letter frequencies
+    of English, without decrypting the text, or with the 'ngram' method, by
+    scoring a sample of the text decrypted with every key with an n-gram
+    model.
+
+    Args:
+        text (str/bytes/list/LetterHistogram): The ciphertext, a list of its
+        lines, or its histogram
+        method (str): 'chi_squared', 'log_likelihood' or 'ngram' (default is
+        'chi_squared')
+        top (int): The number of keys returned (default is None, which returns
+        all 312)
+        model (NgramModel): The n-gram model used by the 'ngram' method
+        (default is None, which uses load_model)
+
+    Returns:
+        ranking (list): A list of ((key_a, key_b), score) tuples, best first
+    '''
+
+    if method == 'ngram':
+        scores = score_decryptions(text, AFFINE_PERMUTATIONS, model)
+    else:
+        scores = score_permutations(as_histogram(text), AFFINE_PERMUTATIONS, method)
+    return rank_keys(AFFINE_KEYS, scores, method, top)
+
+# Vigenere Cipher ==============================================================
+
+MAX_KEY_LENGTH = 100
+KEY_LENGTH_SAMPLE = 2**17
+MIN_COLUMN_LETTERS = 4
+KEY_LENGTH_TOLERANCE = 0.75
+DIVISOR_MARGIN = 0.1
+DIVISOR_DEVIATIONS = 2.5
+RANDOM_COINCIDENCE = 1 / NUM_LETTERS
+ENGLISH_COINCIDENCE = sum(probability**2 for probability in ENGLISH_PROBABILITIES)
+KEY_LENGTH_CANDIDATES = 3
+
+def letter_positions(text):
+    '''Gets the value of each letter of Vigenere ciphertext and its position in
+    the key stream. A string is treated as one stream. For a list of lines,
+    each line starts again from the beginning of the key, like the lines
+    written by plain_to_cipher.
+
+    Args:
+        text (str/list): The ciphertext, or a list of its lines
+
+    Returns:
+        values (numpy.ndarray/list): The value of each letter, between 0 and 25
+        positions (numpy.ndarray/list): The number of letters before each
+        letter in its stream
+    '''
+
+    lines = [text] if isinstance(text, str) else list(text)
+    if np is not None:
+        values = []
+        for line in lines:
+            codes = np.frombuffer(line.lower().encode('utf-32-le'), dtype=np.uint32)
+            values.append((codes[letter_mask(codes)] - ord('a')).astype(np.int64))
+        lengths = np.array([line_values.size for line_values in values], dtype=np.int64)
+        values = np.concatenate(values) if values else np.zeros(0, dtype=np.int64)
+        starts = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        positions = np.arange(values.size, dtype=np.int64) - starts
+        return values, positions
+
+    values, positions = [], []
+    for line in lines:
+        line_values = [LETTER_VALUES[letter] for letter in line.lower()
+                       if letter in LETTER_VALUES]
+        values.extend(line_values)
+        positions.extend(range(len(line_values)))
+    return values, positions
+
+def coincidence_indices(values, positions, max_length):
+    '''Finds the index of coincidence of the columns of the ciphertext for each
+    key length, which is the chance that two letters picked from the same
+    column are the same letter. Each column of the right key length is
+    encrypted with one Caesar cipher, so it keeps the index of English (about
+    0.066), while wrong key lengths mix the columns together and bring it
+    closer to the index of random letters (1/26).
+
+    Args:
+        values (numpy.ndarray/list): The value of each letter
+        positions (numpy.ndarray/list): The position of each letter in its
+        key stream
+        max_length (int): The longest key length checked
+
+    Returns:
+        indices (list): The average index of coincidence of the columns for
+        each key length from 1 to max_length
+    '''
+
+    indices = []
+    for length in range(1, max_length+1):
+        if np is not None:
+            columns = np.bincount(positions % length * NUM_LETTERS + values,
+                                  minlength=length * NUM_LETTERS)
+            counts = columns.reshape(length, NUM_LETTERS).astype(np.float64)
+            sizes = counts.sum(axis=1)
+            pairs = sizes * (sizes - 1)
+            used = pairs > 0
+            column_indices = (counts * (counts - 1)).sum(axis=1)[used] / pairs[used]
+            indices.append(float(column_indices.mean()) if column_indices.size else 0.0)
+            continue
+        columns = [[0] * NUM_LETTERS for _ in range(length)]
+        for value, position in zip(values, positions):
+            columns[position % length][value] += 1
+        column_indices = []
+        for counts in columns:
+            size = sum(counts)
+            if size > 1:
+                column_indices.append(sum(count * (count - 1) for count in counts)
+                                      / (size * (size - 1)))
+        indices.append(sum(column_indices) / len(column_indices)
+                       if column_indices else 0.0)
+    return indices
+
+def repeat_spacings(values, positions):
+    '''Finds the spacing between repeats of each three letter sequence in the
+    ciphertext, for the Kasiski examination. A sequence that's repeated a
+    multiple of the key length apart is often the same plaintext encrypted
+    with the same key letters.
+
+    Args:
+        values (numpy.ndarray/list): The value of each letter
+        positions (numpy.ndarray/list): The position of each letter in its
+        key stream
+
+    Returns:
+        spacings (numpy.ndarray/list): The difference in key stream position
+        between each repeat and the one before it
+    '''
+
+    if np is not None:
+        if values.size < 3:
+            return np.zeros(0, dtype=np.int64)
+        trigrams = (values[:-2] * NUM_LETTERS + values[1:-1]) * NUM_LETTERS + values[2:]
+        order = np.argsort(trigrams, kind='stable')
+        repeats = trigrams[order][1:] == trigrams[order][:-1]
+        spacings = np.abs(np.diff(positions[:-2][order]))[repeats]
+        return spacings[spacings > 0]
+
+    last_seen, spacings = {}, []
+    for i in range(len(values) - 2):
+        trigram = (values[i], values[i+1], values[i+2])
+        if trigram in last_seen and positions[i] != last_seen[trigram]:
+            spacings.append(abs(positions[i] - last_seen[trigram]))
+        last_seen[trigram] = positions[i]
+    return spacings
+
+def key_length_scores(text, max_length=MAX_KEY_LENGTH):
+    '''Scores each key length of a Vigenere cipher with the index of
+    coincidence and the Kasiski examination, using at most the first
+    KEY_LENGTH_SAMPLE letters. Key lengths that leave fewer than
+    MIN_COLUMN_LETTERS letters in each column aren't scored.
+
+    Args:
+        text (str/list): The ciphertext, or a list of its lines
+        max_length (int): The longest key length checked (default is
+        MAX_KEY_LENGTH)
+
+    Returns:
+        scores (list): A list of (length, coincidence, repeats) tuples, where
+        coincidence is the index of coincidence of the columns and repeats is
+        the fraction of repeat spacings that are a multiple of the length
+    '''
+
+    values, positions = letter_positions(text)
+    return score_key_lengths(values[:KEY_LENGTH_SAMPLE], positions[:KEY_LENGTH_SAMPLE],
+                             max_length)
+
+def score_key_lengths(values, positions, max_length=MAX_KEY_LENGTH):
+    '''Scores each key length like key_length_scores, from the letters of the
+    ciphertext.
+
+    Args:
+        values (numpy.ndarray/list): The value of each letter
+        positions (numpy.ndarray/list): The position of each letter in its
+        key stream
+        max_length (int): The longest key length checked (default is
+        MAX_KEY_LENGTH)
+
+    Returns:
+        scores (list): A list of (length, coincidence, repeats) tuples
+    '''
+
+    max_length = max(min(max_length, len(values) // MIN_COLUMN_LETTERS), 1)
+    indices = coincidence_indices(values, positions, max_length)
+    spacings = repeat_spacings(values, positions)
+    lengths = range(1, max_length+1)
+    if len(spacings) == 0:
+        fractions = [0.0] * max_length
+    elif np is not None:
+        multiples = spacings[:, None] % np.arange(1, max_length+1) == 0
+        fractions = multiples.mean(axis=0).tolist()
+    else:
+        fractions = [sum(spacing % length == 0 for spacing in spacings) / len(spacings)
+                     for length in lengths]
+    return list(zip(lengths, indices, fractions))
+
+def key_length_candidates(text, max_length=MAX_KEY_LENGTH):
+    '''Finds the likely key lengths of a Vigenere cipher. Every length whose
+    index of coincidence is most of the way from the index of random letters
+    to the index of English is a candidate (or the lengths with the highest
+    index, if none are).
+
+    A divisor of the key length mixes columns encrypted with different key
+    letters together, so its index is lower than that of the key length, while
+    multiples of the key length keep about the same index. A length is
+    therefore dropped when one of its multiples has a clearly higher index:
+    higher by DIVISOR_MARGIN of the way from random letters to English, plus
+    DIVISOR_DEVIATIONS standard errors of the difference, which grows with
+    the number of columns. The multiples of the key length that are left are
+    sorted by how many repeat spacings they're a multiple of, which is never
+    more than for the key length itself, with ties going to the shortest
+    length.
+
+    Args:
+        text (str/list): The ciphertext, or a list of its lines
+        max_length (int): The longest key length checked (default is
+        MAX_KEY_LENGTH)
+
+    Returns:
+        lengths (list): The candidate key lengths, most likely first
+    '''
+
+    values, positions = letter_positions(text)
+    values, positions = values[:KEY_LENGTH_SAMPLE], positions[:KEY_LENGTH_SAMPLE]
+    scores = score_key_lengths(values, positions, max_length)
+    coincidences = [coincidence for _, coincidence, _ in scores]
+    threshold = RANDOM_COINCIDENCE + KEY_LENGTH_TOLERANCE * (ENGLISH_COINCIDENCE
+                                                             - RANDOM_COINCIDENCE)
+    threshold = min(threshold, max(coincidences))
+    margin = DIVISOR_MARGIN * (ENGLISH_COINCIDENCE - RANDOM_COINCIDENCE)
+    deviation = math.sqrt(2 * ENGLISH_COINCIDENCE) / max(len(values), 1)
+
+    candidates = []
+    for length, coincidence, repeats in scores:
+        if coincidence < threshold:
+            continue
+        if any(coincidences[multiple-1] > coincidence + margin
+               + DIVISOR_DEVIATIONS * deviation * math.sqrt(multiple)
+               for multiple in range(2*length, len(scores)+1, length)):
+            continue
+        candidates.append((length, repeats))
+    candidates.sort(key=lambda candidate: (-candidate[1], candidate[0]))
+    return [length for length, _ in candidates]
+
+def estimate_key_length(text, max_length=MAX_KEY_LENGTH):
+    '''Estimates the key length of a Vigenere cipher as the first of
+    key_length_candidates.
+
+    Args:
+        text (str/list): The ciphertext, or a list of its lines
+        max_length (int): The longest key length checked (default is
+        MAX_KEY_LENGTH)
+
+    Returns:
+        key_length (int): The most likely key length
+    '''
+
+    return key_length_candidates(text, max_length)[0]
+
+def solve_columns(values, positions, key_length, method='chi_squared'):
+    '''Solves each column of Vigenere ciphertext, which is encrypted with one
+    Caesar cipher, by scoring the 26 rotations of its histogram.
+
+    Args:
+        values (numpy.ndarray/list): The value of each letter
+        positions (numpy.ndarray/list): The position of each letter in its
+        key stream
+        key_length (int): The length of the key
+        method (str): 'chi_squared' or 'log_likelihood' (default is
+        'chi_squared')
+
+    Returns:
+        key (str): The most likely key
+        score (float): The total score of the columns with that key
+    '''
+
+    if np is not None:
+        columns = np.bincount(positions % key_length * NUM_LETTERS + values,
+                              minlength=key_length * NUM_LETTERS)
+        columns = columns.reshape(key_length, NUM_LETTERS).tolist()
+    else:
+        columns = [[0] * NUM_LETTERS for _ in range(key_length)]
+        for value, position in zip(values, positions):
+            columns[position % key_length][value] += 1
+
+    key, score = '', 0.0
+    for counts in columns:
+        shift, column_score = crack_caesar(LetterHistogram(counts), method, top=1)[0]
+        key += VALUE_LETTERS[shift]
+        score += column_score
+    return key, score
+
+def refine_key(values, positions, key, model):
+    '''Improves a Vigenere key one letter at a time with an n-gram model. Every
+    shift of each column is tried, keeping the one whose decryption of the
+    first NGRAM_SAMPLE_LETTERS letters has the best n-gram score, until no
+    letter of the key changes. This fixes the columns that are too short for
+    their histogram to give the right shift.
+
+    Args:
+        values (numpy.ndarray/list): The value of each letter
+        positions (numpy.ndarray/list): The position of each letter in its
+        key stream
+        key (str): The key being improved
+        model (NgramModel): The n-gram model
+
+    Returns:
+        key (str): The improved key
+        score (float): The n-gram score of its decryption
+    '''
+
+    values = values[:NGRAM_SAMPLE_LETTERS]
+    positions = positions[:NGRAM_SAMPLE_LETTERS]
+    shifts = [LETTER_VALUES[letter] for letter in key]
+    if np is not None:
+        columns = positions % len(shifts)
+        plain = (values - np.array(shifts, dtype=np.intp)[columns]) % NUM_LETTERS
+        score = model.score_values(plain)
+        candidates = np.empty((NUM_LETTERS, len(plain)), dtype=np.intp)
+        candidates[:] = plain
+        members = [np.flatnonzero(columns == column) for column in range(len(shifts))]
+    else:
+        columns = [position % len(shifts) for position in positions]
+        plain = [(value - shifts[column]) % NUM_LETTERS
+                 for value, column in zip(values, columns)]
+        score = model.score_values(plain)
+
+    changed = True
+    while changed:
+        changed = False
+        for column in range(len(shifts)):
+            if np is not None:
+                member = members[column]
+                candidates[:, member] = (values[member]
+                                         - np.arange(NUM_LETTERS)[:, None]) % NUM_LETTERS
+                scores = model.score_values(candidates).tolist()
+            else:
+                scores = []
+                for shift in range(NUM_LETTERS):
+                    candidate = [(value - shift) % NUM_LETTERS if position == column else letter
+                                 for value, position, letter in zip(values, columns, plain)]
+                    scores.append(model.score_values(candidate))
+            shift = max(range(NUM_LETTERS), key=lambda shift: scores[shift])
+            if scores[shift] > score:
+                shifts[column], score, changed = shift, scores[shift], True
+            if np is not None:
+                candidates[:, member] = (values[member] - shifts[column]) % NUM_LETTERS
+            else:
+                plain = [(value - shifts[column]) % NUM_LETTERS if position == column else letter
+                         for value, position, letter in zip(values, columns, plain)]
+    return ''.join(VALUE_LETTERS[shift] for shift in shifts), score
+
+def crack_vigenere(text, key_length=None, max_length=MAX_KEY_LENGTH,
+                   method='chi_squared', model=None):
+    '''Cracks a Vigenere cipher. The key length is estimated if it isn't given,
+    and each column of the ciphertext is then solved with solve_columns. If an
+    n-gram model is given, the first KEY_LENGTH_CANDIDATES candidate key
+    lengths are all solved and their keys improved with refine_key, and the
+    key with the best n-gram score is picked, with ties going to the shortest.
+
+    Args:
+        text (str/list): The ciphertext, or a list of its lines, where each
+        line starts again from the beginning of the key
+        key_length (int): The length of the key (default is None, which
+        estimates it)
+        max_length (int): The longest key length checked (default is
+        MAX_KEY_LENGTH)
+        method (str): 'chi_squared' or 'log_likelihood' (default is
+        'chi_squared')
+        model (NgramModel): The n-gram model used for picking between key
+        lengths (default is None)
+
+    Returns:
+        key (str): The most likely key
+        score (float): The total score of the columns with that key, or its
+        n-gram score if a model is given
+    '''
+
+    values, positions = letter_positions(text)
+    if key_length is not None:
+        lengths = [key_length]
+    elif model is None:
+        lengths = [estimate_key_length(text, max_length)]
+    else:
+        lengths = key_length_candidates(text, max_length)[:KEY_LENGTH_CANDIDATES]
+
+    best = None
+    for length in lengths:
+        key, score = solve_columns(values, positions, length, method)
+        if model is not None:
+            key, score = refine_key(values, positions, key, model)
+        if (best is None or score > best[1]
+                or (score == best[1] and len(key) < len(best[0]))):
+            best = key, score
+    return best
+
+# Playfair Cipher ==============================================================
+
+PLAYFAIR_SIZE = 5
+PLAYFAIR_LETTERS = PLAYFAIR_SIZE**2
+PLAYFAIR_VALUES = [LETTER_VALUES[letter] for letter in Playfair.ALPHABET]
+PLAYFAIR_INDICES = {letter: index for index, letter in enumerate(Playfair.ALPHABET)}
+PLAYFAIR_ITERATIONS = 1_000_000
+PLAYFAIR_RESTARTS = 4
+SWAP_CHANCE = 0.9
+TEMPERATURE_PER_LETTER = 0.07
+CHECK_INTERVAL = 1000
+ABANDON_PROGRESS = 0.5
+ABANDON_GAP = 1.0
+
+def playfair_digram_positions():
+    '''Applies the Playfair decryption rules to every pair of positions in a
+    5x5 square. The rules only depend on where the two letters are, not on
+    which letters they are, so this is done once for every key.
+
+    Returns:
+        positions (list): The positions the first and second letters of a
+        digram are decrypted to, indexed by position1 * 25 + position2
+    '''
+
+    positions = []
+    for position1 in range(PLAYFAIR_LETTERS):
+        row1, col1 = divmod(position1, PLAYFAIR_SIZE)
+        for position2 in range(PLAYFAIR_LETTERS):
+            row2, col2 = divmod(position2, PLAYFAIR_SIZE)
+            if row1 == row2:
+                col1_new, col2_new = (col1-1) % PLAYFAIR_SIZE, (col2-1) % PLAYFAIR_SIZE
+                row1_new, row2_new = row1, row2
+            elif col1 == col2:
+                row1_new, row2_new = (row1-1) % PLAYFAIR_SIZE, (row2-1) % PLAYFAIR_SIZE
+                col1_new, col2_new = col1, col2
+            else:
+                row1_new, col1_new, row2_new, col2_new = row1, col2, row2, col1
+            positions.append((row1_new * PLAYFAIR_SIZE + col1_new,
+                              row2_new * PLAYFAIR_SIZE + col2_new))
+    return positions
+
+def square_permutations():
+    '''Finds the rearrangements of a 5x5 square used as moves besides letter
+    swaps: swapping two rows, swapping two columns, flipping the square along
+    its diagonal, and reversing the order of the rows or of the columns.
+
+    Returns:
+        permutations (list): Lists of the position each new position takes
+        its letter from
+    '''
+
+    grid = [[row * PLAYFAIR_SIZE + col for col in range(PLAYFAIR_SIZE)]
+            for row in range(PLAYFAIR_SIZE)]
+    permutations = []
+    for i, j in itertools.combinations(range(PLAYFAIR_SIZE), 2):
+        rows = [row[:] for row in grid]
+        rows[i], rows[j] = rows[j], rows[i]
+        permutations.append(sum(rows, []))
+        columns = [row[:] for row in grid]
+        for row in columns:
+            row[i], row[j] = row[j], row[i]
+        permutations.append(sum(columns, []))
+    permutations.append([grid[col][row] for row in range(PLAYFAIR_SIZE)
+                         for col in range(PLAYFAIR_SIZE)])
+    permutations.append(sum(grid[::-1], []))
+    permutations.append(sum([row[::-1] for row in grid], []))
+    return permutations
+
+DECRYPT_POSITIONS = playfair_digram_positions()
+SQUARE_PERMUTATIONS = square_permutations()
+if np is not None:
+    DECRYPT_POSITIONS = np.array(DECRYPT_POSITIONS)
+    PLAYFAIR_VALUES = np.array(PLAYFAIR_VALUES)
+    SQUARE_PERMUTATIONS = [np.array(permutation) for permutation in SQUARE_PERMUTATIONS]
+
+def playfair_digrams(text):
+    '''Gets the letters of Playfair ciphertext as digrams, in the same way as
+    Playfair.decrypt: a run of letters of odd length loses its last letter.
+
+    Args:
+        text (str/list): The ciphertext, or a list of its lines
+
+    Returns:
+        first, second (numpy.ndarray/list): The index in Playfair.ALPHABET of
+        the first and second letter of each digram
+    '''
+
+    lines = [text] if isinstance(text, str) else text
+    letters = ''.join([word[:len(word) - len(word)%2]
+                       for line in lines
+                       for word, is_letters in split_words(line.lower().replace('j', 'i'))
+                       if is_letters])
+    indices = [PLAYFAIR_INDICES[letter] for letter in letters]
+    if np is not None:
+        indices = np.array(indices, dtype=np.intp)
+    return indices[0::2], indices[1::2]
+
+def decrypt_square(square, first, second):
+    '''Decrypts digrams with a key square, using the position arrays made by
+    playfair_digram_positions instead of a Playfair object.
+
+    Args:
+        square (numpy.ndarray/list): The index in Playfair.ALPHABET of the
+        letter at each position of the square
+        first, second (numpy.ndarray/list): The letter indices of the first
+        and second letter of each ciphertext digram
+
+    Returns:
+        values (numpy.ndarray/list): The letter value of each plaintext letter
+    '''
+
+    if np is not None:
+        where = np.empty(PLAYFAIR_LETTERS, dtype=np.intp)
+        where[square] = np.arange(PLAYFAIR_LETTERS)
+        pairs = where[first] * PLAYFAIR_LETTERS + where[second]
+        return PLAYFAIR_VALUES[square[DECRYPT_POSITIONS[pairs]]].reshape(-1)
+
+    where = [0] * PLAYFAIR_LETTERS
+    for position, letter in enumerate(square):
+        where[letter] = position
+    values = []
+    for letter1, letter2 in zip(first, second):
+        for position in DECRYPT_POSITIONS[where[letter1] * PLAYFAIR_LETTERS + where[letter2]]:
+            values.append(PLAYFAIR_VALUES[square[position]])
+    return values
+
+def move_square(square, rng):
+    '''Makes a random change to a key square: usually a swap of two letters,
+    and otherwise one of the rearrangements from square_permutations.
+
+    Args:
+        square (numpy.ndarray/list): The key square
+        rng (random.Random): The random number generator used
+
+    Returns:
+        new_square (numpy.ndarray/list): The changed copy of the key square
+    '''
+
+    if rng.random() < SWAP_CHANCE:
+        i, j = rng.sample(range(PLAYFAIR_LETTERS), 2)
+        new_square = square.copy()
+        new_square[i], new_square[j] = square[j], square[i]
+        return new_square
+    permutation = rng.choice(SQUARE_PERMUTATIONS)
+    if np is not None:
+        return square[permutation]
+    return [square[position] for position in permutation]
+
+def polish_square(square, score, first, second, model):
+    '''Hill climbs from a key square by trying every swap of two letters and
+    every rearrangement from square_permutations, keeping the best change,
+    until none of them makes the score better. This fixes the last few
+    letters of a square that annealing has got nearly right.
+
+    Args:
+        square (numpy.ndarray/list): The key square
+        score (float): The score of the key square
+        first, second (numpy.ndarray/list): The letter indices of the first
+        and second letter of each ciphertext digram
+        model (NgramModel): The n-gram model used for scoring decryptions
+
+    Returns:
+        score (float): The score of the polished key square
+        square (numpy.ndarray/list): The polished key square
+    '''
+
+    while True:
+        candidates = []
+        for i, j in itertools.combinations(range(PLAYFAIR_LETTERS), 2):
+            new_square = square.copy()
+            new_square[i], new_square[j] = square[j], square[i]
+            candidates.append(new_square)
+        for permutation in SQUARE_PERMUTATIONS:
+            candidates.append(square[permutation] if np is not None
+                              else [square[position] for position in permutation])
+        new_score, new_square = max(((model.score_values(decrypt_square(candidate, first, second)),
+                                      candidate) for candidate in candidates),
+                                    key=lambda result: result[0])
+        if new_score <= score:
+            return score, square
+        score, square = new_score, new_square
+
+shared_best = None
+worker_model = None
+
+def set_playfair_worker(best, model):
+    '''Sets the shared best score and the n-gram model used by anneal_playfair
+    in this process.
+
+    Args:
+        best (multiprocessing.Value): The best score found by any restart so
+        far, shared by every process
+        model (NgramModel): The n-gram model used for scoring decryptions
+    '''
+
+    global shared_best, worker_model
+    shared_best = best
+    worker_model = model
+
+def anneal_playfair(first, second, iterations, seed, target):
+    '''Runs one restart of simulated annealing over Playfair key squares,
+    starting from a random square. A change that makes the decryption score
+    better is always kept, and one that makes it worse by delta is kept with a
+    chance of exp(delta / temperature), where the temperature falls to zero
+    over the run, and the best square is then finished off with polish_square.
+    Every CHECK_INTERVAL moves, the best score is shared with
+    the other restarts. The run stops if any restart has reached the target
+    score, or if it's past ABANDON_PROGRESS of the way through and still
+    ABANDON_GAP per letter behind the best score of another restart, as it's
+    too cold by then to catch up.
+
+    Args:
+        first, second (numpy.ndarray/list): The letter indices of the first
+        and second letter of each ciphertext digram
+        iterations (int): The number of moves tried
+        seed (int): The seed of the random number generator
+        target (float): The score that's good enough to stop at, or None to
+        never stop early
+
+    Returns:
+        score (float): The best score found
+        square (list): The key square with that score
+    '''
+
+    rng = random.Random(seed)
+    square = rng.sample(range(PLAYFAIR_LETTERS), PLAYFAIR_LETTERS)
+    if np is not None:
+        square = np.array(square)
+    score = worker_model.score_values(decrypt_square(square, first, second))
+    best_score, best_square = score, square
+    start_temperature = TEMPERATURE_PER_LETTER * 2 * len(first)
+    gap = ABANDON_GAP * 2 * len(first)
+
+    for i in range(iterations):
+        if i % CHECK_INTERVAL == 0:
+            with shared_best.get_lock():
+                shared_best.value = max(shared_best.value, best_score)
+                overall_best = shared_best.value
+            if target is not None and overall_best >= target:
+                break
+            if i >= ABANDON_PROGRESS * iterations and best_score < overall_best - gap:
+                break
+        new_square = move_square(square, rng)
+        new_score = worker_model.score_values(decrypt_square(new_square, first, second))
+        delta = new_score - score
+        temperature = start_temperature * (1 - i / iterations)
+        if delta >= 0 or (temperature > 0 and rng.random() < math.exp(delta / temperature)):
+            square, score = new_square, new_score
+            if score > best_score:
+                best_score, best_square = score, square
+
+    best_score, best_square = polish_square(best_square, best_score, first, second,
+                                            worker_model)
+    with shared_best.get_lock():
+        shared_best.value = max(shared_best.value, best_score)
+    return best_score, [int(letter) for letter in best_square]
+
+def crack_playfair(text, model, restarts=PLAYFAIR_RESTARTS,
+                   iterations=PLAYFAIR_ITERATIONS, workers=None, target=None,
+                   seed=None, progress=None):
+    '''Cracks a Playfair cipher by simulated annealing over key squares,
+    scoring each candidate decryption with an n-gram model. Each restart
+    starts from a different random square. If a number of workers is given,
+    the restarts are run in a pool of processes. The restarts share the best
+    score found so far, so the ones left far behind can give up early, and
+    all of them stop once one reaches the target score, if one is given.
+
+    Args:
+        text (str/list): The ciphertext, or a list of its lines
+        model (NgramModel): The n-gram model used for scoring decryptions
+        restarts (int): The number of restarts (default is PLAYFAIR_RESTARTS)
+        iterations (int): The number of moves tried in each restart (default
+        is PLAYFAIR_ITERATIONS)
+        workers (int): The number of processes used (default is None, which
+        runs the restarts in this process)
+        target (float): The score that's good enough to stop at (default is
+        None, which runs every restart to the end)
+        seed (int): The seed of the random number generators, for repeatable
+        results (default is None)
+        progress (function): Called with the number of restarts finished, the
+        number of restarts and the best score so far each time a restart
+        finishes (default is None)
+
+    Returns:
+        key (str): The letters of the best key square, which can be used as the
+        key of a Playfair cipher
+        score (float): The n-gram score of the decryption with that key
+    '''
+
+    first, second = playfair_digrams(text)
+    if len(first) == 0:
+        return ''.join(Playfair.ALPHABET), 0.0
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(restarts)]
+    best = multiprocessing.Value('d', -math.inf)
+
+    results = []
+    def finish(result):
+        results.append(result)
+        if progress is not None:
+            progress(len(results), restarts, max(score for score, _ in results))
+
+    if workers is None or workers <= 1:
+        previous = shared_best, worker_model
+        set_playfair_worker(best, model)
+        try:
+            for restart_seed in seeds:
+                finish(anneal_playfair(first, second, iterations, restart_seed, target))
+        finally:
+            set_playfair_worker(*previous)
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                workers, initializer=set_playfair_worker, initargs=(best, model)) as executor:
+            futures = [executor.submit(anneal_playfair, first, second, iterations,
+                                       restart_seed, target)
+                       for restart_seed in seeds]
+            for future in concurrent.futures.as_completed(futures):
+                finish(future.result())
+
+    score, square = max(results, key=lambda result: result[0])
+    key = ''.join([Playfair.ALPHABET[letter] for letter in square])
+    return key, score
+
+# Rabin Cipher =================================================================
+
+RABIN_CONTEXT_LENGTH = 16
+
+def rank_rabin_decryptions(cipher, message, top=1, model=None, beam_width=100):
+    '''Ranks the possible decryptions of Rabin ciphertext with an n-gram model
+    instead of single letter frequencies, using the beam search of
+    Rabin.best_decryptions.
+
+    Args:
+        cipher (Rabin): The Rabin cipher the text was encrypted with
+        message (str): The ciphertext
+        top (int): The number of decryptions returned (default is 1)
+        model (NgramModel): The n-gram model (default is None, which uses
+        load_model)
+        beam_width (int): The number of partial decryptions kept at each
+        position (default is 100)
+
+    Returns:
+        best (list): Tuples containing the score and the decryption, best
+        first
+    '''
+
+    if model is None:
+        model = load_model()
+    return cipher.best_decryptions(message, top, beam_width, score=model.context_score,
+                                   context_length=RABIN_CONTEXT_LENGTH)
@@ -1,11 +1,23 @@
 '''The module containing extra functions used in other modules for getting a
-valid key, checking if a number is prime, checking if a number is invertible,
-and doing fast exponentiation calculations.
+valid key (or raising InvalidKeyError when the user can't be asked for
+one), checking if a number is invertible, finding modular square roots,
+and doing fast exponentiation calculations. is_prime is imported from the
+primality module so that it can be used from here as before. The number
+theory functions are timed by the metrics module while it's enabled.
 '''
 
-import random
+import functools
+import math
+import metrics
+from primality import is_prime, miller_rabin_test
 
-def valid_int_key(key, condition_true, error_prompt=None, input_prompt=None):
+class InvalidKeyError(ValueError):
+    '''Raised instead of asking for a new key when a key isn't valid and the
+    cipher isn't being made interactively.
+    '''
+
+def valid_int_key(key, condition_true, error_prompt=None, input_prompt=None,
+                  interactive=True):
     '''Checks if a key is a valid integer and, if it's not, continually asks the
     user to input a new key until the input is valid.
 
@@ -17,9 +29,14 @@ def valid_int_key(key, condition_true, error_prompt=None, input_prompt=None):
             (default is None)
         input_prompt (str): The input message that asks for a new key
             (default is None)
+        interactive (bool): Whether the user is asked for a new key when key is
+            not valid (default is True)
 
     Returns:
         key (int): The valid key
+
+    Raises:
+        InvalidKeyError: If key is not valid and interactive is False
     '''
     
     if error_prompt is None:
@@ -29,24 +46,18 @@ def valid_int_key(key, condition_true, error_prompt=None, input_prompt=None):
         
     valid = False
     while not valid:
-        if isinstance(key, int):
-            if condition_true(key):
-                valid = True
-            else:
-                print(error_prompt)
-                key = input(input_prompt)
-        elif isinstance(key, str):
-            if key.isnumeric():
-                key = int(key)
-            else:
-                print(error_prompt)
-                key = input(input_prompt)
-        elif isinstance(key, float):
+        if isinstance(key, str) and key.isnumeric():
+            key = int(key)
+        if isinstance(key, int) and condition_true(key):
+            valid = True
+        elif interactive:
             print(error_prompt)
             key = input(input_prompt)
+        else:
+            raise InvalidKeyError(error_prompt)
     return key
 
-def valid_str_key(key, error_prompt=None, input_prompt=None):
+def valid_str_key(key, error_prompt=None, input_prompt=None, interactive=True):
     '''Checks if a key is a valid string and, if it's not, continually asks the
     user to input a new key until the input is valid.
 
@@ -56,9 +67,14 @@ def valid_str_key(key, error_prompt=None, input_prompt=None):
             (default is None)
         input_prompt (str): The input message that asks for a new key
             (default is None)
+        interactive (bool): Whether the user is asked for a new key when key is
+            not valid (default is True)
 
     Returns:
         key (str): The valid key
+
+    Raises:
+        InvalidKeyError: If key is not valid and interactive is False
     '''
     
     if error_prompt is None:
@@ -69,74 +85,16 @@ def valid_str_key(key, error_prompt=None, input_prompt=None):
         
     valid = False
     while not valid:
-        if not isinstance(key, str):
+        if isinstance(key, str) and key.isalpha():
+            valid = True
+        elif interactive:
             print(error_prompt)
             key = input(input_prompt)
         else:
-            valid = True
-            if not key.isalpha():
-                valid = False
-                print(error_prompt)
-                key = input(input_prompt)
+            raise InvalidKeyError(error_prompt)
     return key
                 
-def is_prime(num):
-    '''Checks if number is prime. If number is 2, then it is prime. Otherwise,
-    if number is less than or equal to 1 or number is even, then it is not prime.
-    Otherwise, the Miller-Rabin test is run up to 100 times with a random base.
-    If one of the tests comes back negative, then number is not prime.
-    Otherwise, the number will be prime.
-
-    Args:
-        num (int): The number being checked to see if it's prime
-
-    Returns:
-        True/False (bool): The result of whether number is prime
-    '''
-    
-    if num == 2:
-        return True
-    elif num <= 1 or num % 2 == 0:
-        return False
-    else:
-        for i in range(100):
-            base = random.randint(1, num-1)
-            if miller_rabin_test(num, base) is False:
-                return False
-    return True
-
-def miller_rabin_test(num, base):
-    '''Runs a Miller-Rabin primality test. Gets positive integer 's' and odd
-    positive integer 'd' where num - 1 = 2**s * d. If base**d is congruent to
-    1 mod num, num is prime. Otherwise, for each integer 'r' from 0 to s - 1,
-    if base**(2**r * d) is congruent to -1 mod num, num is prime. Otherwise,
-    num is not prime.
-
-    Args:
-        num (int): The number being checked to see if it's prime
-        base (int): The base number used for checking the primality
-        of the number
-
-    Returns:
-        True/False (bool): The result of whether the number is prime
-    '''
-    
-    s = 1
-    d = None
-    while d is None:
-        if ((num-1) // 2**s) % 2 == 1:
-            d = (num - 1) // 2**s
-        else:
-            s += 1
-
-    if fast_exponentiation(base, d, num) == 1:
-        return True
-
-    for r in range(s):
-        if fast_exponentiation(base, 2**r * d, num) == num-1:
-            return True
-    return False
-
+@metrics.timed('fast_exponentiation')
 def fast_exponentiation(base, exponent, modulus):
     '''Calculates the equation a**m mod n, where m and n can be large,
     by using exponentiation by squaring.
@@ -175,21 +133,137 @@ def fast_exponentiation(base, exponent, modulus):
             exponents_list.pop()
     return final_result
 
+@metrics.timed('crt_exponentiation')
+def crt_exponentiation(base, dp, dq, p, q, q_inverse):
+    '''Calculates the equation a**d mod pq, where p and q are different primes,
+    by using the Chinese Remainder Theorem. The calculation is done mod p and
+    mod q with exponents about half the size of d, which is about four times
+    quicker than doing it mod pq, and the two results are then combined.
+
+    Args:
+        base (int): The base number 'a' in the calculation
+        dp (int): The exponent 'd' reduced mod p-1
+        dq (int): The exponent 'd' reduced mod q-1
+        p, q (int): The two primes whose product is the modulus
+        q_inverse (int): The multiplicative inverse of q in mod p
+
+    Returns:
+        result (int): The result of the calculation
+    '''
+
+    result_p = pow(base, dp, p)
+    result_q = pow(base, dq, q)
+    h = q_inverse * (result_p - result_q) % p
+    result = result_q + h * q
+    return result
+
+@metrics.timed('modular_sqrt')
+def modular_sqrt(num, prime):
+    '''Finds a square root of a number in mod a prime. If the prime is congruent
+    to 3 mod 4, the root is num**((prime+1)/4) mod prime. Otherwise, the
+    Tonelli-Shanks algorithm is used.
+
+    Args:
+        num (int): The number whose square root is found
+        prime (int): The prime number used as the modulus
+
+    Returns:
+        root (int): A number whose square is congruent to num mod prime
+
+    Raises:
+        ValueError: If num has no square root in mod prime
+    '''
+
+    num %= prime
+    if num == 0 or prime == 2:
+        return num
+    if prime % 4 == 3:
+        root = pow(num, (prime+1) // 4, prime)
+        if root**2 % prime != num:
+            raise ValueError(f'{num} has no square root in mod {prime}.')
+        return root
+    s, d, c = tonelli_shanks_constants(prime)
+    x = pow(num, (d-1) // 2, prime)
+    root = x * num % prime
+    t = x * root % prime
+    m = s
+    while t != 1:
+        i, t_squared = 0, t
+        while t_squared != 1:
+            t_squared = t_squared**2 % prime
+            i += 1
+        if i == m:
+            raise ValueError(f'{num} has no square root in mod {prime}.')
+        b = pow(c, 2**(m-i-1), prime)
+        m = i
+        c = b**2 % prime
+        t = t * c % prime
+        root = root * b % prime
+    return root
+
+@functools.lru_cache(maxsize=64)
+def tonelli_shanks_constants(prime):
+    '''Gets the numbers the Tonelli-Shanks algorithm needs for a prime, which
+    only have to be found once for each prime.
+
+    Args:
+        prime (int): The odd prime number used as the modulus
+
+    Returns:
+        s, d (int): The numbers in the equation 'prime - 1 = 2**s * d', where d
+        is odd
+        c (int): z**d mod prime, where z is the smallest number with no square
+        root in mod prime
+    '''
+
+    s, d = 0, prime - 1
+    while d % 2 == 0:
+        s += 1
+        d //= 2
+    non_residue = 2
+    while pow(non_residue, (prime-1) // 2, prime) != prime-1:
+        non_residue += 1
+    c = pow(non_residue, d, prime)
+    return s, d, c
+
+@metrics.timed('is_invertible')
 def is_invertible(num, phi_n):
     '''Checks if number has a multiplicative inverse in mod Φ(n) by running
     the extended Euclidean algorithm. If the greatest common divisor of the
     number and Φ(n) equals 1, then the number is invertible and returns the
     multiplicative inverse mod Φ(n). Otehrwise, the number isn't invertible.
+    A list of candidate numbers can be checked at once. Candidates less than
+    half the size of Φ(n) only take a few steps of the Euclidean algorithm, so
+    they're checked one at a time, and the inverses of the rest are found
+    together with batch_inverse.
 
     Args:
-        num (int): The number being checked to see if it's invertible
+        num (int/list): The number being checked to see if it's invertible, or
+        a list of numbers
         phi_n (int): Represents value for Φ(n)
 
     Returns:
         invertible (bool): The result of whether number is invertible
         d (int): The multiplicative inverse of the number in mod Φ(n)
+        If a list of numbers is given, a list of (invertible, d) tuples is
+        returned instead, in the same order as the numbers
     '''
 
+    if not isinstance(num, int):
+        results = []
+        large = []
+        for candidate in num:
+            if 2 * candidate.bit_length() <= phi_n.bit_length():
+                results.append(is_invertible(candidate, phi_n))
+            elif math.gcd(candidate, phi_n) == 1:
+                results.append(True)
+                large.append(candidate)
+            else:
+                results.append((False, None))
+        inverses = iter(batch_inverse(large, phi_n))
+        return [(True, next(inverses)) if result is True else result
+                for result in results]
+
     gcd, x, _ = extended_gcd(num, phi_n)
     if gcd == 1:
         invertible = True
@@ -199,9 +273,48 @@ def is_invertible(num, phi_n):
         d = None
     return invertible, d
 
+@metrics.timed('batch_inverse')
+def batch_inverse(nums, modulus):
+    '''Finds the multiplicative inverses of a list of numbers in the same
+    modulus with Montgomery's trick. The running products of the numbers are
+    found, the last one is inverted, and each inverse is then worked back out
+    of it, so only one inversion and 3(k-1) multiplications are done for k
+    numbers.
+
+    Args:
+        nums (list): The numbers being inverted, which all need to be
+        invertible in the modulus
+        modulus (int): The modulus the inverses are found in
+
+    Returns:
+        inverses (list): The multiplicative inverse of each number, in the
+        same order as the numbers
+
+    Raises:
+        ValueError: If one of the numbers isn't invertible in the modulus
+    '''
+
+    if not nums:
+        return []
+    products = [nums[0] % modulus]
+    for num in nums[1:]:
+        products.append(products[-1] * num % modulus)
+
+    inverse = pow(products[-1], -1, modulus)
+    inverses = [0] * len(nums)
+    for i in range(len(nums)-1, 0, -1):
+        inverses[i] = inverse * products[i-1] % modulus
+        inverse = inverse * nums[i] % modulus
+    inverses[0] = inverse
+    return inverses
+
+@metrics.timed('extended_gcd')
 def extended_gcd(a, n):
     '''Finds the greatest common divisor of two numbers 'a' and 'n' and finds
-    the two numbers 'x' and 'y' in the equation 'gcd = ax + ny'
+    the two numbers 'x' and 'y' in the equation 'gcd = ax + ny'. The Euclidean
+    algorithm is run in a loop, so numbers of any size can be used. Only the
+    number for the larger of 'a' and 'n' is worked out in the loop, as it stays
+    small, and the other is found from the equation at the end.
 
     Args:
         a, n (int): The two numbers used to find the greatest common divisor
@@ -210,11 +323,22 @@ def extended_gcd(a, n):
         gcd (int): The greatest common divisor of the two numbers
         x, y (int): The two numbers in the equation 'gcd = ax + ny'
     '''
-    if a == 0 : 
+
+    if a == 0:
         return n, 0, 1
-    
-    gcd, x1, y1 = extended_gcd(n%a, a) 
+    if n == 0:
+        return a, 1, 0
+    swapped = abs(a) <= abs(n)
+    if swapped:
+        a, n = n, a
 
-    x = y1 - (n//a) * x1 
-    y = x1
-    return gcd, x, y
+    old_r, r = a, n
+    old_x, x = 1, 0
+    while r != 0:
+        quotient = old_r // r
+        old_r, r = r, old_r - quotient*r
+        old_x, x = x, old_x - quotient*x
+    y = (old_r - a*old_x) // n
+    if swapped:
+        return old_r, y, old_x
+    return old_r, old_x, y
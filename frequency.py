@@ -0,0 +1,224 @@
+'''The module containing the letter histogram used for frequency analysis of
+ciphertext.
+
+Letters are counted in bulk, with numpy.bincount when NumPy is installed or
+bytes.count when it's not, so text can be counted a chunk at a time as it's
+read. Histograms are immutable and can be added together, so the histograms of
+different chunks, counted in different processes, can be merged into one that
+is shared by every cracker.
+'''
+
+import concurrent.futures
+import os
+from ciphers import LETTERS, NUM_LETTERS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHUNK_SIZE = 16 * 2**20
+
+def letter_histogram(data):
+    '''Counts each ASCII letter in text or bytes, with uppercase letters counted
+    as lowercase letters.
+
+    Args:
+        data (str/bytes): The text or bytes being counted
+
+    Returns:
+        counts (list): The number of times each letter appears, in
+        alphabetical order
+    '''
+
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    if np is not None:
+        byte_counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+        counts = byte_counts[ord('a'):ord('z')+1] + byte_counts[ord('A'):ord('Z')+1]
+        return counts.tolist()
+    data = bytes(data).lower()
+    counts = [data.count(letter) for letter in LETTERS.encode()]
+    return counts
+
+def count_file_range(file, start, length):
+    '''Counts the letters in part of a file, reading it a chunk at a time.
+
+    Args:
+        file (str): The file location
+        start (int): The position of the first byte counted
+        length (int): The number of bytes counted
+
+    Returns:
+        histogram (LetterHistogram): The letter counts of that part of the file
+    '''
+
+    histogram = LetterHistogram()
+    with open(file, 'rb') as infile:
+        infile.seek(start)
+        while length > 0:
+            data = infile.read(min(CHUNK_SIZE, length))
+            if not data:
+                break
+            histogram += LetterHistogram.from_text(data)
+            length -= len(data)
+    return histogram
+
+class LetterHistogram():
+    '''Attributes:
+        counts (tuple): The number of times each letter appears, in alphabetical
+        order
+    '''
+
+    __slots__ = ('counts',)
+
+    def __init__(self, counts=None):
+        '''Args:
+            counts (list): The number of times each letter appears, in
+            alphabetical order (default is None, which counts no letters)
+        '''
+
+        if counts is None:
+            counts = [0] * NUM_LETTERS
+        if len(counts) != NUM_LETTERS:
+            raise ValueError(f'A letter histogram needs {NUM_LETTERS} counts.')
+        object.__setattr__(self, 'counts', tuple(int(count) for count in counts))
+
+    @classmethod
+    def from_text(cls, text):
+        '''Counts the letters in text or bytes.
+
+        Args:
+            text (str/bytes): The text being counted
+
+        Returns:
+            histogram (LetterHistogram): The letter counts of the text
+        '''
+
+        return cls(letter_histogram(text))
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        '''Counts the letters in text given a chunk at a time, like the lines of
+        a file. Small chunks are joined together before they're counted.
+
+        Args:
+            chunks (iterable): The pieces of text being counted
+
+        Returns:
+            histogram (LetterHistogram): The letter counts of all the chunks
+        '''
+
+        histogram = cls()
+        buffer = bytearray()
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8', 'surrogatepass')
+            buffer += chunk
+            if len(buffer) >= CHUNK_SIZE:
+                histogram += cls.from_text(buffer)
+                buffer.clear()
+        histogram += cls.from_text(buffer)
+        return histogram
+
+    @classmethod
+    def from_file(cls, file, workers=None):
+        '''Counts the letters in a file, reading it a chunk at a time. If a
+        number of workers is given, the file is split into that many parts,
+        which are counted in a pool of processes and then merged.
+
+        Args:
+            file (str): The file location
+            workers (int): The number of processes used (default is None,
+            which counts the file in this process)
+
+        Returns:
+            histogram (LetterHistogram): The letter counts of the file
+        '''
+
+        size = os.path.getsize(file)
+        if size == 0 or workers is None or workers <= 1:
+            return count_file_range(file, 0, size)
+        length = -(-size // workers)
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            parts = executor.map(count_file_range, [file] * workers,
+                                 range(0, workers * length, length),
+                                 [length] * workers)
+            return sum(parts, cls())
+
+    def __setattr__(self, name, value):
+        raise AttributeError("'LetterHistogram' object is immutable")
+
+    def __reduce__(self):
+        return LetterHistogram, (self.counts,)
+
+    def __add__(self, other):
+        if not isinstance(other, LetterHistogram):
+            return NotImplemented
+        return LetterHistogram([a + b for a, b in zip(self.counts, other.counts)])
+
+    def __eq__(self, other):
+        if not isinstance(other, LetterHistogram):
+            return NotImplemented
+        return self.counts == other.counts
+
+    def __hash__(self):
+        return hash(self.counts)
+
+    def __getitem__(self, letter):
+        return self.counts[LETTERS.index(letter)]
+
+    def __str__(self):
+        return ', '.join(f'{letter}: {count}' for letter, count in self.items())
+
+    def __repr__(self):
+        return f'LetterHistogram({list(self.counts)})'
+
+    def total(self):
+        '''Returns the number of letters counted.'''
+
+        return sum(self.counts)
+
+    def items(self):
+        '''Returns a list of tuples containing each letter that appears and its
+        count, in alphabetical order.
+        '''
+
+        return [(letter, count) for letter, count in zip(LETTERS, self.counts)
+                if count > 0]
+
+    def as_dict(self):
+        '''Returns a dictionary containing the count of each letter that appears,
+        in the format returned by get_frequency.
+        '''
+
+        return dict(self.items())
+
+    def frequencies(self):
+        '''Returns the proportion of the letters that each letter makes up, in
+        alphabetical order, which are all zero if no letters were counted.
+        '''
+
+        total = self.total()
+        return tuple(count / total if total else 0.0 for count in self.counts)
+
+    def most_frequent(self, exclude=()):
+        '''Gets the most frequent letter/s and their count, like
+        get_most_frequent, leaving out some letters.
+
+        Args:
+            exclude (iterable): The letters left out (default is ())
+
+        Returns:
+            most_frequent (list): A list of tuples containing the most frequent
+            letter/s and their count, which is empty if no letters are left
+        '''
+
+        items = [(letter, count) for letter, count in self.items()
+                 if letter not in exclude]
+        if not items:
+            return []
+        highest = max(count for _, count in items)
+        most_frequent = [(letter, count) for letter, count in items
+                         if count == highest]
+        return most_frequent
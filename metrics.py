@@ -0,0 +1,261 @@
+'''The module containing the opt-in metrics kept by the ciphers, the number
+theory functions and the cipher converter.
+
+Metrics are off until enable is called, and while they're off every
+instrumented call only checks one flag. While they're on, counters and timing
+histograms are kept for each cipher and function in this process, and can be
+exported with as_dict, or as Prometheus text with to_prometheus. Metrics of
+work done in a process pool stay in the worker processes.
+
+For finding where time goes inside a run rather than counting it,
+profile_call runs a function under cProfile and prints the sorted stats.
+'''
+
+import bisect
+import cProfile
+import functools
+import itertools
+import pstats
+import sys
+import threading
+import time
+
+TIMING_BUCKETS = (0.000001, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+PROFILE_LIMIT = 30
+DESCRIPTIONS = {'cipher_seconds': 'Time spent encrypting and decrypting, by cipher',
+                'cipher_characters_total': 'Characters or bytes encrypted and '
+                                           'decrypted, by cipher',
+                'function_seconds': 'Time spent in instrumented functions',
+                'modular_exponentiations_total': 'Modular exponentiations done by '
+                                                 'RSA and Rabin'}
+
+enabled = False
+lock = threading.Lock()
+counters = {}
+histograms = {}
+
+class Histogram():
+    '''Attributes:
+        counts (list): The number of observations in each bucket of
+        TIMING_BUCKETS, with one more bucket for larger observations
+        total (float): The sum of the observations
+    '''
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (len(TIMING_BUCKETS) + 1)
+        self.total = 0.0
+
+    def observe(self, value):
+        '''Adds an observation to its bucket.'''
+
+        self.counts[bisect.bisect_left(TIMING_BUCKETS, value)] += 1
+        self.total += value
+
+def enable():
+    '''Starts keeping metrics.'''
+
+    global enabled
+    enabled = True
+
+def disable():
+    '''Stops keeping metrics, leaving the ones kept so far.'''
+
+    global enabled
+    enabled = False
+
+def reset():
+    '''Clears every metric kept so far.'''
+
+    with lock:
+        counters.clear()
+        histograms.clear()
+
+def label_key(labels):
+    '''Returns labels given as keyword arguments as a sorted tuple of pairs,
+    which is used as part of the key of a metric.'''
+
+    return tuple(sorted(labels.items()))
+
+def increment(name, amount=1, **labels):
+    '''Adds to a counter, if metrics are enabled.
+
+    Args:
+        name (str): The name of the counter
+        amount (int): The amount added (default is 1)
+        **labels: The labels telling apart counters with the same name
+    '''
+
+    if not enabled:
+        return
+    key = (name, label_key(labels))
+    with lock:
+        counters[key] = counters.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    '''Adds an observation to a histogram, if metrics are enabled.
+
+    Args:
+        name (str): The name of the histogram
+        value (float): The observation, usually a time in seconds
+        **labels: The labels telling apart histograms with the same name
+    '''
+
+    if not enabled:
+        return
+    key = (name, label_key(labels))
+    with lock:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram()
+        histogram.observe(value)
+
+def timed(name):
+    '''Decorator that times each call of a function in the function_seconds
+    histogram while metrics are enabled.
+
+    Args:
+        name (str): The function label of the histogram
+
+    Returns:
+        decorator (function): Wraps a function
+    '''
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe('function_seconds', time.perf_counter() - start,
+                        function=name)
+        return wrapper
+    return decorator
+
+def cipher_operation(method):
+    '''Decorator for the encrypt and decrypt methods of a cipher, which times
+    each call in the cipher_seconds histogram and counts the characters or
+    bytes it was given in cipher_characters_total while metrics are enabled.
+    The cipher label is the class the method is defined in, so subclasses like
+    the frozen ciphers are counted with the cipher they're made from.
+
+    Args:
+        method (function): The method, which takes the message first
+
+    Returns:
+        wrapper (function): The wrapped method
+    '''
+
+    cipher, operation = method.__qualname__.rsplit('.', 1)
+    labels = label_key({'cipher': cipher, 'operation': operation})
+
+    @functools.wraps(method)
+    def wrapper(self, message, *args, **kwargs):
+        if not enabled:
+            return method(self, message, *args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return method(self, message, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            with lock:
+                key = ('cipher_characters_total', labels)
+                counters[key] = counters.get(key, 0) + len(message)
+                histogram = histograms.get(('cipher_seconds', labels))
+                if histogram is None:
+                    histogram = histograms[('cipher_seconds', labels)] = Histogram()
+                histogram.observe(elapsed)
+    return wrapper
+
+def as_dict():
+    '''Returns every metric kept so far as a dictionary.
+
+    Returns:
+        metrics (dict): Has 'counters', mapping each counter name to a list of
+        dictionaries with its labels and value, and 'histograms', mapping each
+        histogram name to a list of dictionaries with its labels, the
+        cumulative count of each bucket bound, the count and the sum
+    '''
+
+    with lock:
+        counter_items = sorted(counters.items())
+        histogram_items = sorted((key, list(histogram.counts), histogram.total)
+                                 for key, histogram in histograms.items())
+    metrics = {'counters': {}, 'histograms': {}}
+    for (name, labels), value in counter_items:
+        metrics['counters'].setdefault(name, []).append(
+            {'labels': dict(labels), 'value': value})
+    for (name, labels), counts, total in histogram_items:
+        cumulative = list(itertools.accumulate(counts))
+        buckets = dict(zip([str(bound) for bound in TIMING_BUCKETS] + ['+Inf'],
+                           cumulative))
+        metrics['histograms'].setdefault(name, []).append(
+            {'labels': dict(labels), 'buckets': buckets, 'count': cumulative[-1],
+             'sum': total})
+    return metrics
+
+def format_labels(labels):
+    '''Returns labels in the form used by Prometheus, like {cipher="RSA"}, or
+    an empty string if there are none.'''
+
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{value}"' for name, value in labels.items())
+    return '{' + pairs + '}'
+
+def to_prometheus():
+    '''Returns every metric kept so far in the Prometheus text format.'''
+
+    metrics = as_dict()
+    lines = []
+    for name, samples in metrics['counters'].items():
+        if name in DESCRIPTIONS:
+            lines.append(f'# HELP {name} {DESCRIPTIONS[name]}')
+        lines.append(f'# TYPE {name} counter')
+        for sample in samples:
+            lines.append(f"{name}{format_labels(sample['labels'])} {sample['value']}")
+    for name, samples in metrics['histograms'].items():
+        if name in DESCRIPTIONS:
+            lines.append(f'# HELP {name} {DESCRIPTIONS[name]}')
+        lines.append(f'# TYPE {name} histogram')
+        for sample in samples:
+            for bound, count in sample['buckets'].items():
+                labels = format_labels({**sample['labels'], 'le': bound})
+                lines.append(f'{name}_bucket{labels} {count}')
+            labels = format_labels(sample['labels'])
+            lines.append(f"{name}_sum{labels} {sample['sum']}")
+            lines.append(f"{name}_count{labels} {sample['count']}")
+    return '\n'.join(lines) + '\n' if lines else ''
+
+def profile_call(function, *args, sort='cumulative', limit=PROFILE_LIMIT,
+                 output=None, stream=None):
+    '''Runs a function under cProfile and prints its stats.
+
+    Args:
+        function (function): The function being profiled
+        *args: The arguments passed to the function
+        sort (str): The pstats key the stats are sorted by (default is
+        'cumulative')
+        limit (int): The number of functions printed (default is
+        PROFILE_LIMIT)
+        output (str): The file the raw stats are also saved in, for loading
+        with pstats later (default is None)
+        stream (file): Where the stats are printed (default is None, which is
+        standard error)
+
+    Returns:
+        result: The value returned by the function
+    '''
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(function, *args)
+    finally:
+        if output is not None:
+            profiler.dump_stats(output)
+        stats = pstats.Stats(profiler, stream=stream or sys.stderr)
+        stats.sort_stats(sort).print_stats(limit)
@@ -0,0 +1,435 @@
+'''The module containing the n-gram model used for scoring how much text looks
+like English.
+
+A model holds the log probability of every sequence of n letters, counted from
+a corpus of English text, in a flat table indexed by the n-gram's value in
+base 26, so the n-grams of a whole text can be looked up at once with NumPy.
+Sequences that never appear in the corpus are given a floor probability
+instead of zero, so one unseen n-gram doesn't rule a text out.
+
+The tables for monograms through quadgrams can be built once from a corpus
+with build_tables, or by running this module, and saved as binary files of
+float32 values. Saved tables are memory-mapped the first time they're used, so
+only the pages that are looked up are read, and every process that loads the
+same table shares the same pages.
+'''
+
+import argparse
+import functools
+import math
+import mmap
+import os
+import struct
+from array import array
+from ciphers import NUM_LETTERS
+from frequency import CHUNK_SIZE
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+FLOOR_COUNT = 0.01
+NGRAM_DIRECTORY = 'ngrams'
+NGRAM_FILES = {1: 'monograms.bin', 2: 'bigrams.bin', 3: 'trigrams.bin',
+               4: 'quadgrams.bin'}
+TABLE_MAGIC = b'NGRM'
+TABLE_HEADER = struct.Struct('<4sIf4x')
+
+def letter_values(text):
+    '''Gets the value of each letter of text or bytes, with uppercase letters
+    treated as lowercase letters and every other character left out.
+
+    Args:
+        text (str/bytes): The text whose letters are found
+
+    Returns:
+        values (numpy.ndarray/list): The value of each letter, between 0 and 25
+    '''
+
+    if isinstance(text, str):
+        text = text.encode('utf-8', 'surrogatepass')
+    text = bytes(text).lower()
+    if np is not None:
+        codes = np.frombuffer(text, dtype=np.uint8)
+        return (codes[(codes >= ord('a')) & (codes <= ord('z'))] - ord('a')).astype(np.intp)
+    return [code - ord('a') for code in text if ord('a') <= code <= ord('z')]
+
+def ngram_indices(values, n):
+    '''Turns a sequence of letter values into the index of each of its
+    n-grams, which is the n-gram's value in base 26. With NumPy, a 2D array
+    of sequences can be given, which turns each row into a row of indices.
+
+    Args:
+        values (numpy.ndarray/list): The value of each letter
+        n (int): The number of letters in each n-gram
+
+    Returns:
+        indices (numpy.ndarray/list): The index of each n-gram, in the order
+        they appear
+    '''
+
+    if np is not None:
+        values = np.asarray(values, dtype=np.intp)
+        count = values.shape[-1] - n + 1
+        if count <= 0:
+            return np.zeros(values.shape[:-1] + (0,), dtype=np.intp)
+        indices = values[..., :count].copy()
+        for k in range(1, n):
+            indices *= NUM_LETTERS
+            indices += values[..., k:k+count]
+        return indices
+    indices = []
+    for i in range(len(values) - n + 1):
+        index = 0
+        for value in values[i:i+n]:
+            index = index * NUM_LETTERS + value
+        indices.append(index)
+    return indices
+
+def count_ngrams(chunks, sizes):
+    '''Counts the n-grams of several sizes in a corpus given a chunk at a
+    time, reading the corpus only once. The last few letters of each chunk are
+    kept, so n-grams that cross from one chunk into the next are still
+    counted.
+
+    Args:
+        chunks (iterable): The pieces of the corpus
+        sizes (list): The numbers of letters in the n-grams counted
+
+    Returns:
+        counts (dict): The count of every n-gram of each size, indexed by
+        ngram_indices
+    '''
+
+    counts = {n: np.zeros(NUM_LETTERS**n, dtype=np.int64) if np is not None
+              else [0] * NUM_LETTERS**n for n in sizes}
+    kept = max(sizes) - 1
+    carried = []
+    for chunk in chunks:
+        values = letter_values(chunk)
+        if np is not None:
+            values = np.concatenate((np.array(carried, dtype=np.intp), values))
+        else:
+            values = carried + values
+        for n in sizes:
+            # Skip the n-grams that lie wholly in the carried letters, which
+            # were counted with the last chunk.
+            start = max(len(carried) - n + 1, 0)
+            if np is not None:
+                counts[n] += np.bincount(ngram_indices(values[start:], n),
+                                         minlength=NUM_LETTERS**n)
+            else:
+                for index in ngram_indices(values[start:], n):
+                    counts[n][index] += 1
+        carried = list(values[max(len(values) - kept, 0):]) if kept else []
+    return counts
+
+def map_table(file):
+    '''Memory-maps the log probabilities of a table saved by NgramModel.save.
+
+    Args:
+        file (str): The location of the table file
+
+    Returns:
+        log_probabilities (numpy.ndarray/memoryview): The read-only table
+    '''
+
+    with open(file, 'rb') as infile:
+        mapped = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    if np is not None:
+        return np.frombuffer(mapped, dtype='<f4', offset=TABLE_HEADER.size)
+    return memoryview(mapped)[TABLE_HEADER.size:].cast('f')
+
+class NgramModel():
+    '''Attributes:
+        n (int): The number of letters in each n-gram
+        floor (float): The log probability given to n-grams that weren't in
+        the corpus
+        file (str): The location of the table file the model was loaded from
+        (None if it wasn't loaded from a file)
+        table (numpy.ndarray/list/memoryview): The natural log probability of
+        every n-gram, indexed by ngram_indices (None until a loaded table is
+        first used)
+    '''
+
+    __slots__ = ('n', 'floor', 'file', 'table')
+
+    def __init__(self, n, log_probabilities, floor, file=None):
+        '''Args:
+            n (int): The number of letters in each n-gram
+            log_probabilities (numpy.ndarray/list): The log probability of
+            every n-gram, 26**n of them, or None if they're mapped from file
+            when they're first used
+            floor (float): The log probability of n-grams that weren't in the
+            corpus
+            file (str): The location of the table file (default is None)
+        '''
+
+        if log_probabilities is not None and len(log_probabilities) != NUM_LETTERS**n:
+            raise ValueError(f'A {n}-gram model needs {NUM_LETTERS**n} log probabilities.')
+        self.n = n
+        self.floor = floor
+        self.file = file
+        self.table = log_probabilities
+
+    def __str__(self):
+        return f'{self.n}-gram model'
+
+    def __repr__(self):
+        return f'NgramModel(n={self.n}, floor={self.floor}, file={self.file!r})'
+
+    def __reduce__(self):
+        if self.file is not None:
+            return NgramModel.load, (self.file,)
+        return NgramModel, (self.n, self.table, self.floor)
+
+    @property
+    def log_probabilities(self):
+        '''The log probability of every n-gram, mapped from the table file the
+        first time it's needed.
+        '''
+
+        if self.table is None:
+            self.table = map_table(self.file)
+        return self.table
+
+    @classmethod
+    def from_counts(cls, n, counts):
+        '''Makes a model from the number of times each n-gram appears.
+
+        Args:
+            n (int): The number of letters in each n-gram
+            counts (numpy.ndarray/list): The count of every n-gram, indexed by
+            ngram_indices
+
+        Returns:
+            model (NgramModel): The n-gram model
+        '''
+
+        if np is not None:
+            counts = np.asarray(counts)
+        total = max(int(sum(counts)) if np is None else int(counts.sum()), 1)
+        floor = math.log(FLOOR_COUNT / total)
+        if np is not None:
+            log_probabilities = np.full(len(counts), floor)
+            seen = counts > 0
+            log_probabilities[seen] = np.log(counts[seen] / total)
+        else:
+            log_probabilities = [math.log(count / total) if count else floor
+                                 for count in counts]
+        return cls(n, log_probabilities, floor)
+
+    @classmethod
+    def from_text(cls, text, n=4):
+        '''Makes a model by counting the n-grams of the letters of a corpus,
+        ignoring every other character.
+
+        Args:
+            text (str/bytes): The corpus of English text
+            n (int): The number of letters in each n-gram (default is 4)
+
+        Returns:
+            model (NgramModel): The n-gram model
+        '''
+
+        return cls.from_chunks([text], n)
+
+    @classmethod
+    def from_chunks(cls, chunks, n=4):
+        '''Makes a model from a corpus given a chunk at a time.
+
+        Args:
+            chunks (iterable): The pieces of the corpus
+            n (int): The number of letters in each n-gram (default is 4)
+
+        Returns:
+            model (NgramModel): The n-gram model
+        '''
+
+        return cls.from_counts(n, count_ngrams(chunks, [n])[n])
+
+    @classmethod
+    def from_file(cls, file, n=4):
+        '''Makes a model from a corpus file, reading it a chunk at a time.
+
+        Args:
+            file (str): The location of the corpus file
+            n (int): The number of letters in each n-gram (default is 4)
+
+        Returns:
+            model (NgramModel): The n-gram model
+        '''
+
+        with open(file, 'rb') as infile:
+            return cls.from_chunks(iter(lambda: infile.read(CHUNK_SIZE), b''), n)
+
+    @classmethod
+    def load(cls, file):
+        '''Loads a model saved by save. Only the header is read straight away;
+        the table is memory-mapped the first time it's used.
+
+        Args:
+            file (str): The location of the table file
+
+        Returns:
+            model (NgramModel): The n-gram model
+
+        Raises:
+            ValueError: If the file isn't an n-gram table
+        '''
+
+        with open(file, 'rb') as infile:
+            header = infile.read(TABLE_HEADER.size)
+        if len(header) < TABLE_HEADER.size:
+            raise ValueError(f'{file} is not an n-gram table.')
+        magic, n, floor = TABLE_HEADER.unpack(header)
+        expected_size = TABLE_HEADER.size + 4 * NUM_LETTERS**n
+        if magic != TABLE_MAGIC or os.path.getsize(file) != expected_size:
+            raise ValueError(f'{file} is not an n-gram table.')
+        return cls(n, None, floor, file)
+
+    def save(self, file):
+        '''Saves the model as a 16 byte header followed by the log probability
+        of every n-gram as a little-endian float32, 26**n of them.
+
+        Args:
+            file (str): The location of the table file
+        '''
+
+        if np is not None:
+            table = np.asarray(self.log_probabilities, dtype='<f4').tobytes()
+        else:
+            table = array('f', self.log_probabilities)
+            if struct.pack('=f', 1.0) != struct.pack('<f', 1.0):
+                table.byteswap()
+            table = table.tobytes()
+        with open(file, 'wb') as outfile:
+            outfile.write(TABLE_HEADER.pack(TABLE_MAGIC, self.n, self.floor))
+            outfile.write(table)
+
+    def score_values(self, values):
+        '''Adds up the log probability of every n-gram of a sequence of letter
+        values. With NumPy, a 2D array of sequences can be given, which scores
+        each row.
+
+        Args:
+            values (numpy.ndarray/list): The value of each letter
+
+        Returns:
+            score (float/numpy.ndarray): The total log probability, where
+            higher scores look more like English
+        '''
+
+        indices = ngram_indices(values, self.n)
+        table = self.log_probabilities
+        if np is not None and isinstance(table, np.ndarray):
+            scores = table[indices].sum(axis=-1, dtype=np.float64)
+            return float(scores) if scores.ndim == 0 else scores
+        return sum(table[index] for index in indices)
+
+    def score(self, text):
+        '''Adds up the log probability of every n-gram of the letters of text,
+        ignoring every other character.
+
+        Args:
+            text (str/bytes): The text being scored
+
+        Returns:
+            score (float): The total log probability, where higher scores look
+            more like English
+        '''
+
+        return self.score_values(letter_values(text))
+
+    def context_score(self, context, segment):
+        '''Scores the n-grams that end in a segment of text, using the letters
+        of the text before it, in the form used by Rabin.best_decryptions. The
+        scores of every segment add up to the score of the whole text, as long
+        as the context holds the last n-1 letters.
+
+        Args:
+            context (str): The text before the segment
+            segment (str): The text being added
+
+        Returns:
+            score (float): The total log probability of the n-grams ending in
+            the segment
+        '''
+
+        segment_letters = [ord(letter) - ord('a') for letter in segment.lower()
+                           if 'a' <= letter <= 'z']
+        if not segment_letters:
+            return 0.0
+        context_letters = [ord(letter) - ord('a') for letter in context.lower()
+                           if 'a' <= letter <= 'z']
+        values = context_letters[max(len(context_letters) - self.n + 1, 0):] + segment_letters
+        table = self.log_probabilities
+        score = 0.0
+        for i in range(len(values) - self.n + 1):
+            index = 0
+            for value in values[i:i+self.n]:
+                index = index * NUM_LETTERS + value
+            score += float(table[index])
+        return score
+
+def build_tables(corpus, directory=NGRAM_DIRECTORY, sizes=tuple(NGRAM_FILES)):
+    '''Counts the n-grams of a corpus file in one pass and saves a table for
+    each size in a directory, for load_model to map.
+
+    Args:
+        corpus (str): The location of the corpus file of English text
+        directory (str): The directory the tables are saved in (default is
+        NGRAM_DIRECTORY)
+        sizes (tuple): The numbers of letters in the n-grams counted (default
+        is 1, 2, 3 and 4)
+
+    Returns:
+        files (list): The locations of the saved tables
+    '''
+
+    os.makedirs(directory, exist_ok=True)
+    with open(corpus, 'rb') as infile:
+        counts = count_ngrams(iter(lambda: infile.read(CHUNK_SIZE), b''), sizes)
+    files = []
+    for n in sizes:
+        file = os.path.join(directory, NGRAM_FILES[n])
+        NgramModel.from_counts(n, counts[n]).save(file)
+        files.append(file)
+    load_model.cache_clear()
+    return files
+
+@functools.lru_cache(maxsize=None)
+def load_model(n=4, directory=NGRAM_DIRECTORY):
+    '''Loads the saved n-gram table of a size, which is only done once for each
+    table, so every cracker shares the same mapped table.
+
+    Args:
+        n (int): The number of letters in each n-gram (default is 4)
+        directory (str): The directory the tables were saved in (default is
+        NGRAM_DIRECTORY)
+
+    Returns:
+        model (NgramModel): The n-gram model
+
+    Raises:
+        FileNotFoundError: If there's no table of that size in the directory
+    '''
+
+    return NgramModel.load(os.path.join(directory, NGRAM_FILES[n]))
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the n-gram tables used for '
+                                     'scoring decryptions from a corpus of English text.')
+    parser.add_argument('corpus', help='the corpus file')
+    parser.add_argument('--directory', default=NGRAM_DIRECTORY,
+                        help=f'where the tables are saved (default is {NGRAM_DIRECTORY})')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(NGRAM_FILES),
+                        choices=list(NGRAM_FILES), help='the n-gram sizes built')
+    args = parser.parse_args()
+
+    for file in build_tables(args.corpus, args.directory, tuple(args.sizes)):
+        print(f'{file}: {os.path.getsize(file)} bytes')
+
+if __name__ == '__main__':
+    main()
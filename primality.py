@@ -0,0 +1,227 @@
+'''The module containing the functions for checking if a number is prime.
+
+Numbers are first divided by a table of small primes. Numbers below
+3.3 * 10**24 are then checked with the Miller-Rabin test using sets of bases
+that are known to give the right answer for every number below a bound, and
+larger numbers are checked with a number of Miller-Rabin tests with random
+bases. Results are kept in a cache, so checking the same number again is
+instant.
+
+It also contains the functions for generating random primes, which sieve
+windows of candidates by the small primes before testing the ones left, and
+can search several windows at once in a process pool.
+'''
+
+import concurrent.futures
+import contextlib
+import functools
+import random
+import secrets
+import metrics
+
+SMALL_PRIME_LIMIT = 1000
+SMALL_PRIMES = tuple(num for num in range(2, SMALL_PRIME_LIMIT)
+                     if all(num % divisor for divisor in range(2, int(num**0.5) + 1)))
+DETERMINISTIC_BASES = [(2_047, (2,)),
+                       (1_373_653, (2, 3)),
+                       (25_326_001, (2, 3, 5)),
+                       (3_215_031_751, (2, 3, 5, 7)),
+                       (2_152_302_898_747, (2, 3, 5, 7, 11)),
+                       (3_474_749_660_383, (2, 3, 5, 7, 11, 13)),
+                       (341_550_071_728_321, (2, 3, 5, 7, 11, 13, 17)),
+                       (3_825_123_056_546_413_051, (2, 3, 5, 7, 11, 13, 17, 19, 23)),
+                       (318_665_857_834_031_151_167_461,
+                        (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)),
+                       (3_317_044_064_679_887_385_961_981,
+                        (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41))]
+PROBABILISTIC_ROUNDS = 40
+CACHE_SIZE = 4096
+CANDIDATES_PER_BIT = 2
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+@metrics.timed('is_prime')
+def is_prime(num, rounds=PROBABILISTIC_ROUNDS):
+    '''Checks if number is prime. If number is less than or equal to 1, then it
+    is not prime. If number is divisible by one of the small primes, then it is
+    prime only if it is that small prime. Otherwise, the Miller-Rabin test is
+    run with the deterministic bases for number if it's small enough, or with
+    a number of random bases if it's not. If one of the tests comes back
+    negative, then number is not prime. Otherwise, the number will be prime.
+
+    Args:
+        num (int): The number being checked to see if it's prime
+        rounds (int): The number of random bases used for numbers too large
+            for the deterministic bases (default is PROBABILISTIC_ROUNDS)
+
+    Returns:
+        True/False (bool): The result of whether number is prime
+    '''
+
+    if num <= 1:
+        return False
+    for prime in SMALL_PRIMES:
+        if num % prime == 0:
+            return num == prime
+    if num < SMALL_PRIME_LIMIT**2:
+        return True
+
+    for bound, bases in DETERMINISTIC_BASES:
+        if num < bound:
+            break
+    else:
+        bases = [random.randint(2, num-2) for _ in range(rounds)]
+
+    for base in bases:
+        if miller_rabin_test(num, base) is False:
+            return False
+    return True
+
+def miller_rabin_test(num, base):
+    '''Runs a Miller-Rabin primality test. Gets positive integer 's' and odd
+    positive integer 'd' where num - 1 = 2**s * d. If base**d is congruent to
+    1 or -1 mod num, num is prime. Otherwise, base**d is squared up to s - 1
+    times, and if one of the results is congruent to -1 mod num, num is prime.
+    Otherwise, num is not prime.
+
+    Args:
+        num (int): The odd number being checked to see if it's prime
+        base (int): The base number used for checking the primality
+        of the number
+
+    Returns:
+        True/False (bool): The result of whether the number is prime
+    '''
+
+    s = ((num-1) & -(num-1)).bit_length() - 1
+    d = (num-1) >> s
+
+    result = pow(base, d, num)
+    if result == 1 or result == num-1:
+        return True
+    for r in range(s-1):
+        result = result**2 % num
+        if result == num-1:
+            return True
+    return False
+
+def random_window_start(bits, mod_4=None):
+    '''Picks a random odd number to start a window of prime candidates at. The
+    top two bits are set, so the product of two primes with this many bits has
+    twice as many bits.
+
+    Args:
+        bits (int): The number of bits in the candidates
+        mod_4 (int): The value the candidates are congruent to mod 4, which
+            can be 1 or 3 (default is None, which allows both)
+
+    Returns:
+        start (int): The first candidate of the window
+    '''
+
+    start = secrets.randbits(bits) | (3 << bits-2) | 1
+    if mod_4 is not None:
+        start = start - start % 4 + mod_4
+    return start
+
+def search_window(start, step, size, bits):
+    '''Searches a window of candidates start, start + step, start + 2*step and
+    so on for a prime. The multiples of the small primes are crossed out of the
+    window first, so only the candidates left are tested with the Miller-Rabin
+    test.
+
+    Args:
+        start (int): The first candidate of the window
+        step (int): The difference between candidates, which is 2 or 4
+        size (int): The number of candidates in the window
+        bits (int): The number of bits the prime needs to have
+
+    Returns:
+        prime (int): The first prime in the window (None if there isn't one)
+    '''
+
+    crossed_out = bytearray(size)
+    for prime in SMALL_PRIMES[1:]:
+        if prime >= start:
+            continue
+        first = -start * pow(step, -1, prime) % prime
+        crossed_out[first::prime] = b'\x01' * len(range(first, size, prime))
+
+    for k in range(size):
+        if not crossed_out[k]:
+            candidate = start + step*k
+            if candidate.bit_length() > bits:
+                return None
+            if is_prime.__wrapped__(candidate):
+                return candidate
+    return None
+
+def prime_executor(workers=None):
+    '''Makes the process pool generate_prime searches in, so the primes of a
+    key can share one pool instead of starting one each.
+
+    Args:
+        workers (int): The number of processes used for searching (default is
+            None, which searches in this process)
+
+    Returns:
+        executor (ProcessPoolExecutor/nullcontext): A context manager giving
+        the process pool, or None if there's no more than one worker
+    '''
+
+    if workers is None or workers <= 1:
+        return contextlib.nullcontext()
+    return concurrent.futures.ProcessPoolExecutor(workers)
+
+def generate_prime(bits, mod_4=None, workers=None, executor=None):
+    '''Generates a random prime with a given number of bits by searching
+    random windows of candidates until one of them holds a prime. If a number
+    of workers is given, that many windows are searched at once in a process
+    pool, and the first prime found is used. The windows still being searched
+    are then cancelled, or waited for if they've started, so none of them are
+    left running in the pool.
+
+    Args:
+        bits (int): The number of bits in the prime, which must be at least 5
+        mod_4 (int): The value the prime is congruent to mod 4, which can be 1
+            or 3 (default is None, which allows both)
+        workers (int): The number of processes used for searching (default is
+            None, which searches in this process)
+        executor (ProcessPoolExecutor): The process pool the windows are
+            searched in (default is None, which makes a pool for this prime)
+
+    Returns:
+        prime (int): The random prime
+    '''
+
+    if bits < 5:
+        raise ValueError('Primes need to have at least 5 bits.')
+    step = 2 if mod_4 is None else 4
+    size = CANDIDATES_PER_BIT * bits
+    if workers is None or workers <= 1:
+        while True:
+            prime = search_window(random_window_start(bits, mod_4), step, size, bits)
+            if prime is not None:
+                return prime
+
+    if executor is None:
+        with prime_executor(workers) as executor:
+            return generate_prime(bits, mod_4, workers, executor)
+
+    searches = {executor.submit(search_window, random_window_start(bits, mod_4),
+                                step, size, bits)
+                for _ in range(workers)}
+    try:
+        while True:
+            done, searches = concurrent.futures.wait(
+                searches, return_when=concurrent.futures.FIRST_COMPLETED)
+            for search in done:
+                prime = search.result()
+                if prime is not None:
+                    return prime
+                searches.add(executor.submit(search_window,
+                                             random_window_start(bits, mod_4),
+                                             step, size, bits))
+    finally:
+        for search in searches:
+            search.cancel()
+        concurrent.futures.wait(searches)
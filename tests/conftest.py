@@ -0,0 +1,30 @@
+'''Puts the modules of the project on the import path, so the tests can be run
+with pytest from any directory, and builds a small n-gram model for the tests
+of the crackers.
+'''
+
+import os
+import sys
+import pytest
+
+TESTS_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+ENGLISH_FILE = os.path.join(TESTS_DIRECTORY, 'data', 'english.txt')
+
+sys.path.insert(0, os.path.dirname(TESTS_DIRECTORY))
+
+from ngrams import build_tables, load_model
+
+@pytest.fixture(scope='session')
+def english():
+    '''The English text in data/english.txt.'''
+
+    with open(ENGLISH_FILE) as infile:
+        return infile.read()
+
+@pytest.fixture(scope='session')
+def model(tmp_path_factory):
+    '''A 4-gram model built from data/english.txt.'''
+
+    directory = str(tmp_path_factory.mktemp('ngrams'))
+    build_tables(ENGLISH_FILE, directory)
+    return load_model(4, directory)
@@ -0,0 +1,144 @@
+'''Tests for the micro suite and the helpers in benchmarks.py.'''
+
+import json
+import random
+import sys
+import pytest
+import benchmarks
+from benchmarks import *
+
+@pytest.fixture
+def quick(monkeypatch):
+    '''Makes measure stop calling a function once it has taken a millisecond,
+    so the micro suite runs quickly.'''
+
+    monkeypatch.setattr(benchmarks, 'MIN_TIME', 0.001)
+
+def result(name, ops_per_sec, peak_memory, **parameters):
+    '''Returns a micro suite result with the measurements compare_reports
+    uses.'''
+
+    return {'name': name, 'parameters': parameters, 'ops_per_sec': ops_per_sec,
+            'peak_memory': peak_memory}
+
+# Helpers ======================================================================
+
+def test_sample_text_is_repeatable():
+    assert len(sample_text(12_345)) == 12_345
+    assert sample_text(500) == sample_text(500)
+    assert sample_text(500, seed=1) != sample_text(500)
+
+def test_make_rsa_is_repeatable():
+    cipher = make_rsa(64)
+    assert cipher.n.bit_length() == 64
+    assert make_rsa(64) is cipher
+    assert make_rsa(64, lookup_table=False).n == cipher.n
+
+def test_random_prime_bits_and_residue():
+    generator = random.Random(3)
+    for _ in range(20):
+        prime = random_prime(40, generator, 3)
+        assert prime.bit_length() == 40
+        assert prime % 4 == 3
+        assert is_prime(prime)
+
+def test_measure(quick):
+    calls = []
+    measurement = measure(calls.append, 1, repeat=2, size=2_000_000)
+    assert len(calls) > 2
+    assert measurement['ops_per_sec'] == pytest.approx(1 / measurement['seconds'])
+    assert measurement['mb_per_sec'] == pytest.approx(2 / measurement['seconds'])
+    assert measurement['peak_memory'] >= 0
+    assert measure(len, 'abc')['mb_per_sec'] is None
+
+def test_measure_peak_memory(quick):
+    small = measure(bytearray, 1_000)['peak_memory']
+    large = measure(bytearray, 1_000_000)['peak_memory']
+    assert large >= 1_000_000 > small
+
+# Micro Suite ==================================================================
+
+def test_run_micro(quick, capsys):
+    report = run_micro([200], [64], 64, 100)
+    names = [result['name'] for result in report['results']]
+    ciphers = ['Caesar', 'Affine', 'Vigenere', 'Playfair', 'RSA', 'Rabin']
+    assert names == [f'{name}.__init__' for name in ciphers] \
+        + [f'{name}.{operation}' for name in ciphers[:4]
+           for operation in ('encrypt', 'decrypt')] \
+        + ['is_prime', 'fast_exponentiation', 'extended_gcd']
+    assert report['results'][6]['parameters'] == {'size': 200}
+    assert report['results'][-1]['parameters'] == {'bits': 64}
+    assert set(report['environment']) == {'python', 'implementation', 'machine', 'numpy'}
+    json.dumps(report)
+    assert len(capsys.readouterr().err.splitlines()) == len(names)
+
+def test_micro_benchmarks_decrypt_what_they_encrypt():
+    encrypted = {}
+    for name, _, function, args, _, _ in micro_benchmarks([300], [], 64, 300):
+        cipher, operation = name.split('.')
+        if operation == 'encrypt':
+            encrypted[cipher] = args[0], function(*args)
+        elif operation == 'decrypt':
+            message, ciphertext = encrypted[cipher]
+            assert args == (ciphertext,)
+            if cipher in ('Caesar', 'Affine', 'Vigenere', 'RSA'):
+                assert function(*args) == message.lower()
+    assert set(encrypted) == {'Caesar', 'Affine', 'Vigenere', 'Playfair', 'RSA', 'Rabin'}
+
+def test_make_rabin():
+    cipher = make_rabin(32)
+    assert cipher.p != cipher.q
+    assert cipher.p % 4 == cipher.q % 4 == 3
+    assert make_rabin(32).q == cipher.q
+
+# Comparing Reports ============================================================
+
+def test_compare_reports_finds_regressions():
+    baseline = {'results': [result('Caesar.encrypt', 100.0, 1000, size=10),
+                            result('Caesar.encrypt', 50.0, 1000, size=100),
+                            result('is_prime', 10.0, 0, bits=64),
+                            result('extended_gcd', 10.0, 100, bits=64)]}
+    report = {'results': [result('Caesar.encrypt', 95.0, 1050, size=10),
+                          result('Caesar.encrypt', 40.0, 1000, size=100),
+                          result('is_prime', 20.0, 500, bits=64),
+                          result('extended_gcd', 10.0, 200, bits=64),
+                          result('Affine.encrypt', 1.0, 10**9, size=10)]}
+    comparisons = compare_reports(report, baseline)
+    assert [(name, parameters, regressed)
+            for name, parameters, _, _, regressed in comparisons] == [
+        ('Caesar.encrypt', {'size': 10}, False),
+        ('Caesar.encrypt', {'size': 100}, True),
+        ('is_prime', {'bits': 64}, False),
+        ('extended_gcd', {'bits': 64}, True)]
+    assert comparisons[1][2:4] == (pytest.approx(0.8), 1.0)
+    assert comparisons[2][3] == 1.0
+    assert compare_reports(report, baseline, threshold=0.25)[1][4] is False
+
+def test_parameters_are_matched_in_any_order():
+    baseline = {'results': [result('RSA.encrypt', 10.0, 10, size=10, key_size=64)]}
+    report = {'results': [result('RSA.encrypt', 5.0, 10, key_size=64, size=10)]}
+    assert compare_reports(report, baseline)[0][4] is True
+
+def test_print_comparisons(capsys):
+    print_comparisons([('is_prime', {'bits': 64}, 0.5, 1.0, True),
+                       ('extended_gcd', {'bits': 64}, 1.0, 1.0, False)])
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].endswith('0.50x    1.00x  REGRESSION')
+    assert lines[2].endswith('1.00x    1.00x')
+
+def test_main_micro_against_baseline(quick, tmp_path, monkeypatch, capsys):
+    output = str(tmp_path / 'report.json')
+    arguments = ['benchmarks.py', '--suites', 'micro', '--sizes', '100',
+                 '--micro-bits', '64', '--micro-key-size', '64', '--output', output]
+    monkeypatch.setattr(sys, 'argv', arguments)
+    assert main() == 0
+    with open(output) as infile:
+        report = json.load(infile)
+    for item in report['results']:
+        item['ops_per_sec'] *= 1000
+    baseline = str(tmp_path / 'baseline.json')
+    with open(baseline, 'w') as outfile:
+        json.dump(report, outfile)
+    monkeypatch.setattr(sys, 'argv', arguments + ['--baseline', baseline])
+    assert main() == 1
+    assert 'REGRESSION' in capsys.readouterr().out
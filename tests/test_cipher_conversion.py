@@ -0,0 +1,297 @@
+'''Tests for the file conversion and command line of cipher_conversion.py.'''
+
+import io
+import os
+import random
+import re
+import subprocess
+import sys
+import pytest
+from cipher_conversion import *
+
+def conversion_ciphers():
+    '''Returns one cipher of every kind, each made without asking for input.'''
+
+    return [Caesar(3, interactive=False), Affine(5, 8, interactive=False),
+            Vigenere('lemon', interactive=False),
+            Playfair('playfairexample', interactive=False),
+            RSA(61, 53, 17, interactive=False),
+            Rabin(1019, 1031, interactive=False)]
+
+def sample_text(size, seed=0):
+    '''Makes text with words full of i and j, spaces and newlines.'''
+
+    generator = random.Random(seed)
+    words = ['jig', 'iii', 'jij', 'fill', 'Jam,', 'kiwi', 'x', 'balloon.\n']
+    return ' '.join(generator.choice(words) for _ in range(size))
+
+def convert_lines(cipher, text, decrypt=False):
+    '''Encrypts or decrypts each line of text on its own, the way the
+    interactive converter does, keeping the line breaks as they are.'''
+
+    translate = cipher.decrypt if decrypt else cipher.encrypt
+    parts = re.split(r'(\r\n|\r|\n)', text)
+    return ''.join(part if i % 2 else translate(part) for i, part in enumerate(parts))
+
+# Cracking =====================================================================
+
+def test_playfair_iterations_default_to_interactive_budget(monkeypatch):
+    answers = iter(['', 'lots', '0', '2500'])
+    monkeypatch.setattr('builtins.input', lambda prompt: next(answers))
+    assert get_playfair_iterations() == INTERACTIVE_PLAYFAIR_ITERATIONS
+    assert get_playfair_iterations() == 2500
+
+# Chunked Conversion ===========================================================
+
+@pytest.mark.parametrize('cipher', conversion_ciphers(), ids=lambda cipher: type(cipher).__name__)
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 64])
+def test_chunked_conversion_matches_unchunked(cipher, chunk_size):
+    text = sample_text(60)
+    ciphertext = convert_lines(cipher, text)
+    outfile = io.StringIO()
+    convert_stream(cipher, io.StringIO(text), outfile, chunk_size=chunk_size)
+    assert outfile.getvalue() == ciphertext
+    outfile = io.StringIO()
+    convert_stream(cipher, io.StringIO(ciphertext), outfile, decrypt=True,
+                   chunk_size=chunk_size)
+    assert outfile.getvalue() == convert_lines(cipher, ciphertext, decrypt=True)
+
+@pytest.mark.parametrize('cipher', conversion_ciphers()[2:], ids=lambda cipher: type(cipher).__name__)
+@pytest.mark.parametrize('chunk_size', [1, 5, 64])
+def test_each_line_is_converted_on_its_own(cipher, chunk_size):
+    lines = ['attack at dawn', '', 'hold the line', 'retreat']
+    ciphertext = ''.join(cipher.encrypt(line) + '\n' for line in lines)
+    outfile = io.StringIO()
+    convert_stream(cipher, io.StringIO('\n'.join(lines) + '\n'), outfile,
+                   chunk_size=chunk_size)
+    assert outfile.getvalue() == ciphertext
+    outfile = io.StringIO()
+    convert_stream(cipher, io.StringIO(ciphertext), outfile, decrypt=True,
+                   chunk_size=chunk_size)
+    assert outfile.getvalue() == ''.join(cipher.decrypt(cipher.encrypt(line)) + '\n'
+                                         for line in lines)
+
+def test_playfair_chunk_split_between_i_and_j():
+    cipher = Playfair('playfairexample', interactive=False)
+    for text in ['ija', 'jim ija', 'iijj']:
+        for chunk_size in range(1, len(text) + 1):
+            outfile = io.StringIO()
+            convert_stream(cipher, io.StringIO(text), outfile, chunk_size=chunk_size)
+            assert outfile.getvalue() == cipher.encrypt(text)
+
+class WriteRecorder(io.StringIO):
+    '''A text stream that keeps the length of every write to it.'''
+
+    def __init__(self):
+        super().__init__()
+        self.lengths = []
+
+    def write(self, text):
+        self.lengths.append(len(text))
+        return super().write(text)
+
+def test_rabin_decryptions_are_written_one_at_a_time(tmp_path, monkeypatch):
+    cipher = Rabin(11, 13, interactive=False)
+    message = 'this is an example sentence'
+    ciphertext = cipher.encrypt(message)
+    outfile = WriteRecorder()
+    convert_stream(cipher, io.StringIO(f'{ciphertext}\n{ciphertext}'), outfile,
+                   decrypt=True, chunk_size=10)
+    assert outfile.getvalue() == f'{cipher.decrypt(ciphertext)}\n{cipher.decrypt(ciphertext)}'
+    assert max(outfile.lengths) == len(message)
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'cipher.txt').write_text(f'{ciphertext}\n{ciphertext}\n')
+    answers = iter(['Y', '6', '11', '13'])
+    monkeypatch.setattr('builtins.input', lambda prompt: next(answers))
+    cipher_to_plain()
+    assert (tmp_path / 'plain.txt').read_text() == f'{cipher.decrypt(ciphertext)}\n' * 2
+
+def test_parallel_file_conversion(tmp_path):
+    text = sample_text(3000, seed=1)
+    input_file = tmp_path / 'plain.txt'
+    input_file.write_text(text)
+    for cipher in conversion_ciphers()[:4]:
+        output_file = tmp_path / 'cipher.txt'
+        convert_file(cipher, input_file, output_file, workers=2, chunk_size=257)
+        with open(output_file, newline='') as infile:
+            assert infile.read() == convert_lines(cipher, text)
+
+@pytest.mark.parametrize('cipher', conversion_ciphers(), ids=lambda cipher: type(cipher).__name__)
+def test_parallel_file_round_trip_keeps_line_endings(tmp_path, cipher):
+    text = sample_text(2000, seed=2).replace('\n', '\r\n')
+    plain_file, cipher_file, output_file = (tmp_path / name for name in
+                                            ('plain.txt', 'cipher.txt', 'out.txt'))
+    plain_file.write_bytes(text.encode())
+    convert_file(cipher, plain_file, cipher_file, workers=2, chunk_size=101)
+    convert_file(cipher, cipher_file, output_file, decrypt=True, workers=2, chunk_size=99)
+    ciphertext = convert_lines(cipher, text)
+    with open(cipher_file, newline='') as infile:
+        assert infile.read() == ciphertext
+    with open(output_file, newline='') as infile:
+        assert infile.read() == convert_lines(cipher, ciphertext, decrypt=True)
+
+# Memory-Mapped File Conversion ================================================
+
+@pytest.mark.parametrize('cipher', conversion_ciphers()[:3], ids=lambda cipher: type(cipher).__name__)
+@pytest.mark.parametrize('full_bytes', [False, True])
+def test_mapped_conversion_across_windows(tmp_path, cipher, full_bytes):
+    data = sample_text(3 * mmap.ALLOCATIONGRANULARITY // 5, seed=3).encode()
+    data += bytes(range(NUM_BYTES))
+    input_file, cipher_file, output_file = (tmp_path / name for name in
+                                            ('plain.bin', 'cipher.bin', 'out.bin'))
+    input_file.write_bytes(data)
+    window_size = mmap.ALLOCATIONGRANULARITY
+    convert_mapped_file(cipher, input_file, cipher_file, full_bytes=full_bytes,
+                        window_size=window_size)
+    encrypted = cipher_file.read_bytes()
+    assert encrypted == cipher.encrypt_bytes(data, full_bytes)
+    if not full_bytes:
+        assert encrypted[:-NUM_BYTES].decode() == cipher.encrypt(data[:-NUM_BYTES].decode())
+    convert_mapped_file(cipher, cipher_file, output_file, decrypt=True,
+                        full_bytes=full_bytes, window_size=window_size)
+    assert output_file.read_bytes() == (data if full_bytes else data.lower())
+
+def test_mapped_conversion_of_empty_file(tmp_path):
+    input_file, output_file = tmp_path / 'empty.bin', tmp_path / 'out.bin'
+    input_file.write_bytes(b'')
+    convert_mapped_file(Caesar(3, interactive=False), input_file, output_file)
+    assert output_file.read_bytes() == b''
+
+def test_mapped_conversion_rejects_the_input_as_output(tmp_path):
+    input_file, link = tmp_path / 'plain.bin', tmp_path / 'link.bin'
+    input_file.write_bytes(b'attack at dawn')
+    link.symlink_to(input_file)
+    for output_file in (input_file, link, tmp_path / '.' / 'plain.bin'):
+        with pytest.raises(ValueError):
+            convert_mapped_file(Caesar(3, interactive=False), input_file, output_file)
+    assert input_file.read_bytes() == b'attack at dawn'
+
+# Batch Command Line ===========================================================
+
+def test_batch_reports_bad_input_and_carries_on(tmp_path, capsys):
+    bad = tmp_path / 'bad.txt'
+    bad.write_text('999 5')
+    good = tmp_path / 'good.txt'
+    cipher = RSA(61, 53, 17, interactive=False)
+    good.write_text(cipher.encrypt('hello'))
+    output_dir = tmp_path / 'out'
+    status = main(['-c', 'rsa', '-d', '-p', '61', '-q', '53', '-e', '17',
+                   str(bad), str(good), '--output-dir', str(output_dir)])
+    assert status == EXIT_FAILURE
+    assert 'bad.txt' in capsys.readouterr().err
+    assert (output_dir / 'good.txt').read_text() == 'hello'
+
+@pytest.mark.parametrize('keys, cipher', [
+    (['-c', 'vigenere', '-k', 'lemon'], Vigenere('lemon', interactive=False)),
+    (['-c', 'rsa', '-p', '61', '-q', '53', '-e', '17'], RSA(61, 53, 17, interactive=False)),
+    (['-c', 'rabin', '-p', '11', '-q', '13'], Rabin(11, 13, interactive=False))])
+def test_batch_converts_each_line_like_the_interactive_converter(tmp_path, keys, cipher):
+    lines = ['This is an example sentence', 'for showing ciphers using python.', '']
+    plain_file, cipher_file, output_file = (tmp_path / name for name in
+                                            ('plain.txt', 'cipher.txt', 'out.txt'))
+    # plain_to_cipher and cipher_to_plain write a newline after every line
+    plain_file.write_text(''.join(line + '\n' for line in lines))
+    assert main(keys + [str(plain_file), '-o', str(cipher_file)]) == EXIT_SUCCESS
+    ciphertexts = [cipher.encrypt(line) for line in lines]
+    assert cipher_file.read_text() == ''.join(line + '\n' for line in ciphertexts)
+    assert main(keys + ['-d', str(cipher_file), '-o', str(output_file)]) == EXIT_SUCCESS
+    assert output_file.read_text().splitlines() == [cipher.decrypt(line)
+                                                    for line in ciphertexts]
+
+@pytest.mark.parametrize('keys, ciphertext', [
+    (['-c', 'rsa', '-p', '61', '-q', '53', '-e', '17'], '2369 1387\nhello\n'),
+    (['-c', 'rsa', '-p', '61', '-q', '53', '-e', '17'], '2369 1387x\n'),
+    (['-c', 'rabin', '-p', '11', '-q', '13'], '75 49\n64 abc\n'),
+    (['-c', 'rabin', '-p', '11', '-q', '13'], '75 104\n')])
+def test_batch_fails_on_tokens_that_cannot_be_decrypted(tmp_path, capsys, keys, ciphertext):
+    cipher_file = tmp_path / 'cipher.txt'
+    cipher_file.write_text(ciphertext)
+    status = main(keys + ['-d', str(cipher_file), '-o', str(tmp_path / 'out.txt')])
+    assert status == EXIT_FAILURE
+    assert f"{cipher_file}: " in capsys.readouterr().err
+
+def test_batch_rejects_inputs_with_the_same_name(tmp_path):
+    for directory in ('a', 'b'):
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / 'x.txt').write_text(directory)
+    with pytest.raises(SystemExit) as exit_info:
+        main(['-c', 'caesar', '-k', '3', str(tmp_path / 'a' / 'x.txt'),
+              str(tmp_path / 'b' / 'x.txt'), '--output-dir', str(tmp_path / 'out')])
+    assert exit_info.value.code == EXIT_USAGE
+    assert not (tmp_path / 'out').exists()
+
+@pytest.mark.parametrize('use_output_dir', [False, True])
+def test_batch_rejects_output_that_is_an_input(tmp_path, use_output_dir):
+    input_file = tmp_path / 'plain.txt'
+    input_file.write_text('keep me')
+    destination = (['--output-dir', str(tmp_path)] if use_output_dir
+                   else ['-o', str(input_file)])
+    with pytest.raises(SystemExit) as exit_info:
+        main(['-c', 'caesar', '-k', '3', str(input_file)] + destination)
+    assert exit_info.value.code == EXIT_USAGE
+    assert input_file.read_text() == 'keep me'
+
+def run_converter(arguments, text):
+    '''Runs the converter in its own process, the way it's run from a shell,
+    with text as standard input.'''
+
+    script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'cipher_conversion.py')
+    return subprocess.run([sys.executable, script] + arguments, input=text,
+                          capture_output=True, text=True)
+
+@pytest.mark.parametrize('keys', [['-c', 'vigenere', '-k', 'lemon'],
+                                  ['-c', 'affine', '-a', '5', '-b', '8'],
+                                  ['-c', 'rsa', '-p', '61', '-q', '53', '-e', '17']])
+def test_standard_input_and_output_round_trip(keys):
+    text = 'attack at dawn\nhold the line\n'
+    encrypted = run_converter(keys + ['-'], text)
+    assert encrypted.returncode == EXIT_SUCCESS
+    assert encrypted.stdout != text
+    decrypted = run_converter(keys + ['--decrypt'], encrypted.stdout)
+    assert (decrypted.returncode, decrypted.stdout) == (EXIT_SUCCESS, text)
+
+def test_inputs_are_written_one_after_another(tmp_path):
+    (tmp_path / 'a.txt').write_text('abc\n')
+    (tmp_path / 'b.txt').write_text('xyz\n')
+    output = tmp_path / 'out.txt'
+    assert main(['-c', 'caesar', '-k', '1', str(tmp_path / 'b.txt'),
+                 str(tmp_path / 'a.txt'), '-o', str(output)]) == EXIT_SUCCESS
+    assert output.read_text() == 'yza\nbcd\n'
+
+def test_globs_are_expanded_in_order(tmp_path):
+    for name in ('b.txt', 'a.txt', 'c.log'):
+        (tmp_path / name).write_text(name)
+    assert expand_inputs([str(tmp_path / '*.txt'), '-', str(tmp_path / 'c.log')]) == \
+        ([str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt'), '-', str(tmp_path / 'c.log')], [])
+    output_dir = tmp_path / 'out'
+    assert main(['-c', 'caesar', '-k', '3', str(tmp_path / '*.txt'),
+                 '--output-dir', str(output_dir)]) == EXIT_SUCCESS
+    assert sorted(os.listdir(output_dir)) == ['a.txt', 'b.txt']
+    assert (output_dir / 'a.txt').read_text() == 'd.waw'
+
+def test_unmatched_globs_are_reported(tmp_path, capsys):
+    (tmp_path / 'a.txt').write_text('abc')
+    missing = str(tmp_path / '*.md')
+    status = main(['-c', 'caesar', '-k', '3', missing, str(tmp_path / 'a.txt'),
+                   '--output-dir', str(tmp_path / 'out')])
+    assert status == EXIT_FAILURE
+    assert f'{missing}: no files match' in capsys.readouterr().err
+    assert (tmp_path / 'out' / 'a.txt').read_text() == 'def'
+
+@pytest.mark.parametrize('arguments, message', [
+    (['-c', 'affine', '-a', '5'], "affine needs 'b'"),
+    (['-c', 'rsa'], "rsa needs 'p', 'q', 'e'"),
+    (['-c', 'caesar', '-k', '3', '-a', '5'], "caesar doesn't use 'a'"),
+    (['-c', 'affine', '-a', '2', '-b', '8'], ''),
+    (['-c', 'caesar', '-k', '3', '-', '-'], "'-' can only be given once"),
+    (['-k', '3'], "'key' can only be given with --cipher"),
+    (['-p', '61', '-q', '53'], "'p', 'q' can only be given with --cipher"),
+    (['plain.txt'], 'converting files needs --cipher'),
+    (['-c', 'caesar', '-k', '3', '-o', 'a', '--output-dir', 'b'], 'not allowed with')])
+def test_usage_errors(arguments, message, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        main(arguments)
+    assert exit_info.value.code == EXIT_USAGE
+    assert message in capsys.readouterr().err
@@ -0,0 +1,390 @@
+'''Tests for the ciphers in ciphers.py.'''
+
+import concurrent.futures
+import io
+import math
+import pickle
+import random
+import pytest
+import ciphers
+from benchmarks import (legacy_affine_decrypt, legacy_affine_encrypt,
+                        legacy_caesar_decrypt, legacy_caesar_encrypt,
+                        legacy_rabin_letter_values,
+                        legacy_rsa_decrypt, legacy_rsa_encrypt,
+                        legacy_vigenere_decrypt, legacy_vigenere_encrypt)
+from ciphers import *
+
+SAMPLE = 'The quick brown fox jumps over the lazy dog. Jim, fill in this jar!\n'
+
+def stream_ciphers():
+    '''Returns one cipher of every kind, each made without asking for input.'''
+
+    return [Caesar(3, interactive=False), Affine(5, 8, interactive=False),
+            Vigenere('lemon', interactive=False),
+            Playfair('playfairexample', interactive=False),
+            RSA(61, 53, 17, interactive=False),
+            RSA(61, 53, 17, lookup_table=False, interactive=False),
+            Rabin(1019, 1031, interactive=False)]
+
+def run_stream(context, chunks):
+    '''Runs chunks of text through a stream context.'''
+
+    return ''.join(context.update(chunk) for chunk in chunks) + context.finalize()
+
+def random_chunks(text, generator):
+    '''Splits text into chunks of random lengths, some of them empty.'''
+
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + generator.randint(0, 7)
+        chunks.append(text[start:end])
+        start = end
+    return chunks
+
+# Stream Contexts ==============================================================
+
+@pytest.mark.parametrize('cipher', stream_ciphers(), ids=lambda cipher: type(cipher).__name__)
+def test_stream_matches_one_shot(cipher):
+    generator = random.Random(0)
+    messages = [SAMPLE, 'ija', 'jiji jj ii', 'balloon bookkeeper', 'x', '']
+    messages += [''.join(generator.choice('ijij ax.') for _ in range(40))
+                 for _ in range(20)]
+    for message in messages:
+        ciphertext = cipher.encrypt(message)
+        plaintext = cipher.decrypt(ciphertext)
+        for _ in range(5):
+            chunks = random_chunks(message, generator)
+            assert run_stream(cipher.encryptor(), chunks) == ciphertext
+            chunks = random_chunks(ciphertext, generator)
+            assert run_stream(cipher.decryptor(), chunks) == plaintext
+
+@pytest.mark.parametrize('message', ['ija', 'iijj', 'jim jam'])
+def test_playfair_stream_splits_between_i_and_j(message):
+    cipher = Playfair('playfairexample', interactive=False)
+    for split in range(len(message) + 1):
+        chunks = [message[:split], message[split:]]
+        assert run_stream(cipher.encryptor(), chunks) == cipher.encrypt(message)
+
+def test_rabin_stream_keeps_every_decryption():
+    cipher = Rabin(7, 11, interactive=False)
+    generator = random.Random(0)
+    for message in ['the bad cat', 'hi, jo', 'a b']:
+        ciphertext = cipher.encrypt(message)
+        for _ in range(5):
+            chunks = random_chunks(ciphertext, generator)
+            assert run_stream(cipher.decryptor(), chunks) == cipher.decrypt(ciphertext)
+            context = cipher.decryptor()
+            for chunk in chunks:
+                context.update(chunk)
+            assert list(context.iter_finalize()) == list(cipher.iter_decryptions(ciphertext))
+
+@pytest.mark.parametrize('cipher', stream_ciphers()[:4], ids=lambda cipher: type(cipher).__name__)
+def test_stream_of_long_chunks_matches_one_shot(cipher):
+    generator = random.Random(1)
+    message = ''.join(generator.choice('abcijj xx,.') for _ in range(10 * VECTORIZE_THRESHOLD))
+    ciphertext = cipher.encrypt(message)
+    chunks = [message[i:i+3*VECTORIZE_THRESHOLD+1]
+              for i in range(0, len(message), 3*VECTORIZE_THRESHOLD+1)]
+    assert run_stream(cipher.encryptor(), chunks) == ciphertext
+    assert run_stream(cipher.decryptor(), [ciphertext[:1001], ciphertext[1001:]]) == \
+        cipher.decrypt(ciphertext)
+
+# Caesar and Affine Ciphers ====================================================
+
+@pytest.mark.parametrize('key', range(NUM_LETTERS))
+def test_caesar_matches_letter_by_letter_version(key):
+    cipher = Caesar(key, interactive=False)
+    assert cipher.encrypt(SAMPLE) == legacy_caesar_encrypt(cipher, SAMPLE)
+    assert cipher.decrypt(SAMPLE) == legacy_caesar_decrypt(cipher, SAMPLE)
+
+@pytest.mark.parametrize('a', sorted(VALUE_INVERSES))
+def test_affine_matches_letter_by_letter_version(a):
+    for b in range(NUM_LETTERS):
+        cipher = Affine(a, b, interactive=False)
+        assert cipher.encrypt(SAMPLE) == legacy_affine_encrypt(cipher, SAMPLE)
+        assert cipher.decrypt(SAMPLE) == legacy_affine_decrypt(cipher, SAMPLE)
+        assert cipher.decrypt(cipher.encrypt(SAMPLE)) == SAMPLE.lower()
+
+def test_translation_tables_leave_other_characters_alone():
+    message = 'Ünïcödé 123 ½ äbc'
+    assert Caesar(1, interactive=False).encrypt(message) == 'üoïdöeé 123 ½ äcd'
+
+# Vigenere Cipher ==============================================================
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+@pytest.mark.parametrize('size', [1, VECTORIZE_THRESHOLD - 1, 4 * VECTORIZE_THRESHOLD])
+def test_vigenere_matches_letter_by_letter_version(monkeypatch, use_numpy, size):
+    if not use_numpy:
+        monkeypatch.setattr(ciphers, 'np', None)
+    message = (SAMPLE * (size // len(SAMPLE) + 1))[:size]
+    cipher = Vigenere('lemon', interactive=False)
+    ciphertext = cipher.encrypt(message)
+    assert ciphertext == legacy_vigenere_encrypt(cipher, message)
+    assert cipher.decrypt(ciphertext) == legacy_vigenere_decrypt(cipher, ciphertext)
+    assert cipher.decrypt(ciphertext) == message.lower()
+
+@pytest.mark.parametrize('size', [10, 4 * VECTORIZE_THRESHOLD])
+def test_vigenere_offset_starts_partway_through_the_key(size):
+    message = (SAMPLE * (size // len(SAMPLE) + 1))[:size]
+    cipher = Vigenere('lemon', interactive=False)
+    for offset in range(7):
+        rotated = Vigenere('lemon'[offset % 5:] + 'lemon'[:offset % 5], interactive=False)
+        assert cipher.encrypt(message, offset) == rotated.encrypt(message)
+        assert cipher.decrypt(message, offset) == rotated.decrypt(message)
+
+# Playfair Cipher ==============================================================
+
+PLAYFAIR_MESSAGES = ['hide the gold in the tree stump', 'balloon bookkeeper xx x',
+                     'The quick brown fox, jumps over the lazy dog!', 'a', '',
+                     'jij ijj 123 ab-cd\nee']
+# The ciphertexts of PLAYFAIR_MESSAGES made by Playfair before it had digram tables
+BASELINE_PLAYFAIR = {
+    'playfairexample': ['bmod zbxm dqac rk zbxm uixmxm kzzryi', 'dpyranqo dkqnoiiaxe mmmm mm',
+                        'zbxm nwrbqi ciqvqr asmm, rtifqm vaxe zbxm aywf ovqg!', 'ye', '',
+                        'rmrmrm rmrmrm 123 pd-dg\nxmxm'],
+    'monarchy': ['bfck pdiu fntc ga pdiu zdiuiu tlmcsv', 'ibsupmna harfefflkm zzzz zz',
+                 'pdiu lwebiz danvaw phzz, exolxa hokm pdiu smwd hriw!', 'ba', '',
+                 'sasasa sasasa 123 bi-hc\niuiu']}
+# What Playfair decrypted them to before, with their padding left in
+BASELINE_PLAYFAIR_DECRYPTIONS = ['hide thex gold in thex trexex stumpx',
+                                 'balxloon bookkeeper xxxx xx',
+                                 'thex quickx brownx foxx, iumpsx over thex lazy dogx!',
+                                 'ax', '', 'ixixix ixixix 123 ab-cd\nexex']
+
+@pytest.mark.parametrize('key', sorted(BASELINE_PLAYFAIR))
+def test_playfair_matches_baseline(key):
+    cipher = Playfair(key, interactive=False)
+    for message, ciphertext, plaintext in zip(PLAYFAIR_MESSAGES, BASELINE_PLAYFAIR[key],
+                                              BASELINE_PLAYFAIR_DECRYPTIONS):
+        assert cipher.encrypt(message) == ciphertext
+        assert cipher.decrypt(ciphertext) == plaintext
+
+def test_playfair_digram_tables_invert_each_other():
+    cipher = Playfair('playfairexample', interactive=False)
+    assert len(cipher.encrypt_digrams) == len(Playfair.ALPHABET)**2
+    for digram, encrypted in cipher.encrypt_digrams.items():
+        assert cipher.decrypt_digrams[encrypted] == digram
+        row, col = cipher.positions[digram[0]]
+        assert cipher.matrix[row][col] == digram[0]
+
+def test_split_words_alternates_runs():
+    message = 'hello, world!! 42 abc'
+    words = list(split_words(message))
+    assert ''.join(word for word, _ in words) == message
+    assert words[:3] == [('hello', True), (', ', False), ('world', True)]
+    assert all(is_letters == word.isalpha() for word, is_letters in words)
+
+@pytest.mark.parametrize('word', ['a', 'ab', 'aab', 'aaa', 'abba', 'bookkeeper', 'xx'])
+def test_pad_word_matches_digram_by_digram_padding(word):
+    padded = pad_word(word)
+    assert padded == ''.join(pad_digrams(word))
+    assert len(padded) % 2 == 0
+    assert all(padded[i] != padded[i+1] or padded[i] == 'x'
+               for i in range(0, len(padded), 2))
+
+@pytest.mark.parametrize('seed', range(5))
+def test_playfair_numpy_padding_matches_pure_python(monkeypatch, seed):
+    generator = random.Random(seed)
+    message = ''.join(generator.choice('aabbij x.') for _ in range(4 * VECTORIZE_THRESHOLD))
+    cipher = Playfair('monarchy', interactive=False)
+    ciphertext = cipher.encrypt(message)
+    plaintext = cipher.decrypt(ciphertext)
+    monkeypatch.setattr(ciphers, 'np', None)
+    assert cipher.encrypt(message) == ciphertext
+    assert cipher.decrypt(ciphertext) == plaintext
+
+# Byte Translation =============================================================
+
+def test_translate_buffer_in_place_across_blocks():
+    data = bytes(range(NUM_BYTES)) * (3 * TRANSLATE_BLOCK_SIZE // NUM_BYTES + 1)
+    table = bytes(reversed(range(NUM_BYTES)))
+    buffer = bytearray(data)
+    assert translate_buffer(buffer, table, buffer) is buffer
+    assert buffer == data.translate(table)
+    assert translate_buffer(memoryview(data), table) == data.translate(table)
+
+@pytest.mark.parametrize('name, params', [('caesar', (('key', 3),)),
+                                          ('affine', (('a', 5), ('b', 8)))])
+@pytest.mark.parametrize('full_bytes', [False, True])
+def test_byte_tables_are_made_once(name, params, full_bytes):
+    cipher = build_cipher(name, params)
+    data = bytes(range(NUM_BYTES))
+    encrypted = cipher.encrypt_bytes(data, full_bytes)
+    assert cipher.byte_table(False, full_bytes) is cipher.byte_table(False, full_bytes)
+    assert cipher.decrypt_bytes(encrypted, full_bytes) == \
+        (data if full_bytes else data.lower())
+    if not full_bytes:
+        ascii_text = data[:128].decode('ascii')
+        assert encrypted[:128].decode('ascii') == cipher.encrypt(ascii_text)
+
+# RSA Cryptosystem =============================================================
+
+@pytest.mark.parametrize('p, q, e', [(61, 53, 17), (1019, 1031, 7),
+                                     (2**61-1, 2**31-1, RSA_EXPONENT)])
+def test_rsa_crt_matches_plain_exponentiation(p, q, e):
+    cipher = RSA(p, q, e, lookup_table=False, interactive=False)
+    ciphertext = cipher.encrypt(SAMPLE)
+    assert ciphertext == legacy_rsa_encrypt(cipher, SAMPLE)
+    assert cipher.decrypt(ciphertext) == legacy_rsa_decrypt(cipher, ciphertext)
+    assert cipher.decrypt(ciphertext) == SAMPLE.lower()
+    generator = random.Random(p)
+    for _ in range(100):
+        number = generator.randrange(cipher.n)
+        assert crt_exponentiation(number, cipher.dp, cipher.dq, cipher.p, cipher.q,
+                                  cipher.q_inverse) == pow(number, cipher.d, cipher.n)
+
+@pytest.mark.parametrize('cipher_class, keys', [(RSA, (61, 53, 17)), (Rabin, (7, 11)),
+                                                (Rabin, (1019, 1031))])
+def test_lookup_table_matches_exponentiation(cipher_class, keys):
+    table_cipher = cipher_class(*keys, lookup_table=True, interactive=False)
+    cipher = cipher_class(*keys, lookup_table=False, interactive=False)
+    ciphertext = cipher.encrypt(SAMPLE)
+    assert table_cipher.encrypt(SAMPLE) == ciphertext
+    if cipher_class is Rabin:
+        assert table_cipher.decrypt_lattice(ciphertext) == cipher.decrypt_lattice(ciphertext)
+    else:
+        assert table_cipher.decrypt(ciphertext) == cipher.decrypt(ciphertext)
+
+@pytest.mark.parametrize('lookup_table', [True, False])
+def test_rsa_rejects_tokens_that_are_not_letters(lookup_table):
+    cipher = RSA(61, 53, 17, lookup_table=lookup_table, interactive=False)
+    with pytest.raises(ValueError):
+        cipher.decrypt('999 5')
+    with pytest.raises(ValueError):
+        cipher.decrypt(str(cipher.n))
+    # A line break between two numbers joins them into one token
+    for ciphertext in ['2369 1387\n1211', 'hello', '2369 x']:
+        with pytest.raises(ValueError):
+            cipher.decrypt(ciphertext)
+    assert cipher.decrypt(cipher.encrypt('a, b.\t')) == 'a, b.\t'
+
+@pytest.mark.parametrize('size', [0, 1, 7, 8, 9, 100, 1000])
+def test_rsa_block_mode_round_trips(size):
+    cipher = RSA(2**61-1, 2**31-1, RSA_EXPONENT, interactive=False)
+    data = b'\x00\x00' + random.Random(size).randbytes(size)
+    encrypted = cipher.encrypt(data)
+    assert len(encrypted) % cipher.block_width == 0
+    assert cipher.decrypt(encrypted) == data
+
+def test_rsa_block_mode_streams():
+    cipher = RSA(2**61-1, 2**31-1, RSA_EXPONENT, interactive=False)
+    data = random.Random(0).randbytes(12345)
+    encrypted = io.BytesIO()
+    cipher.encrypt_stream(io.BytesIO(data), encrypted, blocks=3)
+    assert encrypted.getvalue() == cipher.encrypt(data)
+    decrypted = io.BytesIO()
+    cipher.decrypt_stream(io.BytesIO(encrypted.getvalue()), decrypted, blocks=5)
+    assert decrypted.getvalue() == data
+
+def test_rsa_block_mode_rejects_bad_ciphertext():
+    cipher = RSA(2**61-1, 2**31-1, RSA_EXPONENT, interactive=False)
+    encrypted = cipher.encrypt(b'attack at dawn')
+    with pytest.raises(ValueError):
+        cipher.decrypt(encrypted[:-1])
+    with pytest.raises(ValueError):
+        cipher.decrypt(b'\xff' * cipher.block_width)
+    with pytest.raises(ValueError):
+        RSA(61, 53, 17, interactive=False).encrypt(b'too small')
+
+# Rabin Cipher =================================================================
+
+def test_rabin_prints_its_keys():
+    cipher = Rabin(1019, 1031, interactive=False)
+    assert str(cipher) == 'p = 1019\nq = 1031\nn = 1050589'
+    assert '__str__' in vars(Rabin)
+
+@pytest.mark.parametrize('p, q', [(7, 11), (13, 17), (1019, 1031), (1009, 1013)])
+def test_rabin_square_roots_match_search(p, q):
+    cipher = Rabin(p, q, lookup_table=False, interactive=False)
+    for value in range(NUM_LETTERS):
+        number = value**2 % cipher.n
+        assert cipher.letter_values(number) == legacy_rabin_letter_values(cipher, number)
+
+def test_rabin_lattice_holds_every_decryption():
+    cipher = Rabin(7, 11, interactive=False)
+    # Rabin(7, 11) decrypted this to 'hi baz/hi bad' before it used a lattice
+    assert sorted(cipher.decrypt('49 64 _ 1 0 9').split('/')) == ['hi bad', 'hi baz']
+    ciphertext = cipher.encrypt('the bad cat')
+    lattice = cipher.decrypt_lattice(ciphertext)
+    decryptions = list(cipher.iter_decryptions(ciphertext))
+    assert len(decryptions) == math.prod(len(alternatives) for alternatives in lattice)
+    assert len(set(decryptions)) == len(decryptions)
+    assert cipher.decrypt(ciphertext) == '/'.join(decryptions)
+    assert all(cipher.encrypt(decryption) == ciphertext for decryption in decryptions)
+
+@pytest.mark.parametrize('lookup_table', [True, False])
+def test_rabin_rejects_tokens_that_are_not_letters(lookup_table):
+    cipher = Rabin(11, 13, lookup_table=lookup_table, interactive=False)
+    # 104 is 26 squared, and none of its square roots are letters
+    for ciphertext in ['104', '143', '75 49\n64', '75 abc']:
+        with pytest.raises(ValueError):
+            cipher.decrypt_lattice(ciphertext)
+    assert cipher.decrypt(cipher.encrypt('a, b.')).split('/')[0] == 'a, b.'
+
+def test_rabin_best_decryption_looks_like_english():
+    cipher = Rabin(7, 11, interactive=False)
+    best = cipher.best_decryptions(cipher.encrypt('the bad cat'), top=3)
+    assert best[0][1] == 'the bad cat'
+    assert [score for score, _ in best] == sorted((score for score, _ in best), reverse=True)
+
+# Key Generation ===============================================================
+
+@pytest.mark.parametrize('cipher_class', [RSA, Rabin])
+@pytest.mark.parametrize('bits', [32, 256])
+def test_generated_keys_round_trip(cipher_class, bits):
+    cipher = cipher_class.generate(bits)
+    assert cipher.n.bit_length() == bits
+    assert is_prime(cipher.p) and is_prime(cipher.q) and cipher.p != cipher.q
+    assert cipher.decrypt(cipher.encrypt(SAMPLE)) == SAMPLE.lower()
+
+@pytest.mark.parametrize('cipher_class', [RSA, Rabin])
+def test_generated_key_primes_share_one_pool(monkeypatch, cipher_class):
+    pools = []
+    class RecordedPool(concurrent.futures.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            pools.append(self)
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', RecordedPool)
+    cipher = cipher_class.generate(64, workers=2)
+    assert is_prime(cipher.p) and is_prime(cipher.q) and cipher.p != cipher.q
+    assert len(pools) == 1
+
+def test_generated_rabin_primes_are_blum_primes():
+    cipher = Rabin.generate(64)
+    assert cipher.p % 4 == 3 and cipher.q % 4 == 3
+
+# Cipher Cache =================================================================
+
+@pytest.mark.parametrize('cipher_class, keys', [(Caesar, (-1,)), (Affine, (2, 3)),
+                                                (Affine, (5, 26)), (Vigenere, ('l3mon',)),
+                                                (Playfair, ('two words',)), (RSA, (61, 61, 17)),
+                                                (RSA, (61, 53, 4)), (Rabin, (60, 53))])
+def test_invalid_keys_raise_without_asking(monkeypatch, cipher_class, keys):
+    def no_input(prompt=''):
+        raise AssertionError('asked for a new key')
+    monkeypatch.setattr('builtins.input', no_input)
+    with pytest.raises(InvalidKeyError):
+        cipher_class(*keys, interactive=False)
+
+def test_cached_cipher_is_made_once():
+    cipher_cache_clear()
+    cipher = cached_cipher('Vigenere', key='lemon')
+    assert cached_cipher('vigenere', key='lemon') is cipher
+    assert cipher_cache_info().hits == 1 and cipher_cache_info().misses == 1
+    assert isinstance(cipher, Vigenere)
+    assert cipher.encrypt(SAMPLE) == Vigenere('lemon', interactive=False).encrypt(SAMPLE)
+    with pytest.raises(AttributeError):
+        cipher.key = 'other'
+
+def test_cached_cipher_can_be_pickled():
+    cipher = cached_cipher('rsa', p=61, q=53, e=17)
+    copy = pickle.loads(pickle.dumps(cipher))
+    assert type(copy) is type(cipher)
+    assert copy.decrypt(cipher.encrypt(SAMPLE)) == SAMPLE.lower()
+
+def test_cached_cipher_rejects_unknown_names_and_keys():
+    with pytest.raises(ValueError):
+        cached_cipher('enigma', key=1)
+    with pytest.raises(InvalidKeyError):
+        cached_cipher('caesar', key=-1)
@@ -0,0 +1,183 @@
+'''Tests for the crackers in crackers.py.'''
+
+import random
+import pytest
+import crackers
+from ciphers import *
+from crackers import *
+from ngrams import letter_values, NgramModel
+
+def chi_squared(text):
+    '''Scores text against the letter frequencies of English by counting its
+    letters, the way a cracker without histograms would for each key.'''
+
+    counts = [text.count(letter) for letter in LETTERS]
+    total = sum(counts)
+    return sum((count - p*total)**2 / (p*total)
+               for count, p in zip(counts, ENGLISH_PROBABILITIES))
+
+# Caesar Cipher ================================================================
+
+@pytest.mark.parametrize('method', ['chi_squared', 'log_likelihood', 'ngram'])
+def test_crack_caesar_recovers_every_key(english, model, method):
+    for key in range(NUM_LETTERS):
+        ciphertext = Caesar(key, interactive=False).encrypt(english[:400])
+        assert crack_caesar(ciphertext, method, top=1, model=model)[0][0] == key
+
+def test_caesar_histogram_scores_match_decrypting(english):
+    ciphertext = Caesar(11, interactive=False).encrypt(english[:300])
+    ranking = dict(crack_caesar(ciphertext))
+    for key in range(NUM_LETTERS):
+        plaintext = Caesar(key, interactive=False).decrypt(ciphertext)
+        assert ranking[key] == pytest.approx(chi_squared(plaintext))
+
+@pytest.mark.parametrize('method', ['chi_squared', 'log_likelihood'])
+def test_caesar_scores_without_numpy(english, monkeypatch, method):
+    histogram = LetterHistogram.from_text(english)
+    ranking = crack_caesar(histogram, method)
+    monkeypatch.setattr(crackers, 'np', None)
+    monkeypatch.setattr(crackers, 'CAESAR_PERMUTATIONS',
+                        [list(permutation) for permutation in CAESAR_PERMUTATIONS])
+    pure_ranking = crack_caesar(histogram, method)
+    assert [key for key, _ in pure_ranking] == [key for key, _ in ranking]
+    assert [score for _, score in pure_ranking] == \
+        pytest.approx([score for _, score in ranking])
+
+# Affine Cipher ================================================================
+
+@pytest.mark.parametrize('method', ['chi_squared', 'log_likelihood', 'ngram'])
+def test_crack_affine_recovers_every_key(english, model, method):
+    for a, b in AFFINE_KEYS[::7]:
+        ciphertext = Affine(a, b, interactive=False).encrypt(english[:600])
+        assert crack_affine(ciphertext, method, top=1, model=model)[0][0] == (a, b)
+
+def test_affine_histogram_scores_match_decrypting(english):
+    ciphertext = Affine(7, 3, interactive=False).encrypt(english[:300])
+    ranking = crack_affine(ciphertext)
+    assert len(ranking) == len(VALUE_INVERSES) * NUM_LETTERS
+    for (a, b), score in ranking:
+        plaintext = Affine(a, b, interactive=False).decrypt(ciphertext)
+        assert score == pytest.approx(chi_squared(plaintext))
+
+def test_affine_scores_without_numpy(english, monkeypatch):
+    histogram = LetterHistogram.from_text(english)
+    ranking = crack_affine(histogram, 'log_likelihood')
+    monkeypatch.setattr(crackers, 'np', None)
+    monkeypatch.setattr(crackers, 'AFFINE_PERMUTATIONS',
+                        [list(permutation) for permutation in AFFINE_PERMUTATIONS])
+    pure_ranking = crack_affine(histogram, 'log_likelihood')
+    assert [key for key, _ in pure_ranking] == [key for key, _ in ranking]
+    assert [score for _, score in pure_ranking] == \
+        pytest.approx([score for _, score in ranking])
+
+# Vigenere Cipher ==============================================================
+
+@pytest.mark.parametrize('key', ['lemon', 'harbour', 'lighthouse'])
+@pytest.mark.parametrize('use_model', [False, True])
+def test_crack_vigenere_recovers_key(english, model, key, use_model):
+    ciphertext = Vigenere(key, interactive=False).encrypt(english)
+    assert estimate_key_length(ciphertext) == len(key)
+    assert crack_vigenere(ciphertext, model=model if use_model else None)[0] == key
+
+@pytest.mark.parametrize('key', ['rsns', 'uzrmuzbt', 'amoknbwwbhmb', 'cryptography'])
+def test_key_length_is_not_a_divisor_of_the_key_length(english, key):
+    ciphertext = Vigenere(key, interactive=False).encrypt(english)
+    assert key_length_candidates(ciphertext)[0] == len(key)
+    assert crack_vigenere(ciphertext)[0] == key
+
+def test_crack_vigenere_lines_start_again_from_the_key(english, model):
+    cipher = Vigenere('storm', interactive=False)
+    lines = [cipher.encrypt(line) for line in english.splitlines()]
+    assert crack_vigenere(lines)[0] == 'storm'
+    assert crack_vigenere(lines, model=model)[0] == 'storm'
+
+def test_vigenere_analysis_without_numpy(english, model, monkeypatch):
+    ciphertext = Vigenere('keeper', interactive=False).encrypt(english[:1500])
+    scores = key_length_scores(ciphertext, 20)
+    values, positions = letter_positions(ciphertext)
+    key, score = solve_columns(values, positions, 6)
+    refined = refine_key(values, positions, 'keeqer', model)
+    monkeypatch.setattr(crackers, 'np', None)
+    pure_values, pure_positions = letter_positions(ciphertext)
+    assert pure_values == list(values) and pure_positions == list(positions)
+    for pure_length_score, length_score in zip(key_length_scores(ciphertext, 20), scores):
+        assert pure_length_score == pytest.approx(length_score)
+    assert solve_columns(pure_values, pure_positions, 6) == (key, pytest.approx(score))
+    pure_refined = refine_key(pure_values, pure_positions, 'keeqer', model)
+    assert pure_refined == (refined[0], pytest.approx(refined[1], rel=1e-6))
+
+# Playfair Cipher ==============================================================
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_playfair_reports_progress_of_each_restart(model, english, workers):
+    ciphertext = Playfair('lighthouse', interactive=False).encrypt(english[:300])
+    reports = []
+    key, score = crack_playfair(ciphertext, model, restarts=3, iterations=200,
+                                workers=workers, seed=1,
+                                progress=lambda *report: reports.append(report))
+    assert [(finished, restarts) for finished, restarts, _ in reports] == \
+        [(1, 3), (2, 3), (3, 3)]
+    assert reports[-1][2] == score
+    assert sorted(key) == sorted(Playfair.ALPHABET)
+
+def key_square(key):
+    '''Returns the key square of a Playfair key as letter indices, the way
+    the cracker represents squares.'''
+
+    matrix = Playfair(key, interactive=False).matrix
+    return [PLAYFAIR_INDICES[letter] for row in matrix for letter in row]
+
+def test_decrypt_square_matches_playfair_decrypt(english):
+    np = pytest.importorskip('numpy')
+    cipher = Playfair('lighthouse', interactive=False)
+    ciphertext = cipher.encrypt(english[:600])
+    first, second = playfair_digrams(ciphertext.splitlines())
+    values = decrypt_square(np.array(key_square('lighthouse')), first, second)
+    assert list(values) == list(letter_values(cipher.decrypt(ciphertext)))
+
+def test_playfair_digrams_drop_the_last_letter_of_odd_runs():
+    first, second = playfair_digrams('Jam, tea and toast')
+    letters = [Playfair.ALPHABET[index] for pair in zip(first, second) for index in pair]
+    assert ''.join(letters) == 'iateantoas'
+
+def test_decrypt_square_without_numpy(monkeypatch, english):
+    cipher = Playfair('harbour', interactive=False)
+    ciphertext = cipher.encrypt(english[:300])
+    first, second = playfair_digrams(ciphertext.splitlines())
+    square = key_square('harbour')
+    expected = list(letter_values(cipher.decrypt(ciphertext)))
+    monkeypatch.setattr(crackers, 'np', None)
+    monkeypatch.setattr(crackers, 'DECRYPT_POSITIONS', playfair_digram_positions())
+    monkeypatch.setattr(crackers, 'PLAYFAIR_VALUES', [int(value) for value in PLAYFAIR_VALUES])
+    assert decrypt_square(square, list(first), list(second)) == expected
+
+def test_polish_square_recovers_a_nearly_right_key(english):
+    np = pytest.importorskip('numpy')
+    cipher = Playfair('lighthouse', interactive=False)
+    ciphertext = cipher.encrypt(english[:1200])
+    # A model of the padded plaintext itself, so the true square is the best
+    model = NgramModel.from_text(cipher.decrypt(ciphertext))
+    first, second = playfair_digrams(ciphertext)
+    square = np.array(key_square('lighthouse'))
+    expected = list(decrypt_square(square, first, second))
+    for i, j in [(0, 1), (3, 17), (5, 20)]:
+        nearly = square.copy()
+        nearly[i], nearly[j] = square[j], square[i]
+        score = model.score_values(decrypt_square(nearly, first, second))
+        polished_score, polished = polish_square(nearly, score, first, second, model)
+        assert list(decrypt_square(polished, first, second)) == expected
+        assert polished_score == model.score_values(expected)
+
+def test_crack_playfair_is_repeatable_with_a_seed(model, english):
+    ciphertext = Playfair('lighthouse', interactive=False).encrypt(english[:400])
+    key, score = crack_playfair(ciphertext, model, restarts=2, iterations=2000, seed=5)
+    assert crack_playfair(ciphertext, model, restarts=2, iterations=2000, seed=5) == \
+        (key, score)
+    plaintext = Playfair(key, interactive=False).decrypt(ciphertext)
+    assert score == pytest.approx(model.score_values(letter_values(plaintext)))
+    random_key = ''.join(random.Random(5).sample(Playfair.ALPHABET, PLAYFAIR_LETTERS))
+    random_plaintext = Playfair(random_key, interactive=False).decrypt(ciphertext)
+    assert score > model.score_values(letter_values(random_plaintext))
+
+def test_crack_playfair_without_letters(model):
+    assert crack_playfair('12 34!', model) == (''.join(Playfair.ALPHABET), 0.0)
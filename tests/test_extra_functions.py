@@ -0,0 +1,51 @@
+'''Tests for the number theory functions in extra_functions.py.'''
+
+import math
+import random
+import pytest
+from benchmarks import legacy_extended_gcd, legacy_is_invertible
+from extra_functions import *
+
+# Modular Inverses =============================================================
+
+def test_extended_gcd_matches_recursive_version():
+    generator = random.Random(0)
+    pairs = [(0, 7), (7, 0), (1, 1), (240, 46), (2**127-1, 2**89-1)]
+    pairs += [(generator.randrange(10**30), generator.randrange(1, 10**30))
+              for _ in range(200)]
+    for a, n in pairs:
+        gcd, x, y = extended_gcd(a, n)
+        assert (gcd, x, y) == legacy_extended_gcd(a, n)
+        assert gcd == math.gcd(a, n) and a*x + n*y == gcd
+
+def test_extended_gcd_handles_huge_numbers():
+    a, n = 2**4423 - 1, 2**4253 - 1
+    gcd, x, y = extended_gcd(a, n)
+    assert gcd == 1 and a*x + n*y == 1
+
+def test_is_invertible_checks_lists_like_single_numbers():
+    phi_n = 2**64 * 3**5 * 7 * 1_000_003
+    generator = random.Random(1)
+    nums = [generator.randrange(2, phi_n) for _ in range(300)] + [65537, 2, 6, 1]
+    assert is_invertible(nums, phi_n) == [legacy_is_invertible(num, phi_n) for num in nums]
+
+def test_batch_inverse():
+    modulus = 2**127 - 1
+    nums = list(range(1, 500)) + [modulus + 3, 2**100]
+    inverses = batch_inverse(nums, modulus)
+    assert inverses == [pow(num, -1, modulus) for num in nums]
+    assert batch_inverse([], modulus) == []
+    with pytest.raises(ValueError):
+        batch_inverse([3, 10, 5], 25)
+
+# Square Roots =================================================================
+
+@pytest.mark.parametrize('prime', [2, 3, 5, 13, 17, 41, 97, 1009, 1019, 65537])
+def test_modular_sqrt_finds_every_square(prime):
+    squares = {value**2 % prime for value in range(prime)}
+    for num in range(min(prime, 2000)):
+        if num in squares:
+            assert modular_sqrt(num, prime)**2 % prime == num
+        else:
+            with pytest.raises(ValueError):
+                modular_sqrt(num, prime)
@@ -0,0 +1,61 @@
+'''Tests for the letter histogram in frequency.py.'''
+
+import collections
+import pickle
+import pytest
+import frequency
+from cipher_conversion import get_frequency, get_most_frequent
+from frequency import *
+
+def expected_counts(text):
+    '''Counts the letters of text one character at a time.'''
+
+    counter = collections.Counter(letter for letter in text.lower() if letter in LETTERS)
+    return [counter[letter] for letter in LETTERS]
+
+# Letter Histogram =============================================================
+
+@pytest.mark.parametrize('use_numpy', [True, False])
+def test_letter_histogram_counts_ascii_letters(english, monkeypatch, use_numpy):
+    if not use_numpy:
+        monkeypatch.setattr(frequency, 'np', None)
+    text = english + 'ÉCOLE café ß'
+    assert letter_histogram(text) == expected_counts(english + 'COLE caf ')
+    assert letter_histogram(text.encode()) == letter_histogram(text)
+
+def test_histogram_from_chunks_matches_from_text(english, monkeypatch):
+    monkeypatch.setattr(frequency, 'CHUNK_SIZE', 100)
+    lines = english.splitlines(keepends=True)
+    histogram = LetterHistogram.from_chunks(lines)
+    assert histogram == LetterHistogram.from_text(english)
+    assert histogram.total() == sum(expected_counts(english))
+
+@pytest.mark.parametrize('workers', [None, 3])
+def test_histogram_from_file(english, tmp_path, workers):
+    file = tmp_path / 'english.txt'
+    file.write_text(english)
+    assert LetterHistogram.from_file(str(file), workers) == \
+        LetterHistogram(expected_counts(english))
+
+def test_histogram_matches_letter_by_letter_frequency(english):
+    lines = english.splitlines()
+    frequency = {}
+    for line in lines:
+        for letter in line.lower():
+            if letter in LETTERS:
+                frequency[letter] = frequency.get(letter, 0) + 1
+    assert get_frequency(lines) == frequency
+    assert get_most_frequent(get_frequency(lines)) == [('e', max(frequency.values()))]
+    assert sorted(get_most_frequent({'a': 2, 'b': 1, 'c': 2})) == [('a', 2), ('c', 2)]
+
+def test_histograms_merge_and_stay_immutable(english):
+    half = len(english) // 2
+    histogram = LetterHistogram.from_text(english[:half]) + LetterHistogram.from_text(english[half:])
+    assert histogram == LetterHistogram.from_text(english)
+    assert pickle.loads(pickle.dumps(histogram)) == histogram
+    assert histogram.most_frequent()[0][0] == 'e'
+    assert abs(sum(histogram.frequencies()) - 1) < 1e-9
+    with pytest.raises(AttributeError):
+        histogram.counts = ()
+    with pytest.raises(ValueError):
+        LetterHistogram([1, 2, 3])
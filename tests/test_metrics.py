@@ -0,0 +1,146 @@
+'''Tests for the metrics in metrics.py.'''
+
+import io
+import pstats
+import pytest
+import cipher_conversion
+import metrics
+from ciphers import *
+
+@pytest.fixture
+def enabled_metrics():
+    '''Keeps metrics during a test, starting from none.'''
+
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+def counted_ciphers():
+    '''Returns the cipher labels of the characters counted so far.'''
+
+    samples = metrics.as_dict()['counters'].get('cipher_characters_total', [])
+    return {sample['labels']['cipher'] for sample in samples}
+
+# Cipher Operations ============================================================
+
+def test_vigenere_is_counted_without_its_caesar_ciphers(enabled_metrics):
+    cipher = Vigenere('lemon', interactive=False)
+    message = 'attack at dawn'
+    assert len(message) < VECTORIZE_THRESHOLD
+    assert cipher.decrypt(cipher.encrypt(message)) == message
+    assert counted_ciphers() == {'Vigenere'}
+
+def test_frozen_ciphers_are_counted_as_their_cipher(enabled_metrics):
+    cipher = cached_cipher('affine', a=5, b=8)
+    cipher.decrypt(cipher.encrypt('abc'))
+    counters = metrics.as_dict()['counters']['cipher_characters_total']
+    assert counters == [{'labels': {'cipher': 'Affine', 'operation': 'decrypt'}, 'value': 3},
+                        {'labels': {'cipher': 'Affine', 'operation': 'encrypt'}, 'value': 3}]
+
+def test_rsa_counts_modular_exponentiations(enabled_metrics):
+    def exponentiations():
+        samples = metrics.as_dict()['counters']['modular_exponentiations_total']
+        return {sample['labels']['cipher']: sample['value'] for sample in samples}
+
+    cipher = RSA(61, 53, 17, lookup_table=False, interactive=False)
+    ciphertext = cipher.encrypt('ab, c')
+    assert exponentiations() == {'RSA': 3}
+    assert cipher.decrypt(ciphertext) == 'ab, c'
+    assert exponentiations() == {'RSA': 6}
+    table_cipher = RSA(61, 53, 17, interactive=False)
+    assert exponentiations() == {'RSA': 6 + NUM_LETTERS}
+    table_cipher.decrypt(table_cipher.encrypt('abc'))
+    assert exponentiations() == {'RSA': 6 + NUM_LETTERS}
+
+# Counters and Histograms ======================================================
+
+def test_nothing_is_kept_while_disabled():
+    metrics.reset()
+    assert not metrics.enabled
+    metrics.increment('things_total', cipher='RSA')
+    metrics.observe('function_seconds', 0.5, function='f')
+    Caesar(3, interactive=False).encrypt('abc')
+    assert metrics.as_dict() == {'counters': {}, 'histograms': {}}
+    assert metrics.to_prometheus() == ''
+
+def test_histogram_buckets_are_cumulative(enabled_metrics):
+    for value in (0.0000005, 0.002, 0.003, 0.5, 20.0):
+        metrics.observe('function_seconds', value, function='f')
+    [sample] = metrics.as_dict()['histograms']['function_seconds']
+    assert sample['labels'] == {'function': 'f'}
+    assert sample['buckets'] == {'1e-06': 1, '1e-05': 1, '0.0001': 1, '0.001': 1,
+                                 '0.01': 3, '0.1': 3, '1.0': 4, '10.0': 4, '+Inf': 5}
+    assert sample['count'] == 5
+    assert sample['sum'] == pytest.approx(20.5050005)
+
+def test_counters_are_kept_by_labels(enabled_metrics):
+    metrics.increment('things_total', cipher='RSA', operation='encrypt')
+    metrics.increment('things_total', 2, operation='encrypt', cipher='RSA')
+    metrics.increment('things_total', cipher='Rabin', operation='encrypt')
+    metrics.increment('other_total')
+    assert metrics.as_dict()['counters'] == {
+        'other_total': [{'labels': {}, 'value': 1}],
+        'things_total': [{'labels': {'cipher': 'RSA', 'operation': 'encrypt'}, 'value': 3},
+                         {'labels': {'cipher': 'Rabin', 'operation': 'encrypt'}, 'value': 1}]}
+
+def test_timed_functions(enabled_metrics):
+    assert extended_gcd(240, 46)[0] == 2
+    [sample] = metrics.as_dict()['histograms']['function_seconds']
+    assert sample['labels'] == {'function': 'extended_gcd'}
+    assert sample['count'] == 1
+
+    @metrics.timed('failing')
+    def failing():
+        raise ValueError
+    with pytest.raises(ValueError):
+        failing()
+    assert len(metrics.as_dict()['histograms']['function_seconds']) == 2
+    assert failing.__name__ == 'failing'
+
+def test_prometheus_format(enabled_metrics):
+    metrics.increment('modular_exponentiations_total', 4, cipher='RSA')
+    metrics.observe('function_seconds', 0.05, function='is_prime')
+    lines = metrics.to_prometheus().splitlines()
+    assert lines[:3] == ['# HELP modular_exponentiations_total Modular exponentiations '
+                         'done by RSA and Rabin',
+                         '# TYPE modular_exponentiations_total counter',
+                         'modular_exponentiations_total{cipher="RSA"} 4']
+    assert lines[3:6] == ['# HELP function_seconds Time spent in instrumented functions',
+                          '# TYPE function_seconds histogram',
+                          'function_seconds_bucket{function="is_prime",le="1e-06"} 0']
+    assert 'function_seconds_bucket{function="is_prime",le="0.1"} 1' in lines
+    assert lines[-3:] == ['function_seconds_bucket{function="is_prime",le="+Inf"} 1',
+                          'function_seconds_sum{function="is_prime"} 0.05',
+                          'function_seconds_count{function="is_prime"} 1']
+
+# Profiling ====================================================================
+
+def test_profile_call(tmp_path):
+    stream = io.StringIO()
+    output = str(tmp_path / 'stats.prof')
+    assert metrics.profile_call(sorted, [3, 1, 2], limit=5, output=output,
+                                stream=stream) == [1, 2, 3]
+    assert 'function calls' in stream.getvalue()
+    assert pstats.Stats(output).total_calls >= 1
+
+def test_profile_call_prints_when_the_function_fails():
+    stream = io.StringIO()
+    with pytest.raises(ZeroDivisionError):
+        metrics.profile_call(divmod, 1, 0, stream=stream)
+    assert 'function calls' in stream.getvalue()
+
+# Command Line =================================================================
+
+def test_converter_prints_metrics(enabled_metrics, tmp_path, capsys):
+    metrics.disable()
+    plain = tmp_path / 'plain.txt'
+    plain.write_text('attack at dawn\n')
+    output = str(tmp_path / 'cipher.txt')
+    assert cipher_conversion.main(['-c', 'caesar', '-k', '3', str(plain), '-o', output,
+                                   '--metrics']) == 0
+    err = capsys.readouterr().err
+    assert '# TYPE cipher_characters_total counter' in err
+    assert 'cipher_characters_total{cipher="Caesar",operation="encrypt"} 15' in err
+    assert (tmp_path / 'cipher.txt').read_text() == 'dwwdfn dw gdzq\n'
@@ -0,0 +1,192 @@
+'''Tests for the n-gram models in ngrams.py.'''
+
+import collections
+import math
+import os
+import pickle
+import sys
+import pytest
+import ngrams
+from ngrams import *
+
+def naive_counts(text, n):
+    '''Counts the n-grams of the letters of text one at a time.'''
+
+    letters = [letter for letter in text.lower() if 'a' <= letter <= 'z']
+    return collections.Counter(''.join(letters[i:i+n])
+                               for i in range(len(letters) - n + 1))
+
+def ngram_index(ngram):
+    '''Returns the index of an n-gram given as a string.'''
+
+    index = 0
+    for letter in ngram:
+        index = index * 26 + ord(letter) - ord('a')
+    return index
+
+@pytest.fixture
+def no_numpy(monkeypatch):
+    '''Runs a test with the pure Python paths of ngrams.py.'''
+
+    monkeypatch.setattr(ngrams, 'np', None)
+
+# Letters and N-grams ==========================================================
+
+def test_letter_values_of_text_and_bytes(no_numpy):
+    expected = [ord(letter) - ord('a') for letter in 'abcxyzcaf']
+    assert letter_values('aBc, XyZ! café') == expected
+    assert letter_values(b'aBc, XyZ! caf\xe9') == expected
+
+def test_letter_values_with_numpy_match(english, monkeypatch):
+    expected = letter_values(english)
+    monkeypatch.setattr(ngrams, 'np', None)
+    assert letter_values(english) == list(expected)
+
+@pytest.mark.parametrize('n', [1, 2, 3, 4])
+def test_ngram_indices_with_and_without_numpy(n, english, monkeypatch):
+    values = letter_values(english[:500])
+    indices = ngram_indices(values, n)
+    letters = ''.join(chr(value + ord('a')) for value in values)
+    assert list(indices) == [ngram_index(letters[i:i+n])
+                             for i in range(len(letters) - n + 1)]
+    monkeypatch.setattr(ngrams, 'np', None)
+    assert ngram_indices(list(values), n) == list(indices)
+
+def test_ngram_indices_of_rows_and_short_sequences():
+    np = pytest.importorskip('numpy')
+    values = np.array([[0, 1, 2, 3], [25, 24, 23, 22]])
+    assert ngram_indices(values, 3).tolist() == [[28, 731], [17547, 16844]]
+    assert ngram_indices([1, 2], 3).shape == (0,)
+
+@pytest.mark.parametrize('numpy', [True, False])
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 100, 10**6])
+def test_count_ngrams_across_chunks(english, monkeypatch, numpy, chunk_size):
+    if not numpy:
+        monkeypatch.setattr(ngrams, 'np', None)
+    text = english[:1500]
+    chunks = [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
+    counts = count_ngrams(chunks, [1, 2, 4])
+    for n in (1, 2, 4):
+        expected = [0] * 26**n
+        for ngram, count in naive_counts(text, n).items():
+            expected[ngram_index(ngram)] = count
+        assert list(counts[n]) == expected
+
+# Models =======================================================================
+
+def test_from_counts_probabilities(no_numpy):
+    counts = [0] * 26
+    counts[0], counts[1] = 3, 1
+    model = NgramModel.from_counts(1, counts)
+    assert model.log_probabilities[0] == pytest.approx(math.log(0.75))
+    assert model.log_probabilities[1] == pytest.approx(math.log(0.25))
+    assert model.floor == pytest.approx(math.log(FLOOR_COUNT / 4))
+    assert model.log_probabilities[2] == model.floor
+
+def test_from_text_with_and_without_numpy(english, monkeypatch):
+    model = NgramModel.from_text(english, 3)
+    monkeypatch.setattr(ngrams, 'np', None)
+    pure_model = NgramModel.from_text(english, 3)
+    assert pure_model.floor == pytest.approx(model.floor)
+    assert pure_model.log_probabilities == pytest.approx(list(model.log_probabilities))
+
+def test_model_needs_a_probability_for_every_ngram():
+    with pytest.raises(ValueError):
+        NgramModel(2, [0.0] * 26, -10.0)
+
+def test_save_and_load(tmp_path, english):
+    model = NgramModel.from_text(english, 2)
+    file = str(tmp_path / 'bigrams.bin')
+    model.save(file)
+    assert os.path.getsize(file) == TABLE_HEADER.size + 4 * 26**2
+    loaded = NgramModel.load(file)
+    assert loaded.table is None
+    assert (loaded.n, loaded.file) == (2, file)
+    assert loaded.floor == pytest.approx(model.floor)
+    assert list(loaded.log_probabilities) == pytest.approx(list(model.log_probabilities))
+    assert loaded.score(english) == pytest.approx(model.score(english), rel=1e-6)
+
+def test_save_without_numpy_matches(tmp_path, english, monkeypatch):
+    model = NgramModel.from_text(english, 2)
+    model.save(str(tmp_path / 'numpy.bin'))
+    monkeypatch.setattr(ngrams, 'np', None)
+    NgramModel(2, list(model.log_probabilities), model.floor).save(
+        str(tmp_path / 'pure.bin'))
+    assert (tmp_path / 'pure.bin').read_bytes() == (tmp_path / 'numpy.bin').read_bytes()
+    loaded = NgramModel.load(str(tmp_path / 'pure.bin'))
+    assert list(loaded.log_probabilities) == pytest.approx(list(model.log_probabilities))
+
+@pytest.mark.parametrize('contents', [b'', b'NGRM', b'XXXX' + bytes(12 + 4*26),
+                                      TABLE_HEADER.pack(TABLE_MAGIC, 2, 0.0)])
+def test_load_rejects_other_files(tmp_path, contents):
+    file = tmp_path / 'table.bin'
+    file.write_bytes(contents)
+    with pytest.raises(ValueError):
+        NgramModel.load(str(file))
+
+def test_pickled_models(tmp_path, english):
+    model = NgramModel.from_text(english, 2)
+    copy = pickle.loads(pickle.dumps(model))
+    assert list(copy.log_probabilities) == list(model.log_probabilities)
+    model.save(str(tmp_path / 'bigrams.bin'))
+    loaded = NgramModel.load(str(tmp_path / 'bigrams.bin'))
+    copy = pickle.loads(pickle.dumps(loaded))
+    assert copy.file == loaded.file
+    assert copy.table is None
+
+def test_build_tables_and_load_model(tmp_path, english):
+    directory = str(tmp_path)
+    files = build_tables(os.path.join(os.path.dirname(__file__), 'data', 'english.txt'),
+                         directory, (1, 3))
+    assert files == [os.path.join(directory, NGRAM_FILES[n]) for n in (1, 3)]
+    model = load_model(3, directory)
+    assert load_model(3, directory) is model
+    expected = NgramModel.from_text(english, 3)
+    assert list(model.log_probabilities) == pytest.approx(list(expected.log_probabilities))
+    with pytest.raises(FileNotFoundError):
+        load_model(4, directory)
+
+def test_main_builds_tables(tmp_path, monkeypatch, capsys):
+    corpus = os.path.join(os.path.dirname(__file__), 'data', 'english.txt')
+    monkeypatch.setattr(sys, 'argv', ['ngrams.py', corpus, '--directory', str(tmp_path),
+                                      '--sizes', '2'])
+    main()
+    file = os.path.join(str(tmp_path), NGRAM_FILES[2])
+    assert capsys.readouterr().out == f'{file}: {TABLE_HEADER.size + 4 * 26**2} bytes\n'
+
+# Scoring ======================================================================
+
+def test_scores_add_up_the_counted_ngrams(model, english):
+    text = english[:800]
+    expected = sum(count * float(model.log_probabilities[ngram_index(ngram)])
+                   for ngram, count in naive_counts(text, 4).items())
+    assert model.score(text) == pytest.approx(expected)
+
+def test_score_values_with_and_without_numpy(model, english, monkeypatch):
+    values = letter_values(english[:800])
+    score = model.score_values(values)
+    assert isinstance(score, float)
+    pure_model = NgramModel(4, [float(value) for value in model.log_probabilities],
+                            model.floor)
+    monkeypatch.setattr(ngrams, 'np', None)
+    assert pure_model.score_values(list(values)) == pytest.approx(score)
+
+def test_score_values_of_rows(model, english):
+    np = pytest.importorskip('numpy')
+    values = letter_values(english[:400])
+    rows = np.stack([values[:100], values[100:200]])
+    assert model.score_values(rows) == pytest.approx(
+        [model.score_values(values[:100]), model.score_values(values[100:200])])
+
+def test_english_scores_better_than_shuffled_letters(model, english):
+    text = english[-600:]
+    shuffled = ''.join(sorted(text))
+    assert model.score(text) > model.score(shuffled)
+
+def test_context_scores_add_up_to_the_score(model, english):
+    text = english[:300]
+    segments = [text[i:i+7] for i in range(0, len(text), 7)]
+    total = sum(model.context_score(text[:i*7], segment)
+                for i, segment in enumerate(segments))
+    assert total == pytest.approx(model.score(text))
+    assert model.context_score('the', ', ') == 0.0
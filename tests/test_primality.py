@@ -0,0 +1,93 @@
+'''Tests for the primality testing and prime generation in primality.py.'''
+
+import concurrent.futures
+import random
+import pytest
+from primality import *
+
+CARMICHAEL_NUMBERS = [561, 1105, 1729, 2465, 2821, 6601, 8911, 41041, 825265, 321197185]
+MERSENNE_PRIMES = [2**31-1, 2**61-1, 2**89-1, 2**107-1, 2**127-1]
+
+def sieve(limit):
+    '''Returns whether each number below limit is prime, by the sieve of
+    Eratosthenes.'''
+
+    primes = [False, False] + [True] * (limit-2)
+    for num in range(2, int(limit**0.5) + 1):
+        if primes[num]:
+            primes[num*num::num] = [False] * len(range(num*num, limit, num))
+    return primes
+
+# Primality Testing ============================================================
+
+def test_is_prime_matches_sieve():
+    limit = SMALL_PRIME_LIMIT**2
+    primes = sieve(limit + 20_000)
+    for num in list(range(-5, 20_000)) + list(range(limit - 20_000, len(primes))):
+        assert is_prime(num) == (num > 1 and primes[num])
+
+@pytest.mark.parametrize('num', CARMICHAEL_NUMBERS)
+def test_carmichael_numbers_are_not_prime(num):
+    assert not is_prime(num)
+
+@pytest.mark.parametrize('bound, bases', DETERMINISTIC_BASES)
+def test_strong_pseudoprimes_at_each_bound_are_not_prime(bound, bases):
+    # Each bound is the smallest strong pseudoprime to all of its bases
+    assert all(miller_rabin_test(bound, base) for base in bases)
+    assert not is_prime(bound)
+
+def test_strong_pseudoprime_fools_a_single_base():
+    assert miller_rabin_test(2047, 2)
+    assert miller_rabin_test(3215031751, 2)
+    assert not is_prime(3215031751)
+
+def test_is_prime_is_deterministic_below_the_bounds(monkeypatch):
+    def no_random_bases(*args):
+        raise AssertionError('random bases used')
+    monkeypatch.setattr(random, 'randint', no_random_bases)
+    is_prime.cache_clear()
+    assert is_prime(2**61-1)
+    assert not is_prime(1_000_003 * 1_000_033)
+
+@pytest.mark.parametrize('num', MERSENNE_PRIMES)
+def test_large_primes(num):
+    assert is_prime(num)
+    assert not is_prime(num * MERSENNE_PRIMES[0])
+    assert not is_prime(2**67-1)
+
+def test_is_prime_caches_results():
+    is_prime.cache_clear()
+    is_prime(2**89-1)
+    is_prime(2**89-1)
+    assert is_prime.cache_info().hits == 1
+
+# Prime Generation =============================================================
+
+@pytest.mark.parametrize('bits', [5, 16, 64, 256])
+@pytest.mark.parametrize('mod_4', [None, 1, 3])
+def test_generate_prime(bits, mod_4):
+    prime = generate_prime(bits, mod_4)
+    assert prime.bit_length() == bits
+    assert is_prime(prime)
+    assert mod_4 is None or prime % 4 == mod_4
+
+def test_generate_prime_in_parallel():
+    prime = generate_prime(128, 3, workers=2)
+    assert prime.bit_length() == 128 and prime % 4 == 3
+    assert is_prime(prime)
+
+def test_generate_prime_leaves_no_searches_running():
+    submitted = []
+    class RecordedPool(concurrent.futures.ProcessPoolExecutor):
+        def submit(self, *args, **kwargs):
+            submitted.append(super().submit(*args, **kwargs))
+            return submitted[-1]
+    with RecordedPool(2) as executor:
+        for bits in (64, 96):
+            prime = generate_prime(bits, None, 2, executor)
+            assert prime.bit_length() == bits and is_prime(prime)
+            assert all(search.done() for search in submitted)
+
+def test_generate_prime_needs_five_bits():
+    with pytest.raises(ValueError):
+        generate_prime(4)